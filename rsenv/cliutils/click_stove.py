@@ -267,7 +267,7 @@ def create_click_cli_command(callback, params=None, help=None, epilog=None, shor
         #   has a some things defined that are missing in click.Parameter.
 
         # You can use inspect.Parameter.kind enum attribute to determine what type the parameter is.
-        positional_only_args = [par for parname, par in _sig.parameters.items() if par.kind is par.POSIITONAL_ONLY]
+        positional_only_args = [par for parname, par in _sig.parameters.items() if par.kind is par.POSITIONAL_ONLY]
         positional_or_kw_args = [par for parname, par in _sig.parameters.items() if par.kind is par.POSITIONAL_OR_KEYWORD]
         kw_only_args = [par for parname, par in _sig.parameters.items() if par.kind is par.KEYWORD_ONLY]
         var_positional = [par for parname, par in _sig.parameters.items() if par.kind is par.VAR_POSITIONAL]
@@ -0,0 +1,218 @@
+# Copyright 2026 Rasmus Scholer Sorensen
+
+"""
+
+Run many `hplc-cli` jobs from a single manifest file, in a single process (or a pool of worker processes).
+
+Each invocation of `hplc-cli` has to import pandas, xarray, matplotlib, etc, which takes a significant
+amount of time compared to processing a single AIA directory. The batch mode keeps the imports (and any
+other warm caches) around, and processes all jobs listed in the manifest.
+
+The manifest can be either a YAML file or a CSV file.
+
+YAML manifest, either a plain list of jobs, or a dict with 'defaults' and 'jobs':
+
+    defaults:
+        make_pseudogel: true
+        signal_downsampling: 20
+    jobs:
+        - cdf_files_or_dir: [RS535.AIA]
+        - cdf_files_or_dir: [RS536a.AIA, RS536b.AIA]
+          fnprefix: RS536
+          crop_range: [2, 20]
+
+CSV manifest, with one column for each parameter (empty cells use the default value):
+
+    cdf_files_or_dir,fnprefix,crop_range
+    RS535.AIA,,
+    RS536a.AIA;RS536b.AIA,RS536,"[2, 20]"
+
+Parameter names are the same as for `hplc-cli`, using either underscores or dashes.
+Multiple input paths in a CSV cell are separated by semicolon.
+CSV values are parsed as YAML scalars, e.g. `true`, `20`, or `[2, 20]`.
+Relative input paths are resolved relative to the directory containing the manifest file.
+
+All figures are rendered using the non-interactive 'Agg' matplotlib backend, and no figures are shown.
+
+"""
+
+import os
+import csv
+import inspect
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import click
+import yaml
+
+
+# Parameters that would block or require a display, and which are always overridden in batch mode:
+BATCH_MODE_OVERRIDES = {
+    'interactive_chromatograms_plot': False,
+    'pyplot_show': False,
+    'confirm_nan': False,
+}
+# Defaults that differ from the `hplc-cli` defaults, because we cannot ask the user during batch processing:
+# (Only parameters where `hplc-cli` would otherwise ask the user belong here, so batch jobs give the same
+# output as running the same job with `hplc-cli`.)
+BATCH_MODE_DEFAULTS = {
+    'trim_signals': True,
+}
+
+
+def use_agg_backend():
+    """ Switch matplotlib to the non-interactive 'Agg' backend. """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def get_hplc_cli_defaults():
+    """ Return a dict with the default parameter values of the `hplc-cli` click command.
+    The click option defaults take precedence over the function defaults, same as when invoked from the command line.
+    """
+    from .cli import hplc_cli
+    defaults = {
+        name: param.default for name, param in inspect.signature(hplc_cli.callback).parameters.items()
+        if param.default is not inspect.Parameter.empty
+    }
+    # Let click process the option defaults, exactly as when invoking `hplc-cli` without any options:
+    with hplc_cli.make_context('hplc-cli', [], resilient_parsing=True) as ctx:
+        defaults.update({name: value for name, value in ctx.params.items() if name != 'cdf_files_or_dir'})
+    return defaults
+
+
+def _normalize_job_keys(job):
+    return {key.replace('-', '_'): value for key, value in job.items()}
+
+
+def load_batch_manifest(manifest_file):
+    """ Load a list of `hplc-cli` jobs from a YAML or CSV manifest file.
+
+    Args:
+        manifest_file: Path to the manifest file (.yaml, .yml, or .csv).
+
+    Returns:
+        List of job dicts, each dict containing the `hplc-cli` parameters for that job.
+    """
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    if manifest_file.lower().endswith('.csv'):
+        with open(manifest_file, newline='') as fd:
+            rows = list(csv.DictReader(fd))
+        defaults = {}
+        jobs = []
+        for row in rows:
+            job = {}
+            for key, value in row.items():
+                if key is None or value is None or value.strip() == '':
+                    continue
+                if key.replace('-', '_') == 'cdf_files_or_dir':
+                    job[key] = [path.strip() for path in value.split(';') if path.strip()]
+                else:
+                    job[key] = yaml.safe_load(value)
+            jobs.append(job)
+    else:
+        with open(manifest_file) as fd:
+            manifest = yaml.safe_load(fd)
+        if isinstance(manifest, dict):
+            defaults, jobs = manifest.get('defaults') or {}, manifest.get('jobs') or []
+        else:
+            defaults, jobs = {}, manifest or []
+
+    defaults = _normalize_job_keys(defaults)
+    hplc_cli_defaults = get_hplc_cli_defaults()
+    loaded_jobs = []
+    for i, job in enumerate(jobs):
+        job = dict(defaults, **_normalize_job_keys(job))
+        unknown = set(job) - set(hplc_cli_defaults) - {'cdf_files_or_dir'}
+        if unknown:
+            raise ValueError(f"Job {i} in manifest {manifest_file!r} has unrecognized parameters: {sorted(unknown)}")
+        paths = job.get('cdf_files_or_dir')
+        if not paths:
+            raise ValueError(f"Job {i} in manifest {manifest_file!r} does not specify any `cdf_files_or_dir`.")
+        if isinstance(paths, str):
+            paths = [paths]
+        job['cdf_files_or_dir'] = [os.path.join(manifest_dir, path) for path in paths]
+        loaded_jobs.append(job)
+    return loaded_jobs
+
+
+def run_hplc_job(job):
+    """ Run a single `hplc-cli` job.
+
+    Args:
+        job: dict with `hplc-cli` parameters. Parameters not given use the `hplc-cli` defaults,
+            except for those given in `BATCH_MODE_DEFAULTS` and `BATCH_MODE_OVERRIDES`.
+
+    Returns:
+        (job, error) tuple, where error is None if the job completed successfully,
+        otherwise the formatted traceback string.
+    """
+    use_agg_backend()
+    from matplotlib import pyplot
+    from .cli import hplc_cli
+    params = get_hplc_cli_defaults()
+    params.update(BATCH_MODE_DEFAULTS)
+    params.update(job)
+    params.update(BATCH_MODE_OVERRIDES)
+    cdf_files_or_dir = params.pop('cdf_files_or_dir')
+    try:
+        hplc_cli.callback(cdf_files_or_dir, **params)
+    except Exception:
+        return job, traceback.format_exc()
+    finally:
+        pyplot.close('all')  # Do not accumulate figures in long-running worker processes.
+    return job, None
+
+
+def run_hplc_batch(jobs, workers=1, verbose=0):
+    """ Run a list of `hplc-cli` jobs, either in this process, or using a pool of worker processes.
+
+    Args:
+        jobs: A list of job dicts, e.g. from `load_batch_manifest()`.
+        workers: The number of worker processes. If 1, all jobs are run in the current process.
+        verbose: Print more information about job progress.
+
+    Returns:
+        List of (job, error) tuples, see `run_hplc_job()`.
+    """
+    use_agg_backend()
+    if workers and workers > 1:
+        # Each worker process imports the heavy modules once and then processes many jobs.
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_agg_backend) as executor:
+            results = list(executor.map(run_hplc_job, jobs))
+    else:
+        results = [run_hplc_job(job) for job in jobs]
+    if verbose:
+        for job, error in results:
+            print(f" - {'FAILED' if error else 'OK':6}: {'; '.join(job['cdf_files_or_dir'])}")
+    return results
+
+
+@click.command()
+@click.argument('manifest_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', '-j', default=1, type=int, help="Number of worker processes to use.")
+@click.option('--verbose', '-v', count=True)
+def hplc_batch_cli(manifest_file, workers=1, verbose=0):
+    """ Run many `hplc-cli` jobs listed in a YAML or CSV manifest file.
+
+    \b
+    Args:
+        manifest_file: YAML or CSV file listing the jobs, see `rsenv.hplcutils.batch` for format.
+        workers: Run jobs using this many worker processes.
+        verbose: Print more information.
+
+    Returns:
+        None
+    """
+    jobs = load_batch_manifest(manifest_file)
+    print(f"Running {len(jobs)} hplc-cli jobs from manifest {manifest_file!r} using {workers} worker(s)...")
+    results = run_hplc_batch(jobs, workers=workers, verbose=verbose)
+    failed = [(job, error) for job, error in results if error]
+    for job, error in failed:
+        print(f"\nERROR processing {job['cdf_files_or_dir']}:\n{error}")
+    print(f"\nCompleted {len(results) - len(failed)} of {len(results)} jobs.")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    hplc_batch_cli()
@@ -1,11 +1,294 @@
 
 
+"""
+
+Convert HPLC chromatograms (CDF files and raw Agilent VWD .ch files) to CSV (or Parquet) files.
+
+The conversion is done as a stream:
+Each input file is decoded in a pool of worker processes, and the output is written directly from numpy arrays,
+without creating an intermediate Pandas DataFrame.
+The output can be either one file per chromatogram, or a single, merged "wide" table with one column per run.
+For the merged table, runs are joined on their time points (same as `load_hplc_aia_xr_dataframe()`),
+or resampled onto a shared time grid with `time_alignment='resample'` (see `resample_to_common_grid`).
+NaN values are then corrected as in `load_hplc_aia_xr_dataframe()` (`nan_correction`).
+
+The merged table is written in blocks of rows (formatted in parallel for CSV, one row group per block
+for Parquet), rather than in column chunks: Both CSV files and Parquet row groups are written row by row,
+so writing column chunks would mean keeping the whole formatted table in memory (or re-writing the file
+for each chunk). Instead, all runs are decoded (in parallel) into a single (time x runs) float32 array,
+which is small compared to the CSV text (4 bytes vs. ~10 characters per value), and that array is then
+formatted and written one block of rows at a time.
+
+If a selection query or column sorting is requested, the previous, DataFrame-based conversion
+(using `load_hplc_aia_xr_dataframe()`) is used instead.
+
+"""
+
 import os
-import glob
-import pathlib
+import string
+import types
+from functools import partial
+from itertools import repeat, islice
+from concurrent.futures import ProcessPoolExecutor
 import click
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from rsenv.hplcutils.io import load_hplc_aia_xr_dataframe, get_cdf_files, load_chromatogram_xy
+from rsenv.hplcutils.dataconversion import resample_to_common_grid
+
+
+NAN_CORRECTIONS = (None, 'dropna', 'interpolate', 'fill')
+
+
+def get_time_header(convert_to_actual_time=True, convert_seconds_to_minutes=True):
+    if not convert_to_actual_time:
+        return "point_number"
+    return "Time / minutes" if convert_seconds_to_minutes else "Time / seconds"
+
+
+def join_on_time(chromatograms):
+    """ Outer-join chromatograms on their time points, the same as creating a DataFrame from a dict of Series.
+
+    Args:
+        chromatograms: A list of (xs, ys) tuples, one for each run.
+
+    Returns:
+        (times, values) tuple, where `values` is a (time x runs) array with NaN where a run has no value.
+    """
+    xs0 = chromatograms[0][0]
+    if all(np.array_equal(xs, xs0) for xs, ys in chromatograms):
+        # The common case: All runs have the same time points, so we just stack the values:
+        return np.asarray(xs0), np.column_stack([ys for xs, ys in chromatograms])
+    times = np.unique(np.concatenate([xs for xs, ys in chromatograms]))
+    values = np.full((len(times), len(chromatograms)), np.nan, dtype=np.float32)
+    for i, (xs, ys) in enumerate(chromatograms):
+        values[np.searchsorted(times, xs), i] = ys
+    return times, values
 
-from rsenv.hplcutils.io import load_hplc_aia_xr_dataframe
+
+def correct_nans(times, values, nan_correction='dropna', nan_fill_value=0, nan_interpolation_method='linear'):
+    """ Remove/fill/interpolate NaN values in a (time x runs) values array, same as `load_hplc_aia_xr_dataframe()`.
+
+    Returns:
+        (times, values) tuple.
+    """
+    if nan_correction not in NAN_CORRECTIONS:
+        raise ValueError(f"Could not understand nan_correction {nan_correction!r}, must be one of {NAN_CORRECTIONS}.")
+    if not nan_correction or not np.any(np.isnan(values)):
+        return times, values
+    print(f"\n\nWARNING: Data contains NaN values, correcting these using {nan_correction!r}...\n\n")
+    if nan_correction == 'dropna':
+        keep = ~np.isnan(values).any(axis=1)
+        return times[keep], values[keep]
+    if nan_correction == 'fill':
+        return times, np.where(np.isnan(values), nan_fill_value, values).astype(values.dtype)
+    # Interpolation is only needed in the rare case that runs have NaN values, so we just let pandas do it:
+    df = pd.DataFrame(values, index=times).interpolate(method=nan_interpolation_method, axis=0).bfill()
+    return times, df.values.astype(values.dtype)
+
+
+def _load_chromatogram(fpath, **kwargs):
+    """ Worker function: Decode a single chromatogram file, returning (fpath, xs, ys, samplename). """
+    xs, ys, samplename = load_chromatogram_xy(fpath, **kwargs)
+    return fpath, xs, np.asarray(ys, dtype=np.float32), samplename
+
+
+def csv_float_format(dtype):
+    """ Return a %-format that round-trips floats of the given dtype, i.e. converted CSV files keep full precision.
+    float64 uses the shortest repr (same as `DataFrame.to_csv`), float32 uses 9 significant digits.
+    """
+    return '%.9g' if np.dtype(dtype).itemsize <= 4 else '%r'
+
+
+def _format_csv_block(block, sep=',', fmts=('%r',)):
+    """ Worker function: Format a 2D numpy array as CSV text.
+    fmts: The format of each column; the last format is used for any remaining columns.
+    """
+    fmts = list(fmts[:block.shape[1]]) + [fmts[-1]] * (block.shape[1] - len(fmts))
+    row_fmt = sep.join(fmts) + '\n'
+    return ''.join(row_fmt % tuple(row) for row in block.tolist())
+
+
+def _write_chromatogram_file(args):
+    """ Worker function: Decode a single chromatogram file and write it to its own CSV/Parquet file. """
+    fpath, outputfn, output_format, csv_sep, crop_range, nan_kwargs, load_kwargs = args
+    xs, ys, samplename = load_chromatogram_xy(fpath, **load_kwargs)
+    if crop_range:
+        keep = (xs >= crop_range[0]) & (xs <= crop_range[1])
+        xs, ys = xs[keep], ys[keep]
+    xs, ys = correct_nans(xs, np.asarray(ys)[:, np.newaxis], **nan_kwargs)
+    ys = ys[:, 0]
+    columns = [get_time_header(**load_kwargs), samplename or os.path.basename(fpath)]
+    if output_format == 'parquet':
+        write_parquet_blocks(outputfn, columns, [np.column_stack([xs, ys])])
+    else:
+        with open(outputfn, 'w') as fd:
+            fd.write(csv_sep.join(columns) + '\n')
+            fmts = (csv_float_format(xs.dtype), csv_float_format(ys.dtype))
+            fd.write(_format_csv_block(np.column_stack([xs, ys]), sep=csv_sep, fmts=fmts))
+    return outputfn
+
+
+def uses_dataset_fields(runname_fmt):
+    """ Return True if runname_fmt uses any `ds` fields other than `ds.sample_name`, e.g. `{ds.operator}`. """
+    fields = [field for _, field, _, _ in string.Formatter().parse(runname_fmt) if field]
+    return any(field.split('.')[0].split('[')[0] == 'ds' and field != 'ds.sample_name' for field in fields)
+
+
+def load_runname_dataset(fpath, convert_seconds_to_minutes=True):
+    """ Return the `ds` object that `load_hplc_aia_xr_dataframe()` uses when formatting run names.
+
+    For CDF files, this is the xarray dataset (opened lazily, the ordinate values are not loaded),
+    for .ch files, the file metadata dict.
+    """
+    if str(fpath).lower().endswith('.ch'):
+        from .agilent.hpcs_vwd import read_agilent_1200_vwd_ch
+        time_unit = 'minutes' if convert_seconds_to_minutes else 'seconds'
+        return read_agilent_1200_vwd_ch(fpath, time_unit=time_unit, use_mmap=True)['metadata']
+    with xr.open_dataset(fpath) as ds:
+        return ds
+
+
+def format_runname(runname_fmt, i, fpath, samplename, ds=None):
+    """ Format column name for a run, using the same variables as `load_hplc_aia_xr_dataframe()`.
+
+    If `ds` is not given, only `ds.sample_name` is available;
+    use `load_runname_dataset()` to get the full `ds` if `uses_dataset_fields(runname_fmt)`.
+    """
+    if ds is None:
+        ds = types.SimpleNamespace(sample_name=samplename)
+    dirname = os.path.basename(os.path.dirname(fpath))
+    dirdirname = os.path.basename(os.path.dirname(os.path.dirname(fpath)))
+    return runname_fmt.format(
+        i=i, samplename=samplename,
+        fn=os.path.basename(fpath), filename=os.path.basename(fpath),
+        dirname=dirname, dirname_noext=os.path.splitext(dirname)[0],
+        dirdirname=dirdirname, dirdirname_noext=os.path.splitext(dirdirname)[0],
+        ds=ds,
+    )
+
+
+def write_parquet_blocks(outputfn, columns, blocks):
+    """ Write 2D numpy blocks (rows x columns) to a Parquet file, one row group per block. Requires `pyarrow`. """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Writing Parquet files requires the `pyarrow` package; use `pip install pyarrow`.")
+    writer = None
+    try:
+        for block in blocks:
+            table = pyarrow.Table.from_arrays([pyarrow.array(block[:, j]) for j in range(block.shape[1])], names=columns)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(outputfn, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def convert_chromatogram_files(
+        cdf_files_or_dir, outputfn=None, merged=True, output_format='csv',
+        runname_fmt="{i:02} {ds.sample_name}", crop_range=None,
+        nan_correction='dropna', nan_fill_value=0, nan_interpolation_method='linear',
+        time_alignment=None, resample_rate=None,
+        convert_to_actual_time=True, convert_seconds_to_minutes=True,
+        csv_sep=',', block_rows=4096, jobs=None, verbose=0,
+):
+    """ Convert chromatogram files to CSV/Parquet, decoding files and formatting output in worker processes.
+
+    Args:
+        cdf_files_or_dir: CDF/.ch files, or directories containing CDF files.
+        outputfn: Output filename, if `merged`. For separate files, the output is saved next to each input file.
+        merged: Write a single, merged table with one column per run. Otherwise, write one file per input file.
+        output_format: 'csv' or 'parquet'.
+        runname_fmt: Format string for the column names in the merged table.
+        crop_range: Only include time points within this (start, end) time range.
+        nan_correction: How to correct NaN values: None, 'dropna', 'interpolate', or 'fill',
+            see `load_hplc_aia_xr_dataframe()`.
+        nan_fill_value: The NaN fill value to use, if `nan_correction='fill'`.
+        nan_interpolation_method: The NaN interpolation method, if `nan_correction='interpolate'`.
+        time_alignment: How to align runs in the merged table: None (outer-join on time points, giving NaN
+            values if the time axes differ), or 'resample' (resample all runs onto a shared time grid).
+        resample_rate: Samples per time unit for the shared time grid, if `time_alignment='resample'`
+            (default: median interval).
+        convert_to_actual_time: Convert CDF point numbers to time.
+        convert_seconds_to_minutes: Use minutes as time unit, rather than seconds.
+        csv_sep: CSV column separator.
+        block_rows: The number of rows to write per block (merged table only, see the module docstring).
+        jobs: The number of worker processes. Default is the number of CPUs.
+        verbose: Print more information.
+
+    Returns:
+        List of output files.
+    """
+    if time_alignment not in (None, 'resample'):
+        raise ValueError(f"Could not understand time_alignment {time_alignment!r}, must be None or 'resample'.")
+    if nan_correction not in NAN_CORRECTIONS:
+        raise ValueError(f"Could not understand nan_correction {nan_correction!r}, must be one of {NAN_CORRECTIONS}.")
+    cdf_files = get_cdf_files(cdf_files_or_dir)
+    if not cdf_files:
+        raise ValueError(f"No chromatogram files found in {cdf_files_or_dir!r}.")
+    ext = '.parquet' if output_format == 'parquet' else '.csv'
+    load_kwargs = dict(
+        convert_to_actual_time=convert_to_actual_time, convert_seconds_to_minutes=convert_seconds_to_minutes)
+    nan_kwargs = dict(
+        nan_correction=nan_correction, nan_fill_value=nan_fill_value, nan_interpolation_method=nan_interpolation_method)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if not merged:
+            tasks = [(fpath, fpath + ext, output_format, csv_sep, crop_range, nan_kwargs, load_kwargs)
+                     for fpath in cdf_files]
+            outputfns = []
+            for fn in executor.map(_write_chromatogram_file, tasks):
+                if verbose:
+                    print(f" - {fn}")
+                outputfns.append(fn)
+            return outputfns
+
+        columns, chromatograms = [get_time_header(**load_kwargs)], []
+        load_ds = uses_dataset_fields(runname_fmt)
+        loaded = executor.map(partial(_load_chromatogram, **load_kwargs), cdf_files)
+        for i, (fpath, xs, ys, samplename) in enumerate(loaded):
+            if verbose:
+                print(f" - Loaded {fpath} ({len(xs)} points)")
+            ds = load_runname_dataset(fpath, convert_seconds_to_minutes) if load_ds else None
+            columns.append(format_runname(runname_fmt, i=i, fpath=fpath, samplename=samplename, ds=ds))
+            chromatograms.append((xs, ys))
+        if time_alignment == 'resample':
+            grid, values = resample_to_common_grid(chromatograms, target_rate=resample_rate)
+        else:
+            grid, values = join_on_time(chromatograms)
+        del chromatograms
+        if crop_range:
+            keep = (grid >= crop_range[0]) & (grid <= crop_range[1])
+            grid, values = grid[keep], values[keep]
+        grid, values = correct_nans(grid, values, **nan_kwargs)
+
+        def iter_blocks():
+            for start in range(0, len(grid), block_rows):
+                yield np.column_stack([grid[start:start + block_rows], values[start:start + block_rows]])
+
+        if verbose:
+            print(f"Writing {values.shape[1]} runs x {values.shape[0]} time points to {outputfn!r} ...")
+        if output_format == 'parquet':
+            write_parquet_blocks(outputfn, columns, iter_blocks())
+        else:
+            with open(outputfn, 'w') as fd:
+                fd.write(csv_sep.join(columns) + '\n')
+                # Blocks are formatted in parallel, and written in order.
+                # Only a few blocks per worker are submitted at a time, to limit memory usage:
+                blocks = iter_blocks()
+                fmts = (csv_float_format(grid.dtype), csv_float_format(values.dtype))
+                n_inflight = 2 * (jobs or os.cpu_count() or 1)
+                while True:
+                    block_group = list(islice(blocks, n_inflight))
+                    if not block_group:
+                        break
+                    for text in executor.map(_format_csv_block, block_group, repeat(csv_sep), repeat(fmts)):
+                        fd.write(text)
+    return [outputfn]
 
 
 @click.command()
@@ -20,8 +303,16 @@ from rsenv.hplcutils.io import load_hplc_aia_xr_dataframe
 @click.option('--nan-correction', default='dropna')
 @click.option('--nan-fill-value', default=0)
 @click.option('--nan-interpolation-method', default='linear')
+@click.option('--time-alignment', default=None, type=click.Choice(['resample']),
+              help="Use 'resample' to resample all runs onto a shared time grid, instead of joining on time index.")
+@click.option('--resample-rate', default=None, type=float,
+              help="Samples per time unit for the shared time grid. Default is the median sampling interval.")
 @click.option('--sort-columns/--no-sort-columns')
 @click.option('--csv-sep', '-s', default=',')
+@click.option('--merged/--separate-files', default=True,
+              help="Write a single, merged table (default), or one output file per input file.")
+@click.option('--output-format', default='csv', type=click.Choice(['csv', 'parquet']))
+@click.option('--jobs', '-j', default=None, type=int, help="Number of worker processes. Default is number of CPUs.")
 @click.option('--verbose', '-v', count=True)
 def cdf_csv_cli(
         cdf_files_or_dir,
@@ -30,14 +321,21 @@ def cdf_csv_cli(
         selection_method="glob",
         sort_columns=False,
         nan_correction='dropna', nan_fill_value=0, nan_interpolation_method='linear',
+        time_alignment=None, resample_rate=None,
         runname_fmt="{i:02} {ds.sample_name}",
         crop_range=None,
+        convert_to_actual_time=True, convert_seconds_to_minutes=True,
         csv_sep=',',
+        merged=True,
+        output_format='csv',
+        jobs=None,
         verbose=0,
 ):
     """ CLI to convert a list of CDF files to a single csv file.
-    Basically just a wrapper around `rsenv.hplcutils.io.load_hplc_aia_xr_dataframe()`
-    with a `df.to_csv()` afterwards.
+
+    By default, files are decoded in parallel and streamed to the output file, see `convert_chromatogram_files()`.
+    If `selection_query` or `sort_columns` is given, the conversion is done using
+    `rsenv.hplcutils.io.load_hplc_aia_xr_dataframe()` with a `df.to_csv()` afterwards.
 
     Args:
         cdf_files_or_dir:
@@ -46,41 +344,71 @@ def cdf_csv_cli(
         nan_correction:
         nan_fill_value:
         nan_interpolation_method:
+        time_alignment: Use 'resample' to resample all runs onto a shared time grid (instead of joining).
+        resample_rate: Samples per time unit for the shared time grid, if `time_alignment='resample'`.
         runname_fmt:
+        convert_to_actual_time: Convert the time axis from point numbers to time.
+        convert_seconds_to_minutes: Use minutes as time unit.
         crop_range:
             Which name is better?
             'signal_crop_range', 'signal_range_crop', 'crop_signal_range'?
             'crop_range', 'crop_signal', 'signal_range' ?
         selection_query:
         selection_method:
+        merged: Write a single merged table. If False, write one file per input file (next to the input file).
+        output_format: 'csv' or 'parquet' (requires pyarrow).
+        jobs: The number of worker processes to use.
 
     Returns:
 
     """
 
     # We can provide either cdf files directly, or directories containing cdf files (e.g. AIA data exports).
+    ext = '.parquet' if output_format == 'parquet' else '.csv'
     if outputfn is None:
         # If a single file/directory is given, use that as filename basis, otherwise use a generic output filename.
         if len(cdf_files_or_dir) == 1:
-            outputfn = cdf_files_or_dir[0] + '.csv'
+            outputfn = cdf_files_or_dir[0] + ext
         else:
-            outputfn = "converted_cdf_files.csv"
+            outputfn = "converted_cdf_files" + ext
 
-    df = load_hplc_aia_xr_dataframe(
-        cdf_files_or_dir,
-        runname_fmt=runname_fmt,
-        selection_query=selection_query, selection_method=selection_method, sort_columns=sort_columns,
-        convert_to_actual_time=True, convert_seconds_to_minutes=True,
-        nan_correction=nan_correction, nan_fill_value=nan_fill_value, nan_interpolation_method=nan_interpolation_method,
-        signal_range_crop=crop_range,
-        verbose=verbose,
-    )
-    if os.path.exists(outputfn):
-        answer = input(f"Output filename {outputfn!r} already exists! Overwrite? [Y/n] ")
+    if merged:
+        existing = [outputfn] if os.path.exists(outputfn) else []
+    else:
+        existing = [fpath + ext for fpath in get_cdf_files(cdf_files_or_dir) if os.path.exists(fpath + ext)]
+    if existing:
+        if len(existing) == 1:
+            answer = input(f"Output filename {existing[0]!r} already exists! Overwrite? [Y/n] ")
+        else:
+            answer = input(f"{len(existing)} output files already exist, e.g. {existing[0]!r}! Overwrite? [Y/n] ")
         if answer and answer.lower()[0] == 'n':
             print("Aborting...")
             return
-    df.to_csv(outputfn)
+
+    if selection_query or sort_columns:
+        if output_format != 'csv' or not merged:
+            raise click.UsageError("Selection queries and column sorting are only supported for merged CSV output.")
+        df = load_hplc_aia_xr_dataframe(
+            cdf_files_or_dir,
+            runname_fmt=runname_fmt,
+            selection_query=selection_query, selection_method=selection_method, sort_columns=sort_columns,
+            convert_to_actual_time=convert_to_actual_time, convert_seconds_to_minutes=convert_seconds_to_minutes,
+            nan_correction=nan_correction, nan_fill_value=nan_fill_value, nan_interpolation_method=nan_interpolation_method,
+            time_alignment=time_alignment, resample_rate=resample_rate,
+            signal_range_crop=crop_range,
+            verbose=verbose,
+        )
+        df.to_csv(outputfn, sep=csv_sep)
+        return
+
+    convert_chromatogram_files(
+        cdf_files_or_dir, outputfn=outputfn, merged=merged, output_format=output_format,
+        runname_fmt=runname_fmt, crop_range=crop_range,
+        nan_correction=nan_correction, nan_fill_value=nan_fill_value, nan_interpolation_method=nan_interpolation_method,
+        time_alignment=time_alignment, resample_rate=resample_rate,
+        convert_to_actual_time=convert_to_actual_time, convert_seconds_to_minutes=convert_seconds_to_minutes,
+        csv_sep=csv_sep, jobs=jobs, verbose=verbose,
+    )
 
 
 if __name__ == '__main__':
@@ -50,11 +50,19 @@ logger = logging.getLogger(__name__)
 @click.option('--nan-correction', default='dropna')
 @click.option('--nan-fill-value', default=0)
 @click.option('--nan-interpolation-method', default='linear')
+@click.option('--time-alignment', default=None, type=click.Choice(['resample']),
+              help="Use 'resample' to resample all runs onto a shared time grid, instead of joining on time index.")
+@click.option('--resample-rate', default=None, type=float,
+              help="Samples per time unit for the shared time grid. Default is the median sampling interval.")
 @click.option('--baseline-correction', default='minimum')
 @click.option('--normalize/--no-normalize', default=False, help="Normalize the chromatograms to range 0..1.")
 # Output options
 @click.option('--fnprefix', default=None, help="A common prefix to use when creating filenames.")
 @click.option('--selection-str', default='', help="An additional specifier to change output filenames.")
+# Peak table options:
+@click.option('--peak-table-fn', default=None,
+              help="Detect and integrate peaks in all chromatograms, and save the peak table to this csv file.")
+@click.option('--peak-rel-threshold', default=0.05, help="Peak detection threshold, relative to the largest peak.")
 # Pseudogel options:
 @click.option('--make-pseudogel/--no-make-pseudogel', default=False, help="Enable/disable pseudogel visualization.")
 @click.option('--outputfn', default="{fnprefix}{selection_str}-ds{downsampling}_pseudogel.png",
@@ -62,6 +70,10 @@ logger = logging.getLogger(__name__)
 @click.option('--gel-blur', default=None, type=float)
 @click.option('--flip-v/--no-flip-v', default=False, help="Flip image, so the earliest peaks are at the bottom.")
 @click.option('--invert-image/--no-invert-image', default=True, help="Use inverted image (black bands on white).")
+@click.option('--trim-signals/--no-trim-signals', default=None,
+              help="Trim signals to a multiple of the downsampling factor, if needed. Default is to ask.")
+@click.option('--confirm-nan/--no-confirm-nan', default=True,
+              help="Ask before continuing if the chromatograms data contains NaN values.")
 @click.option('--contrast-percentiles', default=None, nargs=2, type=float,
               help="Contrast range, values in 0.0--1.0. Default is (0.0, 1.0). Upper limit of 0.995 is usually good.")
 # Gel pyplot.imshow options:
@@ -100,6 +112,8 @@ def hplc_cli(
         nan_correction='dropna',  # 'fill', 'interpolate', or 'dropna'.
         nan_fill_value=0,
         nan_interpolation_method='linear',
+        time_alignment=None,
+        resample_rate=None,
         baseline_correction='minimum',
         normalize=False,
         # Shared output options:
@@ -107,6 +121,9 @@ def hplc_cli(
         selection_str='',  # Change the "{selection_str}" variable using when formatting output filenames.
         # Fractions:
         fractions_file=None,
+        # Peak table:
+        peak_table_fn=None,
+        peak_rel_threshold=0.05,
         # Chromatogram plotting options:
         plot_chromatograms=True,
         interactive_chromatograms_plot=None,
@@ -118,6 +135,8 @@ def hplc_cli(
         flip_v=False,
         invert_image=True,
         contrast_percentiles=None,
+        trim_signals=None,
+        confirm_nan=True,
         outputfn="{fnprefix}{selection_str}-ds{downsampling}_pseudogel.{ext}",  # Plain pseudogel PNG image output.
         pyplot_show=True,  # TODO: This actually toggles whether to create the annotated gel plot, now just show it.
         pyplot_show_adjusted=True,
@@ -159,8 +178,14 @@ def hplc_cli(
         nan_correction:
         nan_fill_value:
         nan_interpolation_method:
+        time_alignment: Use 'resample' to resample all chromatograms onto a shared time grid.
+            This avoids NaN values when the runs have slightly different time axes.
+        resample_rate: Samples per time unit for the shared time grid, if `time_alignment='resample'`.
         baseline_correction: Perform this baseline correction to the signal before creating a lane from it.
         normalize: Normalize chromatograms.
+        peak_table_fn: Detect and integrate peaks (after `baseline_correction`), and save the peak table to this file.
+            If a fractions file is used, the peaks are joined with the fraction collection table.
+        peak_rel_threshold: Peak detection threshold, as a fraction of the largest peak in each chromatogram.
         make_pseudogel: Enable pseudogel creation from the lane profiles.
         gel_blur: Add this amount of gaussian blur filtering to the pseudogel.
         flip_v: Flip the pseudogel vertically, so the most retarded species are at the top of the gel (like a PAGE gel).
@@ -168,6 +193,8 @@ def hplc_cli(
             For pyplot_show, this can also be controlled by specifying a reversed/inverted colormap, e.g. greys_r.
             But obviously that doesn't change the "clean", un-annotated pseudogel.
         contrast_percentiles: The contrast range in percentiles.
+        trim_signals: Trim signals to a multiple of `signal_downsampling`. If None, the user is asked, if needed.
+        confirm_nan: Ask the user before continuing, if the chromatograms data contains NaN values.
         fnprefix: A constant prefix, used as "{fnprefix}" variable when formatting output filenames.
         selection_str: Change the "{selection_str}" variable using when formatting output filenames.
         outputfn: Save the generated pseudogel to this filename.
@@ -252,10 +279,22 @@ def hplc_cli(
         reset_xmin_xmax=reset_input_tmin_tmax,
         convert_to_actual_time=convert_to_actual_time, convert_seconds_to_minutes=convert_seconds_to_minutes,
         nan_correction=nan_correction, nan_fill_value=nan_fill_value, nan_interpolation_method=nan_interpolation_method,
+        time_alignment=time_alignment, resample_rate=resample_rate,
         signal_range_crop=crop_range,
         verbose=verbose,
     )
 
+    if peak_table_fn:
+        # Integrate peaks before normalization, so peak areas are in actual signal units.
+        from .peaks import find_and_integrate_peaks, join_peaks_with_fractions
+        peaks_df = find_and_integrate_peaks(
+            df, baseline_correction=baseline_correction, rel_threshold=peak_rel_threshold)
+        if fractions_df is not None:
+            peaks_df = join_peaks_with_fractions(peaks_df, fractions_df)
+        peak_table_fn = peak_table_fn.format(**dict(fmt_params, downsampling=1))
+        print(f"Saving peak table ({len(peaks_df)} peaks) to file {peak_table_fn!r} ...")
+        peaks_df.to_csv(peak_table_fn, index=False)
+
     if normalize:
         df = df / df.max()
 
@@ -293,6 +332,8 @@ def hplc_cli(
             out_signals=out_signals,  # Capture downsampled signals for QA/debugging.
             pyplot_show=False,
             print_samplenames=print_samplenames,
+            trim_signals=trim_signals,
+            confirm_nan=confirm_nan,
             verbose=verbose,
         )
         if not gel_array.shape[0] * signal_downsampling == len(df):  # len(df) is number of rows.
@@ -16,4 +16,69 @@ Anything that can be read directly from a file to the correct data format is in
 
 
 
-"""
\ No newline at end of file
+"""
+
+import numpy as np
+
+
+def get_common_time_grid(timeaxes, target_rate=None, span='intersection'):
+    """ Determine a single, regular time grid that can be shared by all the given time axes.
+
+    Args:
+        timeaxes: A list of 1D time axes (arrays), one for each chromatogram/run.
+        target_rate: The desired number of samples per time unit (same unit as the time axes).
+            If None, the median sampling interval over all runs is used.
+        span: How to determine start/end of the grid. Must be one of:
+            'intersection': Only the time range covered by all runs (no extrapolation, default).
+            'union': The time range covered by any run (runs are padded with their edge values).
+
+    Returns:
+        grid, a 1D float64 array with regularly spaced time points.
+    """
+    timeaxes = [np.asarray(t, dtype=np.float64) for t in timeaxes]
+    if len(timeaxes) == 0:
+        raise ValueError("Cannot determine a common time grid without any time axes.")
+    if span == 'intersection':
+        tmin = max(t[0] for t in timeaxes)
+        tmax = min(t[-1] for t in timeaxes)
+    elif span == 'union':
+        tmin = min(t[0] for t in timeaxes)
+        tmax = max(t[-1] for t in timeaxes)
+    else:
+        raise ValueError(f"Could not understand span {span!r}, must be 'intersection' or 'union'.")
+    if tmax <= tmin:
+        raise ValueError(f"The time axes do not overlap (tmin={tmin}, tmax={tmax}), cannot create a common grid.")
+    if target_rate:
+        interval = 1.0 / target_rate
+    else:
+        # Median of all sampling intervals is robust against a few irregular samples:
+        interval = float(np.median(np.concatenate([np.diff(t) for t in timeaxes])))
+    n_points = int(np.floor((tmax - tmin) / interval + 1e-9)) + 1
+    grid = tmin + np.arange(n_points) * interval
+    grid[-1] = min(grid[-1], tmax)  # Guard against floating point round-off at the end of the grid.
+    return grid
+
+
+def resample_to_common_grid(chromatograms, grid=None, target_rate=None, span='intersection', dtype=np.float32):
+    """ Resample a list of chromatograms onto a single, shared time grid using linear interpolation (`np.interp`).
+
+    This avoids having to outer-join chromatograms with slightly different time axes into a single DataFrame,
+    which produces a large, sparse intermediate with NaN values that must then be dropped or interpolated.
+
+    Args:
+        chromatograms: A list of (xs, ys) tuples, one for each run.
+        grid: The time grid to resample to. If None, a grid is created with `get_common_time_grid()`.
+        target_rate: Passed to `get_common_time_grid()`, if `grid` is not given.
+        span: Passed to `get_common_time_grid()`, if `grid` is not given.
+        dtype: The dtype of the returned values array.
+
+    Returns:
+        (grid, values) tuple, where `values` is a dense (time x runs) array.
+    """
+    chromatograms = list(chromatograms)
+    if grid is None:
+        grid = get_common_time_grid([xs for xs, ys in chromatograms], target_rate=target_rate, span=span)
+    values = np.empty((len(grid), len(chromatograms)), dtype=dtype)
+    for i, (xs, ys) in enumerate(chromatograms):
+        values[:, i] = np.interp(grid, np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+    return grid, values
@@ -96,6 +96,8 @@ def make_gel_from_datasets(
         add_lane_annotations=True,
         print_samplenames=False,
         out_params=None, out_signals=None,
+        trim_signals=None,
+        confirm_nan=True,
         verbose=0,
 ):
     """ Make a 2D 'pseudogel' image from a list of 1D chromatogram signals.
@@ -112,6 +114,9 @@ def make_gel_from_datasets(
         pyplot_show: Show the generated gel using pyplot.
         add_lane_annotations: Add lane annotations to the figure shown with pyplot.
         out_params: If you want to capture psuedogel generation parameters, provide a dict and they will be saved here.
+        trim_signals: Whether to trim signals to the nearest multiple of `signal_downsampling`, if needed.
+            If None (default), the user is asked interactively. Use True/False for non-interactive use.
+        confirm_nan: Ask the user before continuing, if `data` contains NaN values. Use False for non-interactive use.
 
     Returns:
         gel_array, 2D numpy array.
@@ -163,7 +168,8 @@ def make_gel_from_datasets(
                 logger.warning("data.values for sample %s contains NaN values!")
                 print(f"WARNING: NaN values in data.values!")
                 print(np.where(np.isnan(data.values)))
-            input("Continue?")
+            if confirm_nan:
+                input("Continue?")
         signals = data.values.T
         print("signals.shape:", signals.shape)
     else:
@@ -201,7 +207,10 @@ def make_gel_from_datasets(
         except AssertionError as exc:
             print(f"ERROR, unable to downsample signal of length {lane_height} by factor {signal_downsampling}!"
                   f" (remainder: {downsampling_remainder})""")
-            do_trim = input(f"Trim signals by {downsampling_remainder} to nearest multiple of {signal_downsampling}? [Y/n]")
+            if trim_signals is None:
+                do_trim = input(f"Trim signals by {downsampling_remainder} to nearest multiple of {signal_downsampling}? [Y/n]")
+            else:
+                do_trim = 'y' if trim_signals else 'n'
             if do_trim and do_trim.lower()[0] == 'n':
                 raise exc
             else:
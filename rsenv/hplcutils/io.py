@@ -31,6 +31,7 @@ xr = xarray
 import glob
 
 from rsenv.utils.query_parsing import get_cand_idxs_matching_expr, translate_all_requests_to_idxs
+from .dataconversion import resample_to_common_grid
 
 
 def load_cdf_data(filename, verbose=0):
@@ -160,6 +161,39 @@ def load_cdf_files(cdf_files_or_aia_dir, dir_glob='*.cdf', verbose=0):
     return [load_cdf_data(fn) for fn in cdf_files]
 
 
+def load_chromatogram_xy(
+        fpath, convert_to_actual_time=True, convert_seconds_to_minutes=True, reset_xmin_xmax=False, verbose=0,
+):
+    """ Load a single chromatogram from a CDF file or a raw Agilent ChemStation VWD .ch file.
+
+    Args:
+        fpath: The .cdf or .ch file to load.
+        convert_to_actual_time: Convert CDF point numbers to time (.ch files always use actual time).
+        convert_seconds_to_minutes: Use minutes, rather than seconds, as time unit.
+        reset_xmin_xmax: For .ch files, start the time axis at 0.0 (see `read_vwd_fh`).
+        verbose: Print information while loading.
+
+    Returns:
+        (xs, ys, samplename) tuple, with xs and ys as 1D numpy arrays.
+    """
+    time_unit = 'minutes' if convert_seconds_to_minutes else 'seconds'
+    if verbose:
+        print(f"Loading chromatogram from file {fpath!r} ...")
+    if str(fpath).lower().endswith('.ch'):
+        from .agilent.hpcs_vwd import read_agilent_1200_vwd_ch
+        data = read_agilent_1200_vwd_ch(fpath, time_unit=time_unit, reset_xmin_xmax=reset_xmin_xmax, use_mmap=True)
+        return data['timepoints'], data['signal_values'], data['metadata']['samplename']
+    with xr.open_dataset(fpath) as ds:
+        xs = ds['point_number'].values.astype(float)
+        ys = ds['ordinate_values'].values
+        if convert_to_actual_time:
+            xs = xs * float(ds['actual_sampling_interval'])
+            if convert_seconds_to_minutes:
+                xs /= 60
+        samplename = ds.attrs.get('sample_name')
+    return xs, ys, samplename
+
+
 def load_fractions_csv_file(filename, verbose=0):
     """ Load Agilent ChemStation fraction collection file, e.g. `RepAFC01.CSV`.
 
@@ -261,6 +295,7 @@ def load_hplc_aia_xr_dataframe(
         reset_xmin_xmax=False,
         convert_to_actual_time=False, convert_seconds_to_minutes=True,
         nan_correction='dropna', nan_fill_value=0, nan_interpolation_method='linear',
+        time_alignment=None, resample_rate=None, resample_span='intersection',
         signal_range_crop=None,
         verbose=0,
 ):
@@ -281,6 +316,15 @@ def load_hplc_aia_xr_dataframe(
             i.e. the data was recorded with different sampling frequency.
         nan_fill_value: The NaN fill value to use, if `nan_correction='fill'`.
         nan_interpolation_method: The NaN interpolation method, if `nan_correction='interpolate'`.
+        time_alignment: How to align runs with different time axes. Must be one of:
+            None: Outer-join the runs on their time index (NaN values are handled by `nan_correction`).
+            'resample': Resample all runs onto a single, shared time grid using linear interpolation.
+                This produces a dense (time x runs) float32 DataFrame without any NaN values.
+                See `rsenv.hplcutils.dataconversion.resample_to_common_grid()`.
+        resample_rate: The number of samples per time unit for the shared grid, if `time_alignment='resample'`.
+            If None, the median sampling interval of the runs is used.
+        resample_span: Whether the shared grid should cover the 'intersection' (default) or the 'union'
+            of the runs' time ranges, if `time_alignment='resample'`.
         runname_fmt: How to format each column name.
             Available variables include: `i` and `ds`, where `ds` is the xarray dataset,
             with all attributes provided by the ChemStation export.
@@ -327,7 +371,7 @@ def load_hplc_aia_xr_dataframe(
             print(f"Reading {fpath!r} as a raw Agilent HPLC data file...")
             # Raw Agilent ChemStation VWD .ch hplc data file
             from .agilent.hpcs_vwd import read_agilent_1200_vwd_ch
-            data = read_agilent_1200_vwd_ch(fpath, time_unit=time_unit, reset_xmin_xmax=reset_xmin_xmax)
+            data = read_agilent_1200_vwd_ch(fpath, time_unit=time_unit, reset_xmin_xmax=reset_xmin_xmax, use_mmap=True)
             ts = pd.Series(data=data['signal_values'], index=data['timepoints'])
             ts.index.name = f"Time / {time_unit}"
             print(f"- Formatting series/column name using runname_fmt {runname_fmt!r}")
@@ -363,8 +407,19 @@ def load_hplc_aia_xr_dataframe(
         series[columnname] = ts
 
     # Create DataFrame:
-    # TODO: How does Pandas deal with timeseries with differing indexes?
-    df = pd.DataFrame(data=series)
+    if time_alignment == 'resample':
+        # Resample all runs onto a shared time grid, instead of outer-joining the (slightly) different indexes:
+        grid, values = resample_to_common_grid(
+            [(ts.index.values, ts.values) for ts in series.values()],
+            target_rate=resample_rate, span=resample_span,
+        )
+        index_name = next(iter(series.values())).index.name if series else None
+        df = pd.DataFrame(data=values, index=pd.Index(grid, name=index_name), columns=list(series.keys()))
+    elif time_alignment:
+        raise ValueError(f"Could not understand time_alignment {time_alignment!r}, must be None or 'resample'.")
+    else:
+        # Pandas outer-joins the series indexes, giving NaN values if the time axes differ:
+        df = pd.DataFrame(data=series)
 
     # Crop signal range (time axis), and select columns if we have a query selection request.
     if signal_range_crop:
@@ -0,0 +1,206 @@
+# Copyright 2026 Rasmus Scholer Sorensen
+
+"""
+
+Module for detecting and integrating peaks in HPLC chromatograms.
+
+All chromatograms are processed together, as a single (time x runs) matrix,
+e.g. the values of the DataFrame returned by `rsenv.hplcutils.io.load_hplc_aia_xr_dataframe()`.
+Baseline correction, peak detection, and integration are all done with vectorized numpy operations
+over the full matrix, instead of looping over runs (and data points) in Python.
+
+Peaks are detected as contiguous regions where the (baseline-corrected) signal is above a threshold,
+and integrated from the first to the last point in the region ("baseline-to-baseline" integration).
+Optionally, regions can be split at local minima ("valleys"), i.e. "drop perpendicular" integration
+of overlapping peaks. For noisy signals, use `smoothing` to avoid splitting peaks at noise minima.
+
+Example:
+
+    >>> df = load_hplc_aia_xr_dataframe("RS535.AIA", convert_to_actual_time=True, time_alignment='resample')
+    >>> peaks_df = find_and_integrate_peaks(df, rel_threshold=0.05)
+    >>> fractions_df = load_fractions_csv_file("RS535.AIA/RepAFC01.CSV")
+    >>> peaks_df = join_peaks_with_fractions(peaks_df, fractions_df)
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def baseline_correct_matrix(values, method='minimum'):
+    """ Perform baseline correction on all chromatograms in a (time x runs) matrix.
+
+    Args:
+        values: 2D array with one column for each chromatogram.
+        method: The baseline correction method. Must be one of:
+            'minimum': Subtract the minimum value of each chromatogram (same as in `make_gel_from_datasets()`).
+            'median': Subtract the median value of each chromatogram (good when peaks cover a small fraction).
+            None: No baseline correction.
+
+    Returns:
+        Baseline-corrected values, as a new array.
+    """
+    values = np.asarray(values)
+    if not method:
+        return values.copy()
+    if method == 'minimum':
+        baseline = np.nanmin(values, axis=0)
+    elif method == 'median':
+        baseline = np.nanmedian(values, axis=0)
+    else:
+        raise ValueError(f"Could not understand baseline correction method {method!r}.")
+    return values - baseline[np.newaxis, :]
+
+
+def _find_peak_regions(values, thresholds, split_valleys=False, smoothing=None):
+    """ Find peak regions, returning (runs, starts, ends) arrays, with `ends` being exclusive.
+
+    Regions are returned sorted by run, then by start position.
+    """
+    n_points, n_runs = values.shape
+    # Pad each run with a False at both ends, so regions never span two runs:
+    above = np.zeros((n_runs, n_points + 2), dtype=np.int8)
+    above[:, 1:-1] = (values > thresholds[np.newaxis, :]).T
+    edges = np.diff(above, axis=1)
+    start_runs, starts = np.nonzero(edges == 1)
+    end_runs, ends = np.nonzero(edges == -1)
+    if split_valleys:
+        signal = values
+        if smoothing and smoothing > 1:
+            from scipy.ndimage import uniform_filter1d
+            signal = uniform_filter1d(values, size=int(smoothing), axis=0, mode='nearest')
+        is_valley = np.zeros(values.shape, dtype=bool)
+        is_valley[1:-1] = (signal[1:-1] < signal[:-2]) & (signal[1:-1] <= signal[2:]) & (above[:, 2:-2].T == 1)
+        # A valley point is shared by the regions on either side, so the areas of split regions sum to
+        # the area of the unsplit region (the region to the left ends with the valley point, inclusive):
+        valley_pos, valley_runs = np.nonzero(is_valley)
+        start_runs, starts = np.concatenate([start_runs, valley_runs]), np.concatenate([starts, valley_pos])
+        end_runs, ends = np.concatenate([end_runs, valley_runs]), np.concatenate([ends, valley_pos + 1])
+        start_order = np.lexsort((starts, start_runs))
+        end_order = np.lexsort((ends, end_runs))
+        start_runs, starts = start_runs[start_order], starts[start_order]
+        end_runs, ends = end_runs[end_order], ends[end_order]
+    assert np.array_equal(start_runs, end_runs)
+    return start_runs, starts, ends
+
+
+def find_and_integrate_peaks(
+        data, timepoints=None, runnames=None,
+        baseline_correction='minimum',
+        threshold=None, rel_threshold=0.05,
+        min_points=3,
+        split_valleys=False, smoothing=None,
+):
+    """ Detect and integrate peaks in all chromatograms in a single vectorized pass.
+
+    Args:
+        data: DataFrame with one column for each run and time as index (e.g. from `load_hplc_aia_xr_dataframe`),
+            or a 2D (time x runs) array, in which case `timepoints` should also be given.
+        timepoints: The time axis (only used if `data` is not a DataFrame). Default is a range 0..N.
+        runnames: Names of the runs (only used if `data` is not a DataFrame). Default is the column number.
+        baseline_correction: Baseline correction method, see `baseline_correct_matrix()`.
+        threshold: Absolute signal threshold (after baseline correction) for detecting peaks.
+            Either a scalar or one value for each run.
+        rel_threshold: If `threshold` is not given, use this fraction of each run's maximum as threshold.
+        min_points: Discard peaks with fewer than this number of data points (removes noise spikes).
+        split_valleys: Split peak regions at local minima, to integrate overlapping peaks separately.
+        smoothing: Window size (in points) for the moving average used to find valleys, if `split_valleys`.
+
+    Returns:
+        Pandas DataFrame with one row for each peak, with columns:
+            'run', 'peak', 'retention_time', 'start_time', 'end_time', 'height', 'area', 'rel_area'.
+        Peak areas are in units of signal x time (same time unit as the DataFrame index).
+    """
+    if isinstance(data, pd.DataFrame):
+        timepoints = data.index.values
+        runnames = list(data.columns)
+        values = data.values
+    else:
+        values = np.asarray(data)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+    n_points, n_runs = values.shape
+    if timepoints is None:
+        timepoints = np.arange(n_points)
+    if runnames is None:
+        runnames = list(range(n_runs))
+    timepoints = np.asarray(timepoints, dtype=np.float64)
+    values = baseline_correct_matrix(values.astype(np.float64), method=baseline_correction)
+
+    if threshold is None:
+        thresholds = rel_threshold * np.nanmax(values, axis=0)
+    else:
+        thresholds = np.broadcast_to(np.asarray(threshold, dtype=np.float64), (n_runs,))
+
+    runs, starts, ends = _find_peak_regions(values, thresholds, split_valleys=split_valleys, smoothing=smoothing)
+    keep = (ends - starts) >= max(min_points, 1)
+    runs, starts, ends = runs[keep], starts[keep], ends[keep]
+
+    # Peak heights and positions, using the run-contiguous flattened values:
+    flat = np.append(values.T.ravel(), 0.0)  # Extra element, so reduceat can use the final end index.
+    flat_starts, flat_ends = runs * n_points + starts, runs * n_points + ends
+    bounds = np.empty(2 * len(runs), dtype=np.intp)
+    bounds[0::2], bounds[1::2] = flat_starts, flat_ends
+    heights = np.maximum.reduceat(flat, bounds)[0::2] if len(runs) else np.empty(0)
+    # Label each point with its peak number, and find the first point in each peak equal to the peak height:
+    markers = np.zeros(len(flat) + 1, dtype=np.intp)
+    np.add.at(markers, flat_starts, 1)
+    np.add.at(markers, flat_ends, -1)
+    inside = np.cumsum(markers)[:-1] > 0
+    start_markers = np.zeros(len(flat), dtype=np.intp)
+    start_markers[flat_starts] = 1
+    labels = np.clip(np.cumsum(start_markers) - 1, 0, None)
+    is_top = inside & (flat == (heights[labels] if len(runs) else np.nan))
+    _, first_top = np.unique(labels[is_top], return_index=True)
+    apex = np.flatnonzero(is_top)[first_top] - runs * n_points
+
+    # Trapezoid integration, using the cumulative integral of each run:
+    dt = np.diff(timepoints)[:, np.newaxis]
+    cumarea = np.zeros(values.shape)
+    cumarea[1:] = np.cumsum(0.5 * (values[1:] + values[:-1]) * dt, axis=0)
+    areas = cumarea[ends - 1, runs] - cumarea[starts, runs]
+    run_totals = np.bincount(runs, weights=areas, minlength=n_runs)
+
+    peak_numbers = np.arange(len(runs)) - np.searchsorted(runs, runs)  # Peak number within each run.
+    return pd.DataFrame({
+        'run': [runnames[r] for r in runs],
+        'peak': peak_numbers,
+        'retention_time': timepoints[apex],
+        'start_time': timepoints[starts],
+        'end_time': timepoints[ends - 1],
+        'height': heights,
+        'area': areas,
+        'rel_area': areas / np.where(run_totals[runs] > 0, run_totals[runs], 1),
+    })
+
+
+def join_peaks_with_fractions(peaks_df, fractions_df, time_column='retention_time'):
+    """ Add fraction collection information to a peak table, for peaks eluting within a collected fraction.
+
+    Args:
+        peaks_df: Peak table, from `find_and_integrate_peaks()`.
+        fractions_df: Fraction collection table, from `rsenv.hplcutils.io.load_fractions_csv_file()`.
+            The fractions must use the same time unit as the peak table (ChemStation uses minutes).
+        time_column: The peak table column to match against the fraction start/end times.
+
+    Returns:
+        Copy of peaks_df, with additional columns 'fraction', 'well', 'fraction_start', and 'fraction_end'.
+        Peaks that were not collected in any fraction have missing (NaN/None) values in these columns.
+    """
+    fractions = fractions_df.reset_index().sort_values('start')
+    fraction_numbers = fractions.iloc[:, 0].values  # First index level is the fraction number.
+    fstarts, fends = fractions['start'].values.astype(float), fractions['end'].values.astype(float)
+    out = peaks_df.copy()
+    if len(fractions) == 0:
+        out['fraction'], out['well'], out['fraction_start'], out['fraction_end'] = None, None, np.nan, np.nan
+        return out
+    times = peaks_df[time_column].values.astype(float)
+    # The candidate fraction is the last fraction starting before the peak time:
+    idx = np.searchsorted(fstarts, times, side='right') - 1
+    safe_idx = np.clip(idx, 0, None)
+    matched = (idx >= 0) & (times <= fends[safe_idx])
+    out['fraction'] = np.where(matched, fraction_numbers[safe_idx], None)
+    out['well'] = np.where(matched, fractions['well'].values[safe_idx], None)
+    out['fraction_start'] = np.where(matched, fstarts[safe_idx], np.nan)
+    out['fraction_end'] = np.where(matched, fends[safe_idx], np.nan)
+    return out
@@ -0,0 +1,275 @@
+# Copyright 2026 Rasmus Scholer Sorensen
+
+"""
+
+Module for finding similar chromatograms in a library of earlier HPLC runs.
+
+Each chromatogram is converted to a "fingerprint": a fixed-length vector, obtained by
+resampling the baseline-corrected signal onto a fixed time grid (bin averages), normalized to unit length.
+The fingerprints of all runs in the library are stored as rows in a single numpy matrix,
+so a query against the whole library is just a single matrix-vector (or matrix-matrix) product,
+which numpy delegates to BLAS.
+
+The index is saved as two files next to the chromatogram library:
+    `<index_name>.npy`   - The fingerprint matrix (float32, runs x n_points), can be loaded memory-mapped.
+    `<index_name>.json`  - Run names, source files, and fingerprint parameters.
+
+Example:
+
+    >>> index = ChromatogramIndex(time_range=(0, 30))
+    >>> index.add_files(glob.glob("HPLC-data/**/*.cdf", recursive=True))
+    >>> index.save("HPLC-data/chromatograms-index")
+    >>> index = ChromatogramIndex.load("HPLC-data/chromatograms-index")
+    >>> index.query("RS535a.AIA/RS535a_01.cdf", k=10, metric='correlation')
+
+Or from the command line:
+
+    $ hplc-similarity build HPLC-data/chromatograms-index HPLC-data/ --time-range 0 30
+    $ hplc-similarity query HPLC-data/chromatograms-index RS535a.AIA/RS535a_01.cdf -k 10
+
+"""
+
+import os
+import json
+import click
+import numpy as np
+
+from .io import get_cdf_files, load_chromatogram_xy
+
+
+def chromatogram_fingerprint(xs, ys, time_range, n_points=512, oversampling=8, baseline_correction='minimum'):
+    """ Create a fixed-length, normalized fingerprint vector from a chromatogram.
+
+    Args:
+        xs: Chromatogram time points.
+        ys: Chromatogram signal values.
+        time_range: (start, end) tuple, the time range covered by the fingerprint.
+        n_points: The length of the fingerprint vector.
+        oversampling: The signal is interpolated at `n_points * oversampling` points, which are then
+            averaged in bins of `oversampling` points. This prevents sharp peaks from being missed.
+        baseline_correction: 'minimum' to subtract the minimum value, or None.
+
+    Returns:
+        float32 numpy array of length `n_points`, with unit length (or all zeros for a flat signal).
+    """
+    grid = np.linspace(time_range[0], time_range[1], n_points * oversampling)
+    values = np.interp(grid, np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64), left=np.nan, right=np.nan)
+    if baseline_correction == 'minimum':
+        values -= np.nanmin(values) if not np.all(np.isnan(values)) else 0
+    elif baseline_correction:
+        raise ValueError(f"Could not understand baseline correction method {baseline_correction!r}.")
+    values = np.nan_to_num(values)  # Time points outside the chromatogram are zero.
+    fingerprint = values.reshape(n_points, oversampling).mean(axis=1)
+    norm = np.linalg.norm(fingerprint)
+    if norm > 0:
+        fingerprint /= norm
+    return fingerprint.astype(np.float32)
+
+
+class ChromatogramIndex:
+    """ Index of chromatogram fingerprints, for finding similar runs using cosine similarity or correlation.
+
+    Attributes:
+        names: List of run names (one for each row in `fingerprints`).
+        sources: List of source files (one for each row in `fingerprints`).
+        fingerprints: float32 matrix (runs x n_points) with unit-length fingerprint rows.
+        params: dict with the fingerprint parameters (time_range, n_points, oversampling, baseline_correction).
+    """
+
+    def __init__(self, time_range=None, n_points=512, oversampling=8, baseline_correction='minimum'):
+        self.params = {
+            'time_range': list(time_range) if time_range is not None else None,
+            'n_points': n_points,
+            'oversampling': oversampling,
+            'baseline_correction': baseline_correction,
+        }
+        self.names = []
+        self.sources = []
+        self.fingerprints = np.empty((0, n_points), dtype=np.float32)
+        self._stats = None  # Row means and standard deviations, used for correlation queries.
+
+    def __len__(self):
+        return len(self.names)
+
+    def fingerprint(self, xs, ys):
+        """ Create fingerprint for a chromatogram using the index parameters. """
+        if self.params['time_range'] is None:
+            # Use the first chromatogram added to the index to define the time range:
+            self.params['time_range'] = [float(np.min(xs)), float(np.max(xs))]
+        return chromatogram_fingerprint(
+            xs, ys, time_range=self.params['time_range'], n_points=self.params['n_points'],
+            oversampling=self.params['oversampling'], baseline_correction=self.params['baseline_correction'],
+        )
+
+    def add(self, name, xs, ys, source=None):
+        """ Add a single chromatogram to the index. """
+        self.add_many([(name, xs, ys, source)])
+
+    def add_many(self, chromatograms):
+        """ Add many chromatograms to the index, given as an iterable of (name, xs, ys, source) tuples. """
+        names, sources, rows = [], [], []
+        for name, xs, ys, source in chromatograms:
+            names.append(name)
+            sources.append(source)
+            rows.append(self.fingerprint(xs, ys))
+        if rows:
+            self.fingerprints = np.vstack([self.fingerprints] + rows)
+            self.names.extend(names)
+            self.sources.extend(sources)
+            self._stats = None
+
+    def add_files(self, cdf_files_or_dirs, runname_fmt="{samplename} ({fn})", verbose=0):
+        """ Add chromatograms from CDF/.ch files (or directories with CDF files) to the index.
+
+        Args:
+            cdf_files_or_dirs: List of files, directories, or glob patterns, see `get_cdf_files()`.
+            runname_fmt: Format string for the run names, using variables `samplename`, `fn`, and `fpath`.
+            verbose: Print information while loading files.
+        """
+        def iter_chromatograms():
+            for fpath in get_cdf_files(cdf_files_or_dirs):
+                xs, ys, samplename = load_chromatogram_xy(fpath, verbose=verbose)
+                name = runname_fmt.format(samplename=samplename, fn=os.path.basename(fpath), fpath=fpath)
+                yield name, xs, ys, os.path.abspath(fpath)
+        self.add_many(iter_chromatograms())
+
+    def _row_stats(self):
+        if self._stats is None:
+            self._stats = (self.fingerprints.mean(axis=1), self.fingerprints.std(axis=1))
+        return self._stats
+
+    def similarities(self, query_fingerprints, metric='cosine'):
+        """ Calculate similarities between query fingerprints and all fingerprints in the index.
+
+        Args:
+            query_fingerprints: 2D array (queries x n_points) of unit-length fingerprints.
+            metric: 'cosine' or 'correlation' (Pearson correlation coefficient).
+
+        Returns:
+            2D float32 array (queries x runs) of similarity scores.
+        """
+        queries = np.atleast_2d(np.asarray(query_fingerprints, dtype=np.float32))
+        dots = queries @ self.fingerprints.T  # A single BLAS matrix product for all queries.
+        if metric == 'cosine':
+            return dots  # Fingerprints are normalized to unit length.
+        if metric == 'correlation':
+            n = self.fingerprints.shape[1]
+            means, stds = self._row_stats()
+            q_means, q_stds = queries.mean(axis=1), queries.std(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = (dots - n * np.outer(q_means, means)) / (n * np.outer(q_stds, stds))
+            return np.nan_to_num(corr)
+        raise ValueError(f"Could not understand similarity metric {metric!r}, must be 'cosine' or 'correlation'.")
+
+    def query_fingerprints(self, query_fingerprints, k=10, metric='cosine', batch_size=256):
+        """ Find the top-k most similar runs for each query fingerprint.
+
+        Args:
+            query_fingerprints: 2D array (queries x n_points) of fingerprints.
+            k: The number of matches to return for each query.
+            metric: 'cosine' or 'correlation'.
+            batch_size: The number of queries to process per matrix product (limits memory usage).
+
+        Returns:
+            List (one for each query) of lists with (name, score, source) tuples, best match first.
+        """
+        queries = np.atleast_2d(query_fingerprints)
+        k = min(k, len(self))
+        results = []
+        for batch_start in range(0, len(queries), batch_size):
+            scores = self.similarities(queries[batch_start:batch_start + batch_size], metric=metric)
+            if k == 0:
+                results.extend([] for _ in scores)
+                continue
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            for row_idxs, row_scores in zip(np.take_along_axis(top, order, axis=1),
+                                            np.take_along_axis(top_scores, order, axis=1)):
+                results.append([(self.names[i], float(score), self.sources[i])
+                                for i, score in zip(row_idxs, row_scores)])
+        return results
+
+    def query(self, query, k=10, metric='cosine'):
+        """ Find the top-k runs most similar to the query.
+
+        Args:
+            query: Either a run name in the index, a path to a CDF/.ch file, or a (xs, ys) tuple.
+            k: The number of matches to return.
+            metric: 'cosine' or 'correlation'.
+
+        Returns:
+            List of (name, score, source) tuples, best match first.
+        """
+        if isinstance(query, str) and query in self.names:
+            fingerprint = self.fingerprints[self.names.index(query)]
+        elif isinstance(query, (str, os.PathLike)):
+            xs, ys, _ = load_chromatogram_xy(query)
+            fingerprint = self.fingerprint(xs, ys)
+        else:
+            xs, ys = query
+            fingerprint = self.fingerprint(xs, ys)
+        return self.query_fingerprints(fingerprint[np.newaxis, :], k=k, metric=metric)[0]
+
+    def save(self, index_basename):
+        """ Save index to `<index_basename>.npy` (fingerprint matrix) and `<index_basename>.json` (names, params). """
+        np.save(index_basename + '.npy', self.fingerprints)
+        with open(index_basename + '.json', 'w') as fd:
+            json.dump({'params': self.params, 'names': self.names, 'sources': self.sources}, fd)
+
+    @classmethod
+    def load(cls, index_basename, mmap_mode=None):
+        """ Load index saved with `save()`. Use `mmap_mode='r'` to memory-map the fingerprint matrix. """
+        with open(index_basename + '.json') as fd:
+            data = json.load(fd)
+        index = cls(**data['params'])
+        index.names = data['names']
+        index.sources = data['sources']
+        index.fingerprints = np.load(index_basename + '.npy', mmap_mode=mmap_mode)
+        return index
+
+
+@click.group()
+def hplc_similarity_cli():
+    """ Build and query an index of chromatogram fingerprints, to find similar HPLC runs. """
+    pass
+
+
+@hplc_similarity_cli.command('build')
+@click.argument('index_basename')
+@click.argument('cdf_files_or_dir', nargs=-1, type=click.Path(exists=True))
+@click.option('--time-range', nargs=2, type=float, default=None, help="Time range (minutes) for the fingerprints.")
+@click.option('--n-points', default=512, help="Length of the fingerprint vectors.")
+@click.option('--update/--no-update', default=True, help="Add to an existing index, if it exists.")
+@click.option('--verbose', '-v', count=True)
+def build_index_cli(index_basename, cdf_files_or_dir, time_range=None, n_points=512, update=True, verbose=0):
+    """ Create (or update) a chromatogram fingerprint index from CDF/.ch files or AIA directories. """
+    if update and os.path.exists(index_basename + '.json'):
+        index = ChromatogramIndex.load(index_basename)
+        known_sources = set(index.sources)
+        cdf_files = [fpath for fpath in get_cdf_files(cdf_files_or_dir) if os.path.abspath(fpath) not in known_sources]
+    else:
+        index = ChromatogramIndex(time_range=time_range or None, n_points=n_points)
+        cdf_files = get_cdf_files(cdf_files_or_dir)
+    print(f"Adding {len(cdf_files)} chromatograms to index {index_basename!r} ...")
+    index.add_files(cdf_files, verbose=verbose)
+    index.save(index_basename)
+    print(f"Index now contains {len(index)} chromatograms.")
+
+
+@hplc_similarity_cli.command('query')
+@click.argument('index_basename')
+@click.argument('queries', nargs=-1)
+@click.option('-k', default=10, help="Number of matches to return for each query.")
+@click.option('--metric', default='cosine', type=click.Choice(['cosine', 'correlation']))
+def query_index_cli(index_basename, queries, k=10, metric='cosine'):
+    """ Find the runs in the index most similar to the given CDF/.ch files or run names. """
+    index = ChromatogramIndex.load(index_basename, mmap_mode='r')
+    for query in queries:
+        print(f"\n{query}:")
+        for name, score, source in index.query(query, k=k, metric=metric):
+            print(f"  {score:8.4f}  {name}  ({source})")
+
+
+if __name__ == '__main__':
+    hplc_similarity_cli()
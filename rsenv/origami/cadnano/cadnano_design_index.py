@@ -0,0 +1,289 @@
+# Copyright 2026, Rasmus Sorensen <rasmusscholer@gmail.com>
+"""
+
+Index of cadnano design files, for finding copies and revisions of the same design across the filesystem.
+
+Since cadnano writes a timestamp whenever it saves a file, file hashes cannot be used to find identical designs.
+Instead, the index stores the vstrands hashes (see `cadnano_json_hashing_cli`) for each cadnano file,
+together with some basic stats (number of helices and staples, lattice type).
+
+The index is updated incrementally: Only new files, and files whose size or mtime has changed, are loaded.
+Non-cadnano json files are also remembered, so they are not sniffed/validated again.
+Queries use a {hash: paths} map, so they don't need to look at the files at all:
+
+    >>> index = CadnanoDesignIndex.load("cadnano-index.json")
+    >>> index.update("~/Dropbox/designs", jobs=4)
+    >>> index.save()
+    >>> index.same_as("TR.ZZ-5nm-spaced-x60.json", hash_name="routing")
+    >>> index.duplicates("routing")
+
+CLI entry-point: cadnano-design-index
+
+    $ cadnano-design-index cadnano-index.json ~/Dropbox/designs --same-as "TR.ZZ-5nm-spaced-x60.json"
+
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import typer
+
+from rsenv.utils.hash_utils import str_hash_hexdigest
+from rsenv.origami.cadnano.cadnano_json_hashing_cli import DEFAULT_VSTRANDS_HASH_SPECS, VstrandsHasher
+from rsenv.origami.cadnano.cadnano_file_search import filter_cadnano_files, SNIFF_BYTES
+
+
+INDEX_VERSION = 1
+
+INDEX_HASH_SPECS = {
+    # Staple and scaffold routing, i.e. how the design will physically appear:
+    "routing": DEFAULT_VSTRANDS_HASH_SPECS["vstrands-stap-scaf-loops-skips"],
+    "routing-order-independent": DEFAULT_VSTRANDS_HASH_SPECS["vstrands-stap-scaf-loops-skips-oi"],
+    "without-colors": DEFAULT_VSTRANDS_HASH_SPECS["vstrands-without-colors"],
+    # Everything, i.e. routing and coloring:
+    "all-attributes": DEFAULT_VSTRANDS_HASH_SPECS["vstrands-all-attributes"],
+    "colors": {"include_keys": ['stap_colors', 'scaf_colors'], "allow_missing_include_keys": "exclude"},
+}
+
+
+def cadnano_lattice(vstrands):
+    """ Guess the lattice type from the vstrands array length (honeycomb = n*21 bases, square = n*32 bases). """
+    lengths = {len(vh['stap']) for vh in vstrands if 'stap' in vh}
+    if not lengths:
+        return None
+    honeycomb = all(length % 21 == 0 for length in lengths)
+    square = all(length % 32 == 0 for length in lengths)
+    if honeycomb == square:
+        return "unknown"
+    return "honeycomb" if honeycomb else "square"
+
+
+def count_strands(vstrands, strand_key='stap'):
+    """ Count the number of (non-circular) strands, by counting the 5' ends in vstrands[i][strand_key].
+
+    Each base is [prev_helix, prev_idx, next_helix, next_idx], with -1 for no previous/next base,
+    so a 5' end has prev_helix == -1 and next_helix != -1.
+    """
+    return sum(
+        1 for vh in vstrands for prev_vh, _, next_vh, _ in vh.get(strand_key, ())
+        if prev_vh == -1 and next_vh != -1
+    )
+
+
+def index_cadnano_file(filepath, hash_specs=None):
+    """ Return index record (dict) with the vstrands hashes and stats for a single cadnano file. """
+    if hash_specs is None:
+        hash_specs = INDEX_HASH_SPECS
+    with open(filepath) as fp:
+        jsonstr = fp.read()
+    jsondata = json.loads(jsonstr)
+    vstrands = jsondata['vstrands']
+    hashes = VstrandsHasher(vstrands).hash_specs(hash_specs)
+    hashes["file"] = str_hash_hexdigest(jsonstr)
+    return {
+        "name": jsondata.get('name'),
+        "hashes": hashes,
+        "n_helices": len(vstrands),
+        "n_staples": count_strands(vstrands, 'stap'),
+        "lattice": cadnano_lattice(vstrands),
+    }
+
+
+def _try_index_cadnano_file(filepath, hash_specs=None):
+    """ Return (record, None), or (None, error message) if the file could not be indexed. """
+    try:
+        return index_cadnano_file(filepath, hash_specs=hash_specs), None
+    except (KeyError, TypeError, ValueError, IOError) as exc:
+        return None, f"Unable to index file '{filepath}': {exc!r}"
+
+
+def _file_stat(filepath):
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class CadnanoDesignIndex:
+
+    def __init__(self, index_file=None, hash_specs=None):
+        self.index_file = index_file
+        self.hash_specs = INDEX_HASH_SPECS if hash_specs is None else hash_specs
+        self.records = {}       # abspath -> record dict (see index_cadnano_file), plus size and mtime_ns.
+        self.non_cadnano = {}   # abspath -> [size, mtime_ns] for json files that are not cadnano files.
+        self._by_hash = {}      # hash_name -> {hexdigest: set of abspaths}, rebuilt lazily after updates.
+
+    @classmethod
+    def load(cls, index_file, hash_specs=None):
+        """ Load index from index_file, or create a new, empty index if the file does not exist.
+        If the index was created with other hash_specs, the records are discarded (and re-created on update).
+        """
+        index = cls(index_file=index_file, hash_specs=hash_specs)
+        if not os.path.exists(index_file):
+            return index
+        with open(index_file) as fp:
+            data = json.load(fp)
+        if data.get("version") == INDEX_VERSION:
+            if data.get("hash_specs") == json.loads(json.dumps(index.hash_specs)):
+                index.records = data["records"]
+            index.non_cadnano = data["non_cadnano"]
+        return index
+
+    def save(self, index_file=None):
+        """ Save index to JSON file (writing to a temporary file first, so the index is never left half-written). """
+        index_file = index_file or self.index_file
+        data = {
+            "version": INDEX_VERSION, "hash_specs": self.hash_specs,
+            "records": self.records, "non_cadnano": self.non_cadnano,
+        }
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, 'w') as fp:
+            json.dump(data, fp)
+        os.replace(tmp_file, index_file)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, filepath):
+        return os.path.abspath(filepath) in self.records
+
+    def update(
+            self,
+            basedir,
+            glob_pattern: str = "**/*.json",
+            jobs: int = 1,
+            sniff_bytes: int = SNIFF_BYTES,
+            verbose: int = 0,
+    ):
+        """ Add new and changed cadnano files in basedir to the index, and remove deleted files.
+
+        Files are only loaded if their size or mtime differs from the indexed values.
+
+        Returns:
+            (added_or_changed, removed) tuple with lists of abspaths.
+        """
+        changed = {}
+        basedir = os.path.expanduser(basedir)
+        for fp in Path(basedir).glob(glob_pattern):
+            abspath = os.path.abspath(fp)
+            try:
+                stat = _file_stat(abspath)
+            except OSError:
+                continue
+            record = self.records.get(abspath)
+            if record is not None and (record["size"], record["mtime_ns"]) == stat:
+                continue
+            if self.non_cadnano.get(abspath) == list(stat):
+                continue
+            changed[abspath] = stat
+        if verbose:
+            print(f"{len(changed)} new or changed json files.", file=sys.stderr)
+        cadnano_files = filter_cadnano_files(changed, jobs=jobs, sniff_bytes=sniff_bytes, verbose=verbose)
+        index_file = partial(_try_index_cadnano_file, hash_specs=self.hash_specs)
+        if jobs > 1 and len(cadnano_files) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(index_file, cadnano_files))
+        else:
+            results = [index_file(abspath) for abspath in cadnano_files]
+        indexed = []
+        for abspath, (record, error) in zip(cadnano_files, results):
+            if error:
+                print(error, file=sys.stderr)
+                continue
+            record["size"], record["mtime_ns"] = changed[abspath]
+            self.non_cadnano.pop(abspath, None)
+            self.records[abspath] = record
+            indexed.append(abspath)
+        for abspath in changed.keys() - set(indexed):
+            self.records.pop(abspath, None)
+            self.non_cadnano[abspath] = list(changed[abspath])
+        # Remove deleted files:
+        basedir = os.path.join(os.path.abspath(basedir), "")
+        removed = [abspath for abspath in self.records if abspath.startswith(basedir) and not os.path.exists(abspath)]
+        for abspath in removed:
+            del self.records[abspath]
+        for abspath in [abspath for abspath in self.non_cadnano
+                        if abspath.startswith(basedir) and not os.path.exists(abspath)]:
+            del self.non_cadnano[abspath]
+        self._by_hash = {}
+        return indexed, removed
+
+    def by_hash(self, hash_name="routing"):
+        """ Return dict with {hexdigest: set of abspaths} for the given hash. """
+        if hash_name not in self._by_hash:
+            by_hash = {}
+            for abspath, record in self.records.items():
+                by_hash.setdefault(record["hashes"][hash_name], set()).add(abspath)
+            self._by_hash[hash_name] = by_hash
+        return self._by_hash[hash_name]
+
+    def find(self, hexdigest, hash_name="routing"):
+        """ Return sorted list of all indexed files with the given hash. """
+        return sorted(self.by_hash(hash_name).get(hexdigest, ()))
+
+    def same_as(self, filepath, hash_name="routing"):
+        """ Return sorted list of the other indexed files with the same hash as filepath.
+        filepath does not have to be in the index (it is then loaded and hashed).
+        """
+        abspath = os.path.abspath(filepath)
+        record = self.records.get(abspath)
+        if record is None or (record["size"], record["mtime_ns"]) != _file_stat(abspath):
+            record = index_cadnano_file(abspath, hash_specs=self.hash_specs)
+        return [other for other in self.find(record["hashes"][hash_name], hash_name) if other != abspath]
+
+    def duplicates(self, hash_name="routing"):
+        """ Return list of sorted lists of files with the same hash, for all hashes shared by two or more files. """
+        return sorted(sorted(paths) for paths in self.by_hash(hash_name).values() if len(paths) > 1)
+
+
+def cadnano_design_index(
+        index_file: str,
+        basedir: str = None,
+        glob_pattern: str = "**/*.json",
+        same_as: str = None,
+        hash_name: str = "routing",
+        show_duplicates: bool = False,
+        jobs: int = 1,
+        verbose: int = 0,
+):
+    """ Update a cadnano design index with the cadnano files in basedir, and query it.
+
+    CLI entry-point: cadnano-design-index
+
+    Args:
+        index_file: The index file (json). Created if it doesn't exist.
+        basedir: Find new, changed, and deleted cadnano files in this directory (recursively, by default).
+        glob_pattern: Glob pattern used to find json files in basedir.
+        same_as: Print all indexed files with the same `hash_name` hash as this file.
+        hash_name: The hash to compare files by, one of INDEX_HASH_SPECS, or "file".
+        show_duplicates: Print all groups of indexed files with the same `hash_name` hash.
+        jobs: Number of worker processes to validate and hash files with.
+        verbose: Change verbosity during run.
+
+    Returns:
+        The CadnanoDesignIndex.
+
+    """
+    index = CadnanoDesignIndex.load(index_file)
+    if basedir:
+        changed, removed = index.update(basedir, glob_pattern=glob_pattern, jobs=jobs, verbose=verbose)
+        print(f"Indexed {len(changed)} new/changed cadnano files, removed {len(removed)} deleted files "
+              f"({len(index)} cadnano files in index).", file=sys.stderr)
+        index.save()
+    if same_as:
+        for abspath in index.same_as(same_as, hash_name=hash_name):
+            print(abspath)
+    if show_duplicates:
+        for paths in index.duplicates(hash_name=hash_name):
+            print("\n".join(paths) + "\n")
+    return index
+
+
+# Create Typer click CLI:
+def cadnano_design_index_cli():
+    typer.run(cadnano_design_index)
+
+
+if __name__ == '__main__':
+    cadnano_design_index_cli()
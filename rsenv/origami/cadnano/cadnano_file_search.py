@@ -101,10 +101,22 @@ Related: Validating web APIs:
 
 import sys
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import json
 import jsonschema
 import typer
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 
 CADNANO_SCHEMA = {
     # Not required, but recommended - mark this JSON document as a JSON Schema:
@@ -117,14 +129,108 @@ CADNANO_SCHEMA = {
     "required": ["name", "vstrands"],
 }
 
+# Number of bytes read from the start (and end) of each file when sniffing for the cadnano keys:
+SNIFF_BYTES = 4096
+
+_validator = None
+# json and orjson decode errors are ValueErrors, ijson has its own JSONError:
+_DECODE_ERRORS = (ValueError, IOError) + ((ijson.JSONError,) if ijson is not None else ())
+
 
 def json_file_has_attr(filepath, attr):
     with open(filepath) as fp:
         data = json.load(fp)
-    return isinstance(data, )
+    return isinstance(data, dict) and attr in data
+
+
+def sniff_cadnano_file(filepath, sniff_bytes: int = SNIFF_BYTES) -> bool:
+    """ Quick pre-filter, checking if a file could be a cadnano json file, without parsing it.
+
+    Only the first (and, if needed, the last) `sniff_bytes` bytes of the file are read,
+    and checked for a json object with the "vstrands" and "name" keys.
+    Cadnano writes "name" before "vstrands", but we also look in the end of the file,
+    in case the file was re-written with another key order.
+
+    Returns:
+        False if the file is definitely not a cadnano file (or could not be read), True otherwise.
+    """
+    try:
+        with open(filepath, "rb") as fp:
+            head = fp.read(sniff_bytes)
+            if not head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{"):
+                return False
+            if b'"vstrands"' in head and b'"name"' in head:
+                return True
+            fp.seek(0, 2)
+            fp.seek(max(fp.tell() - sniff_bytes, len(head)))
+            found = head + fp.read()
+    except OSError:
+        return False
+    return b'"vstrands"' in found and b'"name"' in found
+
+
+def _load_cadnano_header_ijson(fp):
+    """ Read just the top-level "name" and "vstrands" values with ijson (vstrands is returned as an empty list).
+
+    Parsing stops as soon as both keys are found, so the vstrands (and the rest of the file) are not loaded.
+    """
+    document = {}
+    for prefix, event, value in ijson.parse(fp):
+        if prefix in ("name", "vstrands") and prefix not in document:
+            document[prefix] = [] if event == "start_array" else {} if event == "start_map" else value
+            if len(document) == 2:
+                break
+    return document
 
 
-def find_cadnano_files(basedir, glob_pattern: str = "**/*.json", verbose: int = 0):
+def load_json_document(filepath, parser: str = "auto"):
+    """ Load json document from filepath.
+
+    Args:
+        filepath: The json file to load.
+        parser: "json", "orjson", "ijson" (only loads the top-level "name" and "vstrands" keys),
+            or "auto" (use orjson if it is installed, otherwise json).
+    """
+    if parser == "auto":
+        parser = "orjson" if orjson is not None else "json"
+    with open(filepath, "rb") as fp:
+        if parser == "orjson":
+            return orjson.loads(fp.read())
+        if parser == "ijson":
+            return _load_cadnano_header_ijson(fp)
+        if parser == "json":
+            return json.load(fp)
+    raise ValueError(f"Unknown json parser: {parser!r}")
+
+
+def validate_cadnano_file(filepath, parser: str = "auto"):
+    """ Load filepath and validate it against CADNANO_SCHEMA.
+
+    Returns:
+        None if the file is a valid cadnano file, otherwise a message saying why it is not.
+    """
+    global _validator
+    if _validator is None:
+        _validator = jsonschema.Draft7Validator(schema=CADNANO_SCHEMA)
+    try:
+        document = load_json_document(filepath, parser=parser)
+    except _DECODE_ERRORS as exc:
+        return f"Unable to load file '{filepath}: {exc} ({type(exc)})"
+    try:
+        _validator.validate(document)
+    except jsonschema.exceptions.ValidationError as exc:
+        return f"{filepath} is not valid cadnano file: {exc.message}"
+    return None
+
+
+def find_cadnano_files(
+        basedir,
+        glob_pattern: str = "**/*.json",
+        jobs: int = 1,
+        sniff_bytes: int = SNIFF_BYTES,
+        parser: str = "auto",
+        verbose: int = 0,
+):
     """ Find cadnano files by looking not just at the extension, but by validating the json document.
 
     Rationale: Cadnano using the *.json file extension makes it super hard to find cadnano files
@@ -138,35 +244,91 @@ def find_cadnano_files(basedir, glob_pattern: str = "**/*.json", verbose: int =
     and check if the json document is consistent with being a cadnano file
     (specifically, having a "name" and "vstrands" properties).
 
+    Since loading every json file is slow, files are first sniffed (see `sniff_cadnano_file`),
+    and only the files that may be cadnano files are loaded and validated, using `jobs` worker processes.
+    Sniffing is I/O bound, and is done using `jobs` threads.
+
     CLI entry-point: cadnano-file-search
 
     Args:
         basedir: The directory to look for cadnano files from.
         glob_pattern: Glob pattern to use. The default glob pattern, "**/*.json" will scan the basedir recursively.
+        jobs: Number of threads to sniff files with, and worker processes to validate files with.
+        sniff_bytes: Number of bytes to sniff from the start and end of each file. Use 0 to validate all files.
+        parser: The json parser to use for validation, "auto", "json", "orjson", or "ijson".
         verbose: Be more verbose when printing whether a given file doesn't match the cadnano json schema.
 
     Returns:
-        None
+        List of paths to the cadnano files found.
 
     """
     basedir = Path(basedir)
-    file_candidates = basedir.glob(glob_pattern)  # use rglob to prefix "**/" to pattern.
-    validator = jsonschema.Draft7Validator(schema=CADNANO_SCHEMA)
+    file_candidates = list(basedir.glob(glob_pattern))  # use rglob to prefix "**/" to pattern.
     validated_files = []
-    for fp in file_candidates:
-        try:
-            document = json.load(open(fp))
-        except (json.JSONDecodeError, IOError) as exc:
-            print(f"Unable to load file '{fp}: {exc} ({type(exc)})", file=sys.stderr)
-            continue
-        try:
-            validator.validate(document)
-        except jsonschema.exceptions.ValidationError as exc:
+    # Print each cadnano file as soon as it has been validated:
+    for fp in iter_cadnano_files(file_candidates, jobs=jobs, sniff_bytes=sniff_bytes, parser=parser, verbose=verbose):
+        print(fp)
+        validated_files.append(fp)
+    return validated_files
+
+
+def iter_cadnano_files(
+        file_candidates,
+        jobs: int = 1,
+        sniff_bytes: int = SNIFF_BYTES,
+        parser: str = "auto",
+        verbose: int = 0,
+):
+    """ Generator yielding the files in file_candidates that are cadnano files (sniffed, then validated),
+    in order, as soon as each file has been validated.
+
+    See `find_cadnano_files` for args.
+    """
+    file_candidates = list(file_candidates)
+    validate = partial(validate_cadnano_file, parser=parser)
+    sniff = partial(sniff_cadnano_file, sniff_bytes=sniff_bytes) if sniff_bytes else None
+    if jobs > 1 and len(file_candidates) > 1:
+        if sniff:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                sniffed = list(executor.map(sniff, file_candidates))
+            file_candidates = [fp for fp, maybe_cadnano in zip(file_candidates, sniffed) if maybe_cadnano]
             if verbose:
-                print(f"{fp} is not valid cadnano file: {exc.message}", file=sys.stderr)
-        else:
-            print(fp)
-            validated_files.append(fp)
+                print(f"{len(file_candidates)} of {len(sniffed)} json files may be cadnano files.", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # executor.map returns an iterator, which yields each result (in order) as soon as it is available:
+            errors = executor.map(validate, file_candidates, chunksize=16)
+            yield from _without_errors(zip(file_candidates, errors), verbose=verbose)
+    else:
+        n_sniffed = 0
+        for fp in file_candidates:
+            if sniff is None or sniff(fp):
+                n_sniffed += 1
+                yield from _without_errors([(fp, validate(fp))], verbose=verbose)
+        if sniff and verbose:
+            print(f"{n_sniffed} of {len(file_candidates)} json files may be cadnano files.", file=sys.stderr)
+
+
+def _without_errors(files_and_errors, verbose=0):
+    """ Yield the files without validation errors, printing the errors (unless it is just not a cadnano file). """
+    for fp, error in files_and_errors:
+        if error is None:
+            yield fp
+        elif verbose or error.startswith("Unable to load"):
+            print(error, file=sys.stderr)
+
+
+def filter_cadnano_files(
+        file_candidates,
+        jobs: int = 1,
+        sniff_bytes: int = SNIFF_BYTES,
+        parser: str = "auto",
+        verbose: int = 0,
+):
+    """ Return list with the files in file_candidates that are cadnano files (sniffed, then validated).
+
+    See `find_cadnano_files` for args.
+    """
+    return list(iter_cadnano_files(file_candidates, jobs=jobs, sniff_bytes=sniff_bytes, parser=parser, verbose=verbose))
 
 
 # Create Typer click CLI:
@@ -145,7 +145,6 @@ from datetime import datetime
 from typing import Iterable, Mapping, List, Tuple
 import click
 import typer
-from copy import deepcopy
 import sys
 
 from rsenv.utils.hash_utils import str_hash_hexdigest
@@ -249,6 +248,131 @@ def order_independent_json_hash_hexdigest(sequence, hash_name="sha256", json_sep
     return f"{int_digest:0x}"
 
 
+def _as_tuple(keys):
+    if not keys:
+        return ()
+    return (keys,) if isinstance(keys, str) else tuple(keys)
+
+
+class VstrandsHasher:
+    """ Calculate many different vstrands hashes for the same vstrands list.
+
+    Each helix attribute is serialized only once (per json_separators), and the serialized helix dicts and their
+    digests are cached by the keys they contain, so e.g. the order-dependent and order-independent hash of
+    the same keys only serialize and hash each helix once.
+    The hashes are identical to serializing the filtered vstrands (as done by `vstrands_json_hash` previously),
+    since `json.dumps(vh)` is just the serialized "key": value items joined by the item separator.
+
+    Usage:
+        >>> hasher = VstrandsHasher(jsondata['vstrands'])
+        >>> hashes = hasher.hash_specs(DEFAULT_VSTRANDS_HASH_SPECS)
+        >>> hasher.hexdigest(include_keys=['stap', 'scaf'])
+
+    """
+
+    def __init__(self, vstrands):
+        self.vstrands = vstrands
+        self._items = {}          # (json_separators, helix index, key) -> serialized '"key": value' string.
+        self._helices = {}        # (json_separators, helix index, keys) -> serialized helix dict.
+        self._helix_digests = {}  # (hash_name, json_separators) -> {serialized helix dict: int digest}.
+
+    @staticmethod
+    def helix_keys(vh, include_keys=(), exclude_keys=(),
+                   allow_missing_include_keys=False, allow_missing_exclude_keys=False):
+        """ Return tuple with the keys of helix vh to hash, with None for missing include_keys to be filled in. """
+        if include_keys:
+            if allow_missing_include_keys == "exclude":
+                keys = [k for k in include_keys if k in vh]
+            elif allow_missing_include_keys:
+                keys = [k if k in vh else (k, None) for k in include_keys]
+            else:
+                keys = [k if k in vh else vh[k] for k in include_keys]  # vh[k] raises KeyError.
+        else:
+            keys = list(vh.keys())
+        for k in exclude_keys:
+            if k in keys:
+                keys.remove(k)
+            elif (k, None) in keys:
+                keys.remove((k, None))
+            elif not allow_missing_exclude_keys:
+                raise KeyError(k)
+        return tuple(keys)
+
+    def _serialized_helices(self, keys_per_helix, json_separators, val_for_nonexisting_attributes=None):
+        item_sep, key_sep = json_separators or (", ", ": ")
+        helices = []
+        for i, (vh, keys) in enumerate(zip(self.vstrands, keys_per_helix)):
+            if (json_separators, i, keys) in self._helices:
+                helices.append(self._helices[json_separators, i, keys])
+                continue
+            items = []
+            for k in keys:
+                if isinstance(k, tuple):
+                    # Missing include key, replaced by val_for_nonexisting_attributes:
+                    items.append(json.dumps(k[0]) + key_sep + json.dumps(
+                        val_for_nonexisting_attributes, separators=json_separators))
+                    continue
+                if (json_separators, i, k) not in self._items:
+                    self._items[json_separators, i, k] = json.dumps(k) + key_sep + json.dumps(
+                        vh[k], separators=json_separators)
+                items.append(self._items[json_separators, i, k])
+            serialized = "{" + item_sep.join(items) + "}"
+            if not any(isinstance(k, tuple) for k in keys):
+                self._helices[json_separators, i, keys] = serialized
+            helices.append(serialized)
+        return helices
+
+    def hexdigest(
+            self,
+            include_keys=None,
+            exclude_keys=None,
+            order_independent=False,
+            hash_name="sha256",
+            allow_missing_include_keys=False,
+            allow_missing_exclude_keys=False,
+            val_for_nonexisting_attributes=None,
+            json_separators=(",", ":"),
+            verbose=0,
+    ) -> str:
+        """ Calculate a single vstrands hash, see `vstrands_json_hash` for args. """
+        if verbose:
+            print("exclude_keys:", exclude_keys)
+            print("include_keys:", include_keys)
+            print("allow_missing_include_keys:", allow_missing_include_keys)
+            print("json_separators:", json_separators)
+        if json_separators is not None:
+            json_separators = tuple(json_separators)  # Specs loaded from json files have lists.
+        include_keys, exclude_keys = _as_tuple(include_keys), _as_tuple(exclude_keys)
+        keys_per_helix = [
+            self.helix_keys(vh, include_keys, exclude_keys, allow_missing_include_keys, allow_missing_exclude_keys)
+            for vh in self.vstrands
+        ]
+        helices = self._serialized_helices(keys_per_helix, json_separators, val_for_nonexisting_attributes)
+        if not order_independent:
+            m = hashlib.new(name=hash_name)
+            for serialized in helices:
+                m.update(serialized.encode("utf-8"))
+            return m.hexdigest()
+        digest_size = hashlib.new(name=hash_name).digest_size
+        digests = self._helix_digests.setdefault((hash_name, json_separators), {})
+        total = 0
+        for serialized in helices:
+            if serialized not in digests:
+                digests[serialized] = int.from_bytes(
+                    hashlib.new(name=hash_name, data=serialized.encode("utf8")).digest(), byteorder="big")
+            total = (total + digests[serialized]) % 2**(8*digest_size)
+        return f"{total:0x}"
+
+    def hash_specs(self, hash_vstrands_specs, verbose=0):
+        """ Return dict with {description: hexdigest} for each {description: kwargs} in hash_vstrands_specs. """
+        hashes = {}
+        for description, kwargs in hash_vstrands_specs.items():
+            if verbose:
+                print(f"\nCalculating '{description}' hash...", file=sys.stderr)
+            hashes[description] = self.hexdigest(**kwargs)
+        return hashes
+
+
 def vstrands_json_hash(
         vstrands,
         include_keys=None,
@@ -275,9 +399,9 @@ def vstrands_json_hash(
             This can be used to determine if the only thing that has changed is the order of the strands.
         hash_name: The hash algorithm to use (must be supported by hashlib).
         allow_missing_include_keys: What to do if a key listed in `include_keys` is not present in a vh.
-            False = Raise KeyError.
+            False or None = Raise KeyError.
             True = ignore silently, replace with `val_for_nonexisting_attributes`.
-            None or "exclude" = ignore silently, do not include attribute in vh dict.
+            "exclude" = ignore silently, do not include attribute in vh dict.
         allow_missing_exclude_keys: What to do if a key listed in `exclude_keys` is not present in a vh.
         val_for_nonexisting_attributes: The value to use for non-existing attribute.
         json_separators: The separators to use when serializing vstrands as json (list and key:value).
@@ -287,54 +411,32 @@ def vstrands_json_hash(
 
         hash hexdigest (str)
 
+    To calculate many hashes for the same vstrands, use `VstrandsHasher` (or `vstrands_specs_hashes`),
+    which only serializes each helix attribute once.
+
     """
-    if include_keys or exclude_keys:
-        # We don't want to modify the original vstrands object, so make a copy:
-        vstrands = deepcopy(vstrands)
-    if verbose:
-        print("exclude_keys:", exclude_keys)
-        print("include_keys:", include_keys)
-        print("allow_missing_include_keys:", allow_missing_include_keys)
-        print("json_separators:", json_separators)
-    if include_keys:
-        if isinstance(include_keys, str):
-            include_keys = (include_keys,)
-        for vh in vstrands:
-            keys_to_delete = [k for k in vh.keys() if k not in include_keys]
-            for k in keys_to_delete:
-                del vh[k]
-        # Maybe it is better to just generate a new vstrands list?
-        if allow_missing_include_keys:
-            if allow_missing_include_keys in (None, "exclude"):
-                vstrands = [{k: vh[k] for k in include_keys if k in vh} for vh in vstrands]
-            else:
-                vstrands = [{k: vh.get(k, val_for_nonexisting_attributes) for k in include_keys} for vh in vstrands]
-        else:
-            vstrands = [{k: vh[k] for k in include_keys} for vh in vstrands]
-    if exclude_keys:
-        if isinstance(exclude_keys, str):
-            exclude_keys = (exclude_keys,)
-        for i, vh in enumerate(vstrands):
-            for k in exclude_keys:
-                if allow_missing_exclude_keys:
-                    vh.pop(k, None)  # Use pop, to prevent KeyError if key does not exist.
-                else:
-                    try:
-                        del vh[k]
-                    except KeyError as exc:
-                        # print(f"Key '{k}' not in vh {i}, it only has keys:", vh.keys())
-                        raise exc
-
-    if order_independent:
-        hexdigest = order_independent_json_hash_hexdigest(
-            sequence=vstrands, hash_name=hash_name, json_separators=json_separators
-        )
-    else:
-        hexdigest = order_dependent_json_hash_hexdigest(
-            vstrands, hash_name=hash_name, json_separators=json_separators
-        )
-
-    return hexdigest
+    return VstrandsHasher(vstrands).hexdigest(
+        include_keys=include_keys,
+        exclude_keys=exclude_keys,
+        order_independent=order_independent,
+        hash_name=hash_name,
+        allow_missing_include_keys=allow_missing_include_keys,
+        allow_missing_exclude_keys=allow_missing_exclude_keys,
+        val_for_nonexisting_attributes=val_for_nonexisting_attributes,
+        json_separators=json_separators,
+        verbose=verbose,
+    )
+
+
+def vstrands_specs_hashes(vstrands, hash_vstrands_specs=None, verbose=0) -> dict:
+    """ Calculate all vstrands hashes in hash_vstrands_specs (default: DEFAULT_VSTRANDS_HASH_SPECS).
+
+    Returns the same as `{description: vstrands_json_hash(vstrands, **kwargs) for description, kwargs in ...}`,
+    but each helix attribute is only serialized once, regardless of the number of specs.
+    """
+    if hash_vstrands_specs is None:
+        hash_vstrands_specs = DEFAULT_VSTRANDS_HASH_SPECS
+    return VstrandsHasher(vstrands).hash_specs(hash_vstrands_specs, verbose=verbose)
 
 
 def cadnano_json_vstrands_hashes(
@@ -416,10 +518,7 @@ def cadnano_json_vstrands_hashes(
     vstrands = jsondata['vstrands']
     jsonpath = Path(jsonfile)
 
-    for description, kwargs in hash_vstrands_specs.items():
-        if verbose:
-            print(f"\nCalculating '{description}' hash...", file=sys.stderr)
-        hashes_output[description] = vstrands_json_hash(vstrands, **kwargs)
+    hashes_output.update(vstrands_specs_hashes(vstrands, hash_vstrands_specs, verbose=verbose))
 
     output_lines = "\n".join(
         output_line_fmt.format(description=description, hexdigest=hexdigest)
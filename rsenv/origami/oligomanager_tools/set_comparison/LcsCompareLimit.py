@@ -0,0 +1,182 @@
+# -*- coding: UTF-8 -*-
+"""
+Bit-parallel replacement for StringCompareLimit.
+
+Calculates the same similarity ("goodness") as StringCompareLimit,
+    goodness = 2*LCS(a, b)/(len(a)+len(b))
+where LCS is the length of the longest common subsequence, but using Hyyrö's bit-vector algorithm:
+All len(a) cells of a DP column are updated with a few integer operations per character in b,
+instead of filling a Paper matrix cell-by-cell with recursive maxres calls.
+
+Like StringCompareLimit, comparisons that cannot reach limit are aborted early, returning 0:
+ * Length: LCS <= min(len(a), len(b)), so e.g. with limit 0.9 and a 20 nt string, the other must be 17-24 nt.
+ * Running bound: after j characters of b, LCS <= LCS(a, b[:j]) + len(b) - j.
+
+For comparing two sets of oligos, use all_vs_all_goodness(), which compares all pairs at once with numpy
+(one 64-bit bit-vector per pair), optionally split over a pool of worker processes:
+
+    >>> goodness = all_vs_all_goodness(old_oligos, new_oligos, limit=0.8, processes=4)
+    >>> similar = np.argwhere(goodness > 0.8)
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+def _popcount(x):
+    return bin(x).count("1")
+
+
+def char_bitmasks(a):
+    """ Return dict with {char: bitmask}, with bit i set if a[i] == char. """
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    return peq
+
+
+def lcs_length(a, b, minimumres=0, peq=None):
+    """
+    Return the length of the longest common subsequence of a and b (Hyyrö's bit-vector algorithm).
+    If the LCS cannot reach minimumres, the calculation is aborted and 0 is returned.
+    peq can be given as char_bitmasks(a), when a is compared against many strings.
+    """
+    n, m = len(a), len(b)
+    if min(n, m) < minimumres:
+        return 0
+    if peq is None:
+        peq = char_bitmasks(a)
+    mask = (1 << n) - 1
+    v = mask  # Zero bits in v mark the DP column positions where the LCS increases.
+    for j, char in enumerate(b, 1):
+        u = v & peq.get(char, 0)
+        v = ((v + u) | (v - u)) & mask
+        if minimumres and j % 8 == 0 and n - _popcount(v) + m - j < minimumres:
+            return 0
+    res = n - _popcount(v)
+    return res if res >= minimumres else 0
+
+
+def min_res(limit, n, m):
+    """ Return the minimum LCS length for a goodness of limit (same as StringCompareLimit.setMinRes). """
+    return int(limit/2*(n+m))
+
+
+def lcs_goodness(a, b, limit=0, peq=None):
+    """ Return goodness 2*LCS(a, b)/(len(a)+len(b)), or 0 if the goodness cannot reach limit. """
+    if a == b:
+        return 1
+    if not (a or b):
+        return 0
+    return 2*float(lcs_length(a, b, min_res(limit, len(a), len(b)), peq=peq))/(len(a)+len(b))
+
+
+class LcsCompareLimit:
+    """
+    Drop-in replacement for StringCompareLimit, using the bit-parallel lcs_length().
+    The bitmasks of a are cached, so comparing one string against many others is faster.
+    """
+
+    def __init__(self, a='', b='', limit=0.9):
+        self.limit = limit
+        self.goodness = 0
+        self._peq_for = None
+        self._peq = None
+        self.a, self.b = a, b
+        self.n, self.m = len(a), len(b)
+
+    def setLimit(self, lim):
+        self.limit = lim
+
+    def resToGoodness(self, res):
+        return 2*float(res)/(self.n+self.m)
+
+    def calculate(self):
+        if self._peq_for != self.a:
+            self._peq_for, self._peq = self.a, char_bitmasks(self.a)
+        self.goodness = lcs_goodness(self.a, self.b, self.limit, peq=self._peq)
+        return self.goodness
+
+    def recalculate(self, a, b):
+        self.a, self.b = a, b
+        self.n, self.m = len(a), len(b)
+        return self.calculate()
+
+
+def _popcount64(x):
+    """ Number of set bits in each element of a uint64 array. """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return np.unpackbits(x.view(np.uint8).reshape(x.shape + (8,)), axis=-1).sum(axis=-1)
+
+
+def _as_byte_matrix(seqs):
+    """ Return (len(seqs) x max length) uint8 array with the characters of seqs, padded with 0. """
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.intp)
+    matrix = np.zeros((len(seqs), max(lengths, default=0)), dtype=np.uint8)
+    matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = np.frombuffer("".join(seqs).encode(), dtype=np.uint8)
+    return matrix, lengths
+
+
+def lcs_lengths_vectorized(rows, cols):
+    """
+    Return (len(rows) x len(cols)) array with the LCS length of all pairs, using numpy.
+    All pairs are processed at once, with one uint64 bit-vector per pair, so the rows must be at most 64 characters.
+    """
+    row_chars, row_lengths = _as_byte_matrix(rows)
+    col_chars, _ = _as_byte_matrix(cols)
+    if row_chars.shape[1] > 64:
+        raise ValueError("Vectorized LCS only supports strings of at most 64 characters.")
+    # peq[row, char] has bit i set if rows[row][i] == char. Padding (char 0) has no bits set, so it never matches.
+    peq = np.zeros((len(rows), 256), dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), np.arange(row_chars.shape[1], dtype=np.uint64))
+    for i in range(row_chars.shape[1]):
+        peq[np.arange(len(rows)), row_chars[:, i]] |= np.where(i < row_lengths, bits[i], np.uint64(0))
+    peq[:, 0] = 0
+    masks = np.where(row_lengths == 64, np.uint64(2**64-1),
+                     (np.uint64(1) << np.minimum(row_lengths, 63).astype(np.uint64)) - np.uint64(1))[:, None]
+    v = np.broadcast_to(masks, (len(rows), len(cols))).copy()
+    for j in range(col_chars.shape[1]):
+        u = v & peq[:, col_chars[:, j]]
+        v = ((v + u) | (v - u)) & masks
+    return row_lengths[:, None] - _popcount64(v).astype(np.intp)
+
+
+def _goodness_rows(args):
+    rows, cols, limit = args
+    if all(len(a) <= 64 for a in rows):
+        lengths = np.array([len(b) for b in cols])[None, :] + np.array([len(a) for a in rows])[:, None]
+        result = 2*lcs_lengths_vectorized(rows, cols)/np.maximum(lengths, 1)
+    else:
+        result = np.zeros((len(rows), len(cols)))
+        for i, a in enumerate(rows):
+            peq = char_bitmasks(a)
+            for j, b in enumerate(cols):
+                result[i, j] = lcs_goodness(a, b, limit, peq=peq)
+    # Same result whether or not the calculation was aborted early:
+    result[result < limit] = 0
+    return result
+
+
+def all_vs_all_goodness(seqs1, seqs2=None, limit=0, processes=1, chunk_size=256):
+    """
+    Compare all pairs of strings from seqs1 and seqs2, returning a (len(seqs1) x len(seqs2)) array of goodness.
+
+    Rows are calculated in chunks of chunk_size strings from seqs1. Chunks where all strings are at most
+    64 characters (e.g. staples) use lcs_lengths_vectorized(), others use lcs_goodness() for each pair.
+
+    Args:
+        seqs1, seqs2: Lists of strings. If seqs2 is None, seqs1 is compared against itself.
+        limit: Pairs with goodness below limit get goodness 0 (and are aborted early, when possible).
+        processes: Number of worker processes to calculate chunks in.
+    """
+    seqs1 = list(seqs1)
+    seqs2 = seqs1 if seqs2 is None else list(seqs2)
+    chunks = [(seqs1[i:i+chunk_size], seqs2, limit) for i in range(0, len(seqs1), chunk_size)]
+    if not chunks:
+        return np.zeros((0, len(seqs2)))
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return np.vstack(list(executor.map(_goodness_rows, chunks)))
+    return np.vstack([_goodness_rows(chunk) for chunk in chunks])
@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+"""
+Reusable index over many oligo sets (e.g. modules or designs), for comparing sets without rebuilding them.
+
+The index keeps:
+ * A sorted list of all unique sequences, searched with bisect: all sequences with a given prefix
+   are found in O(log N + k) time.
+ * A sequence -> set names membership map, so "which sets contain this oligo" is a dict lookup,
+   and comparing a new set against all loaded sets only visits the sets that share oligos with it.
+
+Usage:
+    >>> index = OligoSetIndex({'module1': oligos1, 'module2': oligos2})
+    >>> index.add_set('module3', oligos3)
+    >>> index.sets_containing("TTTTCCCAGTCACGACGTTGTAAAACGACGG")
+    >>> index.with_prefix("TTTTCCC")
+    >>> common, removed, added = index.diff('module1', 'module2')
+    >>> index.compare_against_all(new_oligos)
+
+"""
+
+from bisect import bisect_left
+from collections import Counter
+
+
+class OligoSetIndex:
+
+    def __init__(self, sets=None):
+        """ sets can be a dict with {name: oligos} or a list of oligo collections (named by list index). """
+        self.sets = {}          # name -> frozenset of oligos
+        self.membership = {}    # oligo -> set of names
+        self._sorted = None     # Sorted list of all oligos, rebuilt lazily after adding sets.
+        if sets is not None:
+            for name, oligos in (sets.items() if isinstance(sets, dict) else enumerate(sets)):
+                self.add_set(name, oligos)
+
+    def __len__(self):
+        return len(self.sets)
+
+    def __contains__(self, oligo):
+        return oligo in self.membership
+
+    def add_set(self, name, oligos):
+        if name in self.sets:
+            self.remove_set(name)
+        oligos = frozenset(oligos)
+        self.sets[name] = oligos
+        for oligo in oligos:
+            if oligo not in self.membership:
+                self.membership[oligo] = set()
+                self._sorted = None
+            self.membership[oligo].add(name)
+
+    def remove_set(self, name):
+        for oligo in self.sets.pop(name):
+            names = self.membership[oligo]
+            names.discard(name)
+            if not names:
+                del self.membership[oligo]
+                self._sorted = None
+
+    @property
+    def sorted_oligos(self):
+        if self._sorted is None:
+            self._sorted = sorted(self.membership)
+        return self._sorted
+
+    def with_prefix(self, prefix):
+        """ Return sorted list of all indexed oligos starting with prefix. """
+        oligos = self.sorted_oligos
+        start = bisect_left(oligos, prefix)
+        if not prefix:
+            return list(oligos)
+        end = bisect_left(oligos, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        return oligos[start:end]
+
+    def similar_by_prefix(self, oligo, prefixlength):
+        """ Return sorted list of the other indexed oligos, which share the first prefixlength bases with oligo. """
+        return [other for other in self.with_prefix(oligo[:prefixlength]) if other != oligo]
+
+    def sets_containing(self, oligo):
+        """ Return set with the names of all sets containing oligo. """
+        return set(self.membership.get(oligo, ()))
+
+    def diff(self, org, new):
+        """
+        Compare two sets, given by name (or as collections of oligos).
+        Returns (common, removed, added) tuple of sets, same as (org & new, org - new, new - org).
+        """
+        org = self.sets[org] if not isinstance(org, (set, frozenset)) else org
+        new = self.sets[new] if not isinstance(new, (set, frozenset)) else new
+        return org & new, org - new, new - org
+
+    def shared_counts(self, oligos):
+        """ Return Counter with {name: number of oligos shared with oligos} for all sets sharing any oligos. """
+        counts = Counter()
+        for oligo in set(oligos):
+            counts.update(self.membership.get(oligo, ()))
+        return counts
+
+    def compare_against_all(self, oligos):
+        """
+        Compare a (new) set of oligos against all sets in the index.
+        Only sets sharing oligos with the new set are visited.
+
+        Returns:
+            List of (name, n_common, n_removed, n_added) tuples for sets sharing oligos with the new set,
+            sorted by number of common oligos (most similar first).
+            n_removed is the number of oligos only in the indexed set, n_added the number only in the new set.
+        """
+        oligos = set(oligos)
+        result = [(name, n_common, len(self.sets[name]) - n_common, len(oligos) - n_common)
+                  for name, n_common in self.shared_counts(oligos).items()]
+        return sorted(result, key=lambda res: (-res[1], res[2] + res[3]))
@@ -43,7 +43,8 @@ and not hidden as class functions or object methods.
 
 
 import csv, re
-from .StringCompareLimit import StringCompareLimit
+from .LcsCompareLimit import all_vs_all_goodness
+from .OligoSetIndex import OligoSetIndex
 
 class OmToolbox:
     def printSetDiff(self, org, new):
@@ -69,10 +70,14 @@ class OmToolbox:
 
 
     def compareSetAgainstMany(self, existing_sets, new):
-
-        itm_changed_score = list()
-        for i,org in enumerate(existing_sets):
-            pass
+        """
+        Compare new set against many existing sets (list, dict or an OligoSetIndex).
+        Returns list of (name, n_common, n_removed, n_added), most similar set first.
+        """
+        if not isinstance(existing_sets, OligoSetIndex):
+            existing_sets = OligoSetIndex(existing_sets)
+        itm_changed_score = existing_sets.compare_against_all(new)
+        return itm_changed_score
 
     """Investigate the difference a bit more elaborate, e.g. compare the
     "changed" (difference_symmetric) oligos and see how exactly the new set has changed"""
@@ -89,7 +94,6 @@ class OmToolbox:
             newseqdict = new.seqdict
 
         limit = 0.8
-        comparator = StringCompareLimit(limit=limit)
         myset = org & new
 
         print('Common to both sets: ' + str(len(myset)) + ' elements')
@@ -104,15 +108,17 @@ class OmToolbox:
         print("Removed: (oligos which were present in %s set but not in %s set) %s elements'" % ("old", "new", str(len(myset))))
         print("limit = " + str(limit))
         similarCount = 0
-        for elem in myset:
+        myset, newlist = list(myset), list(new)
+        goodness = all_vs_all_goodness(myset, newlist, limit=limit)
+        for i, elem in enumerate(myset):
             eleminfo = ''
             if not orgseqdict is None:
                 if elem in orgseqdict: eleminfo = " " + str(orgseqdict[elem])
             else: eleminfo = " (no info-)"
             print("Removed from org set: " + elem + eleminfo)
             similarOligos = list()
-            for oligo in new:
-                similarity = comparator.recalculate(elem, oligo)
+            for j, oligo in enumerate(newlist):
+                similarity = goodness[i, j]
                 if not newseqdict is None:
                     if oligo in newseqdict: oligoinfo = " " + str(newseqdict[oligo])
                 else: oligoinfo = " (no info)"
@@ -130,15 +136,17 @@ class OmToolbox:
         print('Added (new set minus org set): ' + str(len(myset)) + ' elements')
         print("limit = " + str(limit))
         similarCount = 0
-        for elem in myset:
+        myset, orglist = list(myset), list(org)
+        goodness = all_vs_all_goodness(myset, orglist, limit=limit)
+        for i, elem in enumerate(myset):
             eleminfo = ''
             if not newseqdict is None:
                 if elem in newseqdict: eleminfo = " " + str(newseqdict[elem])
             else: eleminfo = " (no info-)"
             print("Added to new set: " + elem + eleminfo)
             similarOligos = list()
-            for oligo in org:
-                similarity = comparator.recalculate(elem, oligo)
+            for j, oligo in enumerate(orglist):
+                similarity = goodness[i, j]
                 if similarity > limit:
                     similarOligos.append(oligo)
                     if not orgseqdict is None:
@@ -38,10 +38,14 @@ See also:
 """
 
 import sys
+import os
 import os.path
 import re
+import json
 import hashlib
 from pathlib import Path
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
 import click
 
@@ -57,6 +61,85 @@ def hexdigest(hash_int: int) -> str:
     return f'{hash_int:0x}'
 
 
+def hash_oligoset_file(
+        fpath_str: str,
+        strip_lines: bool = True,
+        remove_whitespace: bool = True,
+        remove_empty_lines: bool = True,
+        normalize_full_line_to_uppercase: bool = True,
+        mod_regex=r"\/[^\/]*?\/",
+        normalize_seq_to_uppercase: bool = False,
+        remove_duplicates: bool = True,
+        hash_modulus: int = 2**256,
+):
+    """ Hash a single oligoset file, see `hash_oligoset_files()` for arguments.
+
+    The file is read in a single streaming pass, calculating the line hash (modhash, including mods)
+    and the sequence hash (seqhash, excluding mods) together. Only the digests of unique lines/sequences are kept.
+
+    Returns:
+        dict with hash_incl_mods, hash_excl_mods (int), and the stats n_lines, n_oligos, n_unique_lines, n_unique_seqs.
+    """
+    if mod_regex and isinstance(mod_regex, str):
+        mod_regex = re.compile(mod_regex)
+    n_lines = n_oligos = 0
+    line_digests, seq_digests = set(), set()
+    hash_incl_mods = hash_excl_mods = 0
+    with open(fpath_str) as fp:
+        for line in fp:
+            n_lines += 1
+            if strip_lines:
+                line = line.strip()
+            if remove_empty_lines and not line.strip():
+                continue
+            if remove_whitespace:
+                line = line.replace(" ", "").replace("\t", "")
+            n_oligos += 1
+            if normalize_full_line_to_uppercase:
+                line = line.upper()
+            line_excl_mods = "".join(mod_regex.split(line)) if mod_regex else line
+            if normalize_seq_to_uppercase:
+                # Note: This uses the full line (including mods), to give the same hashes as previous versions.
+                line_excl_mods = line.upper()
+            line_digest = hashlib.sha256(line.encode('utf-8')).digest()
+            seq_digest = hashlib.sha256(line_excl_mods.encode('utf-8')).digest()
+            if not remove_duplicates or line_digest not in line_digests:
+                hash_incl_mods += int.from_bytes(line_digest, byteorder='big')
+            if not remove_duplicates or seq_digest not in seq_digests:
+                hash_excl_mods += int.from_bytes(seq_digest, byteorder='big')
+            line_digests.add(line_digest)
+            seq_digests.add(seq_digest)
+    return {
+        'hash_incl_mods': hash_incl_mods % hash_modulus,
+        'hash_excl_mods': hash_excl_mods % hash_modulus,
+        'n_lines': n_lines,
+        'n_oligos': n_oligos,
+        'n_unique_lines': len(line_digests),
+        'n_unique_seqs': len(seq_digests),
+    }
+
+
+def _file_cache_key(fpath_str):
+    stat = os.stat(fpath_str)
+    return os.path.abspath(fpath_str), stat.st_size, stat.st_mtime_ns
+
+
+def load_hash_cache(cache_file):
+    """ Load hash cache from JSON file, returning dict with {abspath: entry}. """
+    if not cache_file or not os.path.exists(cache_file):
+        return {}
+    with open(cache_file) as fp:
+        return json.load(fp)
+
+
+def save_hash_cache(cache, cache_file):
+    """ Save hash cache to JSON file (writing to a temporary file first, so the cache is never left half-written). """
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w') as fp:
+        json.dump(cache, fp, indent=1)
+    os.replace(tmp_file, cache_file)
+
+
 def hash_oligoset_files(
         files: str,
         strip_lines: bool = True,
@@ -78,6 +161,8 @@ def hash_oligoset_files(
         hash_str_sep: str = " ",
         hash_truncate_lenght: int = 8,
         return_digests: bool = False,
+        jobs: int = 1,
+        cache_file: str = None,
 ):
     """ Calculate order-independent hashes of oligo sequences in one or more text files.
 
@@ -103,6 +188,9 @@ def hash_oligoset_files(
         assumed_ext: Assume this filename extension when renaming, e.g. ".oligoset.txt".
         hash_truncate_lenght: Truncate the hashes/hexdigests to this length when renaming the file.
         return_digests: If True, return hashes as hexdigest strings, instead of integer numbers.
+        jobs: Number of files to hash in parallel, using a pool of worker processes.
+        cache_file: JSON file with hashes from previous runs, keyed by file path, size, and mtime.
+            Files that are unchanged since they were hashed (with the same hashing options) are not rehashed.
 
     Returns:
         A list of all hashes calculated.
@@ -112,51 +200,50 @@ def hash_oligoset_files(
 
     print("files:", files)
 
+    hash_kwargs = dict(
+        strip_lines=strip_lines, remove_whitespace=remove_whitespace, remove_empty_lines=remove_empty_lines,
+        normalize_full_line_to_uppercase=normalize_full_line_to_uppercase,
+        mod_regex=mod_regex.pattern if hasattr(mod_regex, 'pattern') else mod_regex,
+        normalize_seq_to_uppercase=normalize_seq_to_uppercase, remove_duplicates=remove_duplicates,
+        hash_modulus=hash_modulus,
+    )
+    cache = load_hash_cache(cache_file)
+    options_key = json.dumps(hash_kwargs, sort_keys=True)
+    results = {}
+    to_hash = []
+    cache_keys = {}  # Stat before hashing, so a file changed while being hashed is re-hashed next time.
     for fpath_str in files:
-        fpath = Path(fpath_str)
-        with open(fpath_str) as fp:
-            lines = [line for line in fp]
-        n_lines = len(lines)
-        if strip_lines:
-            lines = [line.strip() for line in lines]
-        if remove_empty_lines:
-            lines = [line for line in lines if line.strip()]
-        if remove_whitespace:
-            lines = [line.replace(" ", "").replace("\t", "") for line in lines]
-
-        n_oligos = len(lines)
-
-        if normalize_full_line_to_uppercase:
-            lines = [line.upper() for line in lines]
-
-        if mod_regex:
-            if isinstance(mod_regex, str):
-                mod_regex = re.compile(mod_regex)
-            lines_excl_mods = ["".join(mod_regex.split(line)) for line in lines]
+        path, size, mtime_ns = cache_keys[fpath_str] = _file_cache_key(fpath_str)
+        entry = cache.get(path)
+        if entry and (entry['size'], entry['mtime_ns'], entry['options']) == (size, mtime_ns, options_key):
+            results[fpath_str] = dict(entry['result'], hash_incl_mods=int(entry['result']['hash_incl_mods'], 16),
+                                      hash_excl_mods=int(entry['result']['hash_excl_mods'], 16))
         else:
-            lines_excl_mods = lines
-
-        if normalize_seq_to_uppercase:
-            lines_excl_mods = [line.upper() for line in lines]
+            to_hash.append(fpath_str)
+    hash_file = partial(hash_oligoset_file, **hash_kwargs)
+    if jobs > 1 and len(to_hash) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results.update(zip(to_hash, executor.map(hash_file, to_hash)))
+    else:
+        results.update((fpath_str, hash_file(fpath_str)) for fpath_str in to_hash)
+    if cache_file is not None and to_hash:
+        for fpath_str in to_hash:
+            path, size, mtime_ns = cache_keys[fpath_str]
+            result = dict(results[fpath_str], hash_incl_mods=hexdigest(results[fpath_str]['hash_incl_mods']),
+                          hash_excl_mods=hexdigest(results[fpath_str]['hash_excl_mods']))
+            cache[path] = {'size': size, 'mtime_ns': mtime_ns, 'options': options_key, 'result': result}
+        save_hash_cache(cache, cache_file)
 
-        line_hashes = [sha256_int(line) for line in lines]
-        line_hashes_excl_mods = [sha256_int(line) for line in lines_excl_mods]
-
-        if remove_duplicates:
-            line_hashes = set(line_hashes)
-            line_hashes_excl_mods = set(line_hashes_excl_mods)
-            n_unique_lines = len(line_hashes)
-            n_unique_seqs = len(lines_excl_mods)
-        else:
-            n_unique_lines = len(set(line_hashes))
-            n_unique_seqs = len(set(line_hashes_excl_mods))
+    for fpath_str in files:
+        fpath = Path(fpath_str)
+        result = results[fpath_str]
+        hash_incl_mods, hash_excl_mods = result['hash_incl_mods'], result['hash_excl_mods']
+        n_lines, n_oligos = result['n_lines'], result['n_oligos']
+        n_unique_lines, n_unique_seqs = result['n_unique_lines'], result['n_unique_seqs']
 
         n_duplicate_lines = n_oligos - n_unique_lines
         n_duplicate_seqs = n_oligos - n_unique_seqs
 
-        hash_incl_mods = sum(line_hashes) % hash_modulus
-        hash_excl_mods = sum(line_hashes_excl_mods) % hash_modulus
-
         hexdigest_incl_mods = f'{hash_incl_mods:0x}'
         hexdigest_excl_mods = f'{hash_excl_mods:0x}'
 
@@ -183,7 +270,7 @@ Oligoset hash stats for file: {fpath}
                 fn_no_ext = str(fn_with_ext).split(assumed_ext)[0]
                 ext = assumed_ext
             else:
-                real_stem, ext = os.path.splitext(fn_with_ext)
+                fn_no_ext, ext = os.path.splitext(fn_with_ext)
             hash_digests = [hexdigest_excl_mods]
             if hexdigest_incl_mods != hexdigest_excl_mods:
                 hash_digests.append(hexdigest_incl_mods)
@@ -194,7 +281,7 @@ Oligoset hash stats for file: {fpath}
             # Format new filename:
             new_filename = rename_pattern.format(
                 output_dir=output_dir, fn_no_ext=fn_no_ext, fn_with_ext=fn_with_ext,
-                path=str(fpath_str), filename=fn_with_ext, ext=ext, hash_str=hash_str,
+                path=str(fpath_str), filename=fn_with_ext, ext=ext, hash_str=hash_str, hashes_str=hash_str,
                 hash_incl_mods=hash_incl_mods, hash_excl_mods=hash_excl_mods,
             )
 
@@ -224,7 +311,7 @@ hash_oligoset_file_cli_2 = click_stove.create_click_cli_command(
 
 # Manually create a Click command:
 @click.command("Oligoset file hasher")
-@click.argument("files")
+@click.argument("files", nargs=-1)
 @click.option("--strip-lines/--no-strip-lines", default=True)
 @click.option("--remove-whitespace/--no-remove-whitespace", default=True)
 @click.option("--remove-empty-lines/--no-remove-empty-lines", default=True)
@@ -236,6 +323,8 @@ hash_oligoset_file_cli_2 = click_stove.create_click_cli_command(
 @click.option("--show-stats/--no-show-stats", default=True)
 @click.option("--rename-file/--no-rename-file", default=False)
 @click.option("--assumed-ext", default=".oligoset.txt")
-@click.option("--hash-truncate-length", type=int, default=8)
+@click.option("--hash-truncate-length", "hash_truncate_lenght", type=int, default=8)
+@click.option("--jobs", "-j", type=int, default=1, help="Number of files to hash in parallel.")
+@click.option("--cache-file", default=None, help="JSON file for caching hashes of unchanged files.")
 def hash_oligoset_file_cli(*args, **kwargs):
     return hash_oligoset_files(*args, **kwargs)
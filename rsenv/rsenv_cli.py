@@ -5,8 +5,10 @@ import click
 
 # 'nanodrop-cli=rsenv.dataanalysis.nanodrop.nanodrop_cli:cli',
 # 'hplc-cli=rsenv.hplcutils.cli:hplc_cli',
+# 'hplc-batch=rsenv.hplcutils.batch:hplc_batch_cli',
 # 'hplc-cdf-to-csv=rsenv.hplcutils.cdf_csv:cdf_csv_cli',
 # 'hplc-rename-cdf-files=rsenv.hplcutils.rename_cdf_files:rename_cdf_files_cli',
+# 'hplc-similarity=rsenv.hplcutils.similarity:hplc_similarity_cli',
 # 'json-redump-fixer=rsenv.seq.cadnano.json_redump_fixer:main',
 # 'json-to-yaml=rsenv.fileconverters.jsonyaml:json_files_to_yaml_cli',
 # 'csv-to-hdf5=rsenv.fileconverters.hdf5csv:csv_to_hdf5_cli',
@@ -22,7 +24,9 @@ import click
 # 'rsenv-help=rsenv.rsenv_cli:print_rsenv_help',
 # 'rsenv=rsenv.rsenv_cli:rsenv_cli',
 from rsenv.hplcutils.cli import hplc_cli
+from rsenv.hplcutils.batch import hplc_batch_cli
 from rsenv.hplcutils.rename_cdf_files import rename_cdf_files_cli
+from rsenv.hplcutils.similarity import hplc_similarity_cli
 from rsenv.utils.clipboard import clipboard_image_to_file_cli
 
 # ELN CLIs moved to zepto-eln-core distribution package.
@@ -48,8 +52,10 @@ NanoDrop/Denovix CLI:
 
 HPLC CLIs:
     'hplc-cli=rsenv.hplcutils.cli:hplc_cli',
+    'hplc-batch=rsenv.hplcutils.batch:hplc_batch_cli',
     'hplc-cdf-to-csv=rsenv.hplcutils.cdf_csv:cdf_csv_cli',
     'hplc-rename-cdf-files=rsenv.hplcutils.rename_cdf_files:rename_cdf_files_cli',
+    'hplc-similarity=rsenv.hplcutils.similarity:hplc_similarity_cli',
 
 File conversion CLIs:
     'json-redump-fixer=rsenv.seq.cadnano.json_redump_fixer:main',
@@ -161,7 +167,9 @@ def rsenv_cli():
 # However, since we want print_rsenv_help to be available as an independent command, we do it like this:
 rsenv_cli.add_command(print_rsenv_help, name='help')
 rsenv_cli.add_command(hplc_cli, name='hplc-cli')
+rsenv_cli.add_command(hplc_batch_cli, name='hplc-batch')
 rsenv_cli.add_command(rename_cdf_files_cli, name='hplc-rename-cdf-files')
+rsenv_cli.add_command(hplc_similarity_cli, name='hplc-similarity')
 rsenv_cli.add_command(clipboard_image_to_file_cli, name='clipboard-image-to-file')
 # rsenv_cli.add_command(convert_md_file_to_html_cli, name='eln-md-to-html')
 # rsenv_cli.add_command(print_started_exps_cli, name='eln-print-started-exps')
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##    Copyright 2013 Rasmus Scholer Sorensen, rasmusscholer@gmail.com
+##
+##    This program is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    This program is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+Module for approximate sequence matching, using bit-parallel algorithms.
+
+Used to find all sites in a scaffold (e.g. M13) where a query (e.g. a handle or siRNA sequence)
+binds with up to k errors, on both strands, in one linear scan of the scaffold per query and strand:
+
+    'edit' (mismatches and indels):  Myers' bit-vector algorithm (as formulated by Hyyrö).
+    'hamming' (mismatches only):     Wu-Manber's extension of the shift-and algorithm, with k+1 bit-vectors.
+
+Python integers are used as bit-vectors, so there is no limit on the query length.
+
+Usage:
+
+    >>> for match in approx_find("GACAACAGACG", m13seq, max_errors=2, circular=True):
+    ...     print(match.start, match.end, match.strand, match.errors, match.matched)
+
+"""
+
+from collections import namedtuple
+
+from .sequtil import dnarcomp
+
+
+ApproxMatch = namedtuple('ApproxMatch', 'start end strand errors matched')
+
+
+def _pattern_bitmasks(pattern):
+    """ Return dict with {char: bitmask}, with bit i set if pattern[i] == char. """
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    return peq
+
+
+def myers_search(pattern, text, max_errors):
+    """
+    Yield (end, errors) for every position in text where a substring ending at that position (exclusive end)
+    matches pattern with at most max_errors edits (mismatches, insertions, deletions).
+    """
+    m = len(pattern)
+    if m == 0:
+        return
+    peq = _pattern_bitmasks(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn, score = full, 0, m
+    for j, char in enumerate(text):
+        eq = peq.get(char, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        ph = vn | (~(xh | vp) & full)
+        mh = vp & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        vp = mh | (~(xv | ph) & full)
+        vn = ph & xv
+        if score <= max_errors:
+            yield j + 1, score
+
+
+def hamming_search(pattern, text, max_errors):
+    """
+    Yield (end, errors) for every position in text where the substring of length len(pattern) ending at that
+    position (exclusive end) has at most max_errors mismatches to pattern.
+    """
+    m = len(pattern)
+    if m == 0:
+        return
+    peq = _pattern_bitmasks(pattern)
+    last = 1 << (m - 1)
+    # states[d] has bit i set if pattern[:i+1] matches the text ending here with at most d mismatches:
+    states = [0] * (max_errors + 1)
+    for j, char in enumerate(text):
+        eq = peq.get(char, 0)
+        prev = 0
+        for d in range(max_errors + 1):
+            old = states[d]
+            states[d] = (((old << 1) | 1) & eq) | (((prev << 1) | 1) if d else 0)
+            prev = old
+        for d in range(max_errors + 1):
+            if states[d] & last:
+                yield j + 1, d
+                break
+
+
+def _edit_start(pattern, text, end, max_errors):
+    """ Return (start, errors) for the best alignment of pattern to a substring of text ending at end. """
+    window_start = max(0, end - len(pattern) - max_errors)
+    window = text[window_start:end][::-1]
+    rpattern = pattern[::-1]
+    # Dynamic programming, anchored at end (the start of the reversed window):
+    prev = list(range(len(window) + 1))
+    for i, char in enumerate(rpattern, 1):
+        cur = [i] + [0] * len(window)
+        for j, wchar in enumerate(window, 1):
+            cur[j] = min(prev[j - 1] + (char != wchar), prev[j] + 1, cur[j - 1] + 1)
+        prev = cur
+    best = min(prev)
+    # Among equally good alignments, use the one with length closest to the pattern length:
+    length = min((j for j, errors in enumerate(prev) if errors == best), key=lambda j: abs(j - len(pattern)))
+    return end - length, best
+
+
+def approx_search(pattern, text, max_errors=1, indels=True, report='best'):
+    """
+    Find all approximate matches of pattern in text (single strand).
+
+    Args:
+        pattern: The query sequence.
+        text: The sequence to search (e.g. a scaffold).
+        max_errors: The maximum number of errors (edits, or mismatches if indels is False).
+        indels: If True, errors include insertions and deletions (Myers), otherwise only mismatches (Wu-Manber).
+        report: 'best' reports each occurrence once: With indels, an occurrence with errors also matches at
+            neighboring end positions, so consecutive end positions that align to the same start are merged,
+            keeping the end with the fewest errors. Without indels, each end position is a separate occurrence.
+            'all' reports every end position.
+
+    Returns:
+        List of (start, end, errors) tuples.
+    """
+    if report not in ('best', 'all'):
+        raise ValueError("report must be either 'best' or 'all', not %r." % (report,))
+    pattern, text = pattern.upper(), text.upper()
+    if not indels:
+        return [(end - len(pattern), end, errors) for end, errors in hamming_search(pattern, text, max_errors)]
+    hits = []
+    prev_end = None
+    for end, _ in myers_search(pattern, text, max_errors):
+        start, errors = _edit_start(pattern, text, end, max_errors)
+        if report == 'best' and hits and end == prev_end + 1 and start == hits[-1][0]:
+            # Same occurrence as the previous hit, ending at a neighboring position:
+            if errors < hits[-1][2]:
+                hits[-1] = (start, end, errors)
+        else:
+            hits.append((start, end, errors))
+        prev_end = end
+    return hits
+
+
+def approx_find(pattern, text, max_errors=1, indels=True, both_strands=True, circular=False, report='best'):
+    """
+    Find all approximate matches of pattern on both strands of text, e.g. a circular scaffold like M13.
+
+    Args:
+        pattern, max_errors, indels, report: See `approx_search()`.
+        text: The (forward strand) sequence to search.
+        both_strands: Also search for the reverse complement of pattern, i.e. matches on the other strand.
+        circular: Treat text as circular, finding matches spanning the origin.
+
+    Returns:
+        List of `ApproxMatch` (start, end, strand, errors, matched) tuples, with positions on the forward strand,
+        sorted by position. For circular texts, start is within the text, and end may exceed len(text).
+    """
+    text = text.upper()
+    search_text = text + text[:len(pattern) + max_errors - 1] if circular else text
+    matches = []
+    for strand, query in [('+', pattern)] + ([('-', dnarcomp(pattern))] if both_strands else []):
+        for start, end, errors in approx_search(query, search_text, max_errors, indels=indels, report=report):
+            if circular and start >= len(text):
+                continue  # Also found at the start of the text.
+            matches.append(ApproxMatch(start, end, strand, errors, search_text[start:end]))
+    return sorted(matches)
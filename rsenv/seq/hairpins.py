@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##    Copyright 2013 Rasmus Scholer Sorensen, rasmusscholer@gmail.com
+##
+##    This program is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    This program is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+Module for finding stem/loop hairpin structures in (aptamer) sequencing reads, in a single pass per sequence.
+
+The hairpins searched for have the structure used in `rsjsnaptamer`:
+
+    {stem1}{const1}{stem2} {loop} {rc(stem2)}{const2}{rc(stem1)}
+
+where the stems are any ACGT sequence of a given length. The rsjsnaptamer scripts search for this by
+compiling one regex for every combination of stems (4^8 patterns), and running every regex on every read.
+Here, each read is scanned once: every occurrence of const1 is used as a seed, the stems are read from
+the flanking positions, and the reverse-complement part closing the hairpin is located with a single
+substring search after the loop.
+
+For each read, the hits are the same as the first match of each per-stem regex in rsjsnaptamer, i.e.
+one hit per (stem1, stem2) combination, using either the shortest loop (".*?") or the longest loop (".*").
+
+Usage:
+
+    >>> pattern = HairpinPattern(const1="GCTGTTA", const2="TTTGCC", stem1_len=4, stem2_len=4)
+    >>> for hit in search_hairpins(seqdata, pattern, processes=4):
+    ...     print(hit.seqid, hit.stem1, hit.stem2, hit.span)
+
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .sequtil import dnarcomp
+from .seqio import read_sequences
+
+
+HairpinHit = namedtuple('HairpinHit', 'index seqid span stem1 stem2 loop_span match')
+
+
+class HairpinPattern:
+    """
+    Hairpin pattern {stem1}{const1}{stem2} {loop} {rc(stem2)}{const2}{rc(stem1)}.
+
+    Args:
+        const1, const2: The constant sequences. Note that const2 is given 5'->3', as it appears in the read.
+        stem1_len, stem2_len: The stem lengths.
+        loop: 'shortest' (same as a lazy ".*?" regex) or 'longest' (same as a greedy ".*" regex).
+        min_loop, max_loop: Limits for the loop length.
+        unique_stems: Only report the first hit of each (stem1, stem2) combination in each read,
+            same as searching with one regex for each stem combination.
+    """
+
+    def __init__(self, const1, const2, stem1_len=4, stem2_len=4, loop='shortest', min_loop=0, max_loop=None,
+                 unique_stems=True):
+        if loop not in ('shortest', 'longest'):
+            raise ValueError("loop must be either 'shortest' or 'longest', not %r." % (loop,))
+        self.const1, self.const2 = const1.upper(), const2.upper()
+        self.stem1_len, self.stem2_len = stem1_len, stem2_len
+        self.loop = loop
+        self.min_loop, self.max_loop = min_loop, max_loop
+        self.unique_stems = unique_stems
+
+    def __repr__(self):
+        return "HairpinPattern(%r, %r, stem1_len=%s, stem2_len=%s, loop=%r)" % (
+            self.const1, self.const2, self.stem1_len, self.stem2_len, self.loop)
+
+    def finditer(self, seq):
+        """ Yield (span, stem1, stem2, loop_span) for all hairpins in seq. """
+        s1, s2, c1 = self.stem1_len, self.stem2_len, len(self.const1)
+        seen = set()
+        seed = seq.find(self.const1, s1)
+        while seed != -1:
+            start = seed - s1
+            loop_start = seed + c1 + s2
+            stem1, stem2 = seq[start:seed], seq[seed + c1:loop_start]
+            seed = seq.find(self.const1, seed + 1)
+            if len(stem2) < s2 or not _is_acgt(stem1 + stem2) or (self.unique_stems and (stem1, stem2) in seen):
+                continue
+            closing = dnarcomp(stem2) + self.const2 + dnarcomp(stem1)
+            search_start = loop_start + self.min_loop
+            search_end = len(seq) if self.max_loop is None else loop_start + self.max_loop + len(closing)
+            if self.loop == 'shortest':
+                loop_end = seq.find(closing, search_start, search_end)
+            else:
+                loop_end = seq.rfind(closing, search_start, search_end)
+            if loop_end == -1:
+                continue
+            seen.add((stem1, stem2))
+            yield (start, loop_end + len(closing)), stem1, stem2, (loop_start, loop_end)
+
+    def search(self, records, start_index=0):
+        """ Yield `HairpinHit` records for all hairpins in an iterable of (seqid, seq) records. """
+        for index, (seqid, seq) in enumerate(records, start_index):
+            seq = seq.upper()
+            for span, stem1, stem2, loop_span in self.finditer(seq):
+                yield HairpinHit(index, seqid, span, stem1, stem2, loop_span, seq[span[0]:span[1]])
+
+
+def _is_acgt(seq):
+    return not seq.strip("ACGT")
+
+
+def _search_shard(args):
+    pattern, records, start_index = args
+    return list(pattern.search(records, start_index=start_index))
+
+
+def search_hairpins(records, pattern, processes=1, shard_size=10000):
+    """
+    Search an iterable of (seqid, seq) records for hairpins, yielding `HairpinHit` records.
+
+    Records are consumed lazily, so they can come from a streaming reader. With processes > 1, shards of
+    shard_size records are searched in parallel worker processes; hits are still yielded in record order.
+
+    Args:
+        records: Iterable of (seqid, seq) tuples, or path to a FASTA/FASTQ/plain sequence file,
+            which is read using `rsenv.seq.seqio.read_sequences()`.
+        pattern: `HairpinPattern` to search for.
+        processes: The number of worker processes.
+        shard_size: The number of records per shard.
+    """
+    if isinstance(records, str):
+        records = read_sequences(records)
+    if processes <= 1:
+        yield from pattern.search(records)
+        return
+    records = iter(records)
+    index = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        while True:
+            # Only a few shards per worker are submitted at a time, to limit memory usage:
+            shards = []
+            for _ in range(2 * processes):
+                shard = list(islice(records, shard_size))
+                if not shard:
+                    break
+                shards.append((pattern, shard, index))
+                index += len(shard)
+            if not shards:
+                break
+            for hits in executor.map(_search_shard, shards):
+                yield from hits
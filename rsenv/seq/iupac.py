@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##    Copyright 2014 Rasmus Scholer Sorensen, rasmusscholer@gmail.com
+##
+##    This program is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    This program is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+Module for compiling and matching degenerate (IUPAC) sequence motifs.
+
+Motifs can use all IUPAC nucleotide codes (R, Y, S, W, K, M, B, D, H, V, N), as well as
+the repeat notation used by NEBcutter for restriction enzyme sites, e.g. "GGTGA(N)7N".
+
+Motifs are compiled to a `MotifMatcher`, which finds all (overlapping) hits on both strands, using either:
+    'regex':        One regular expression per motif and strand, with a character class for each degenerate position.
+    'aho-corasick': A single Aho-Corasick automaton over the expanded motifs. Best for many short motifs.
+
+Matchers can be used on complete sequences, or on a stream of sequence chunks (e.g. from a large FASTA file):
+
+    >>> matcher = compile_motifs({'BanI': "GGYRCC", 'HphI': "GGTGA(N)7N"})
+    >>> hits = list(matcher.finditer(seq))
+    >>> hits = list(matcher.stream(chunks))
+
+Each hit is a `MotifHit` (start, end, strand, motif, seq) tuple, with start/end positions on the forward strand.
+
+"""
+
+import re
+from collections import namedtuple
+from itertools import product
+
+
+# The bases matched by each IUPAC code. N is "ATGC", so expansion order is the same as `seqgen.genparts`.
+IUPAC_CODES = {
+    'A': "A", 'C': "C", 'G': "G", 'T': "T", 'U': "T",
+    'R': "AG", 'Y': "CT", 'S': "GC", 'W': "AT", 'K': "GT", 'M': "AC",
+    'B': "CGT", 'D': "AGT", 'H': "ACT", 'V': "ACG",
+    'N': "ATGC",
+}
+IUPAC_COMPLEMENTS = dict(zip("ACGTURYSWKMBDHVN", "TGCAAYRSWMKVHDBN"))
+
+MotifHit = namedtuple('MotifHit', 'start end strand motif seq')
+
+
+def expand_repeats(motif):
+    """ Expand repeat notation, e.g. "GCAGC(N)8NNNN" -> "GCAGCNNNNNNNNNNNN", and remove whitespace. """
+    motif = "".join(motif.split()).upper()
+    return re.sub(r"\((\w+)\)(\d+)", lambda match: match.group(1) * int(match.group(2)), motif)
+
+
+def check_motif(motif):
+    """ Expand repeats and raise ValueError if motif contains characters that are not IUPAC codes. """
+    motif = expand_repeats(motif)
+    invalid = set(motif) - set(IUPAC_CODES)
+    if invalid:
+        raise ValueError("Motif %r contains non-IUPAC characters: %s" % (motif, "".join(sorted(invalid))))
+    return motif
+
+
+def iupac_rcompl(motif):
+    """ Return the reverse complement of an IUPAC motif, e.g. "GGYRCC" -> "GGYRCC". """
+    return "".join(IUPAC_COMPLEMENTS[code] for code in reversed(check_motif(motif)))
+
+
+def iupac_expand(motif):
+    """
+    Return a generator with all concrete sequences matched by motif.
+    >>> list(iupac_expand("ATRGC"))
+    ['ATAGC', 'ATGGC']
+    """
+    return ("".join(comb) for comb in product(*(IUPAC_CODES[code] for code in check_motif(motif))))
+
+
+def iupac_n_expansions(motif):
+    """ Return the number of concrete sequences matched by motif. """
+    n = 1
+    for code in check_motif(motif):
+        n *= len(IUPAC_CODES[code])
+    return n
+
+
+def iupac_to_regex(motif):
+    """ Return a regular expression pattern for motif, e.g. "GTSAC" -> "GT[GC]AC". """
+    return "".join(IUPAC_CODES[code] if len(IUPAC_CODES[code]) == 1 else "[%s]" % IUPAC_CODES[code]
+                   for code in check_motif(motif))
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for finding all occurrences of a set of (concrete) sequences in a single pass.
+    """
+
+    def __init__(self, words=()):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # For each state, list of (word length, payload) tuples.
+        for word, payload in words:
+            self.add(word, payload)
+        self.build()
+
+    def add(self, word, payload=None):
+        state = 0
+        for char in word:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((len(word), payload))
+
+    def build(self):
+        """ Calculate failure links (breadth-first), and merge outputs along failure links. """
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """ Search text, yielding (start, end, payload) for all occurrences. """
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in output[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+class MotifMatcher:
+    """
+    Matcher for a set of IUPAC motifs, on one or both strands, see `compile_motifs()`.
+    Matching is case-insensitive. Palindromic motifs are only reported once, on the '+' strand.
+    """
+
+    def __init__(self, motifs, both_strands=True, backend='regex'):
+        if isinstance(motifs, str):
+            motifs = [motifs]
+        if not isinstance(motifs, dict):
+            motifs = {motif: motif for motif in motifs}
+        self.motifs = {name: check_motif(motif) for name, motif in motifs.items()}
+        self.both_strands = both_strands
+        self.backend = backend
+        # List of (motif name, strand, motif) for all searches:
+        self.searches = []
+        for name, motif in self.motifs.items():
+            self.searches.append((name, '+', motif))
+            if both_strands and iupac_rcompl(motif) != motif:
+                self.searches.append((name, '-', iupac_rcompl(motif)))
+        self._search_order = {(name, strand): i for i, (name, strand, _) in enumerate(self.searches)}
+        self.max_len = max((len(motif) for motif in self.motifs.values()), default=0)
+        if backend == 'regex':
+            # Lookahead, so overlapping hits are found:
+            self._regexes = [(name, strand, re.compile("(?=(%s))" % iupac_to_regex(motif)))
+                             for name, strand, motif in self.searches]
+        elif backend == 'aho-corasick':
+            self._automaton = AhoCorasick(
+                (word, (name, strand)) for name, strand, motif in self.searches for word in iupac_expand(motif))
+        else:
+            raise ValueError("Unknown backend %r, must be 'regex' or 'aho-corasick'." % (backend,))
+
+    def finditer(self, seq, offset=0):
+        """ Yield `MotifHit` tuples for all hits in seq, sorted by position. offset is added to all positions. """
+        seq = seq.upper()
+        if self.backend == 'regex':
+            hits = sorted((match.start(), self._search_order[name, strand], name, strand, match.group(1))
+                          for name, strand, regex in self._regexes for match in regex.finditer(seq))
+            for start, _, name, strand, match_seq in hits:
+                yield MotifHit(offset + start, offset + start + len(match_seq), strand, name, match_seq)
+        else:
+            hits = sorted((start, self._search_order[payload], end, payload)
+                          for start, end, payload in self._automaton.search(seq))
+            for start, _, end, (name, strand) in hits:
+                yield MotifHit(offset + start, offset + end, strand, name, seq[start:end])
+
+    def stream(self, chunks):
+        """
+        Yield `MotifHit` tuples for all hits in a stream of sequence chunks, e.g. lines from a FASTA file.
+        Positions are relative to the start of the stream. Hits spanning chunk boundaries are found, and only reported once.
+        """
+        tail = ""
+        offset = 0  # Stream position of tail[0].
+        for chunk in chunks:
+            text = tail + "".join(chunk.split())
+            # Hits starting before `complete` cannot extend past the end of text, for any motif:
+            complete = max(len(text) - self.max_len + 1, 0)
+            for hit in self.finditer(text, offset=offset):
+                if hit.start - offset < complete:
+                    yield hit
+            # Hits starting at or after `complete` are found when searching together with the next chunk:
+            offset += complete
+            tail = text[complete:]
+        for hit in self.finditer(tail, offset=offset):
+            yield hit
+
+    def count(self, seq):
+        """ Return dict with the number of hits for each motif in seq. """
+        counts = dict.fromkeys(self.motifs, 0)
+        for hit in self.finditer(seq):
+            counts[hit.motif] += 1
+        return counts
+
+
+def compile_motifs(motifs, both_strands=True, backend='auto', max_ac_expansions=10000):
+    """
+    Compile one or more IUPAC motifs to a `MotifMatcher`.
+
+    Args:
+        motifs: A motif string, a list of motifs, or a dict with {name: motif}.
+        both_strands: Also find hits of the reverse complement of each motif.
+        backend: 'regex', 'aho-corasick', or 'auto'. 'auto' uses Aho-Corasick for many motifs with
+            limited degeneracy (at most max_ac_expansions concrete sequences in total), otherwise regex.
+        max_ac_expansions: Limit for the total number of expanded sequences when backend is 'auto'.
+
+    Returns:
+        MotifMatcher
+    """
+    if backend == 'auto':
+        motif_list = [motifs] if isinstance(motifs, str) else list(motifs.values() if isinstance(motifs, dict) else motifs)
+        n_expansions = sum(iupac_n_expansions(motif) for motif in motif_list)
+        backend = 'aho-corasick' if len(motif_list) > 10 and n_expansions <= max_ac_expansions else 'regex'
+    return MotifMatcher(motifs, both_strands=both_strands, backend=backend)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##    Copyright 2013 Rasmus Scholer Sorensen, rasmusscholer@gmail.com
+##
+##    This program is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    This program is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+Module with a compact, 2-bit packed DNA sequence type, and vectorized (numpy) sequence kernels.
+
+Sequences are encoded with the 2-bit nucleotide codes from `seqgen` (A=0, C=1, G=2, T=3, other=255),
+so the complement of a base is simply 3 - code. `PackedSeq` stores four bases per byte, plus the positions
+of any ambiguous (non-ACGT) characters, which are kept as 'N'.
+
+The batch functions work on (n_seqs x seqlength) code arrays from `encode_seqs()`, i.e. many equal-length
+sequences at once (e.g. candidate oligos from `generate_random_seqs_batched()`):
+
+    >>> codes = encode_seqs(["GATTACA", "CCCCGGA"])
+    >>> batch_gc_content(codes)
+    array([0.28571429, 0.85714286])
+    >>> decode_seqs(batch_rcompl(codes))
+    ['TGTAATC', 'TCCGGGG']
+    >>> batch_max_homopolymer(codes)
+    array([2, 4])
+
+"""
+
+import numpy as np
+
+from .seqgen import NUC_CODES, encode_seqs, decode_seqs, kmer_codes
+
+
+INVALID_CODE = 255
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def seq_codes(seq):
+    """ Encode a single sequence (str or bytes, any length) as a 1D uint8 array of nucleotide codes. """
+    if isinstance(seq, str):
+        seq = seq.encode('ascii')
+    return NUC_CODES[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def codes_rcompl(codes):
+    """ Reverse complement of nucleotide codes (along the last axis). Invalid codes are kept as invalid. """
+    codes = codes[..., ::-1]
+    return np.where(codes == INVALID_CODE, codes, 3 - codes).astype(np.uint8)
+
+
+def acgt_compl(seq, reverse=True):
+    """
+    Return the (reverse) complement of a str sequence using the code kernels,
+    or None if seq contains characters other than uppercase ACGT (which `sequtil.rcompl()` does not accept).
+    """
+    if not (isinstance(seq, str) and seq.isascii() and seq.isupper()):
+        return None
+    codes = seq_codes(seq)
+    if np.any(codes == INVALID_CODE):
+        return None
+    return decode_seqs(codes_rcompl(codes) if reverse else 3 - codes)[0]
+
+
+def batch_rcompl(codes):
+    """ Reverse complement of all sequences in a (n_seqs x seqlength) code array. """
+    return codes_rcompl(np.atleast_2d(codes))
+
+
+def batch_gc_content(codes):
+    """ Return array with the GC content of each sequence in a (n_seqs x seqlength) code array. """
+    codes = np.atleast_2d(codes)
+    if codes.shape[1] == 0:
+        return np.zeros(codes.shape[0])
+    return np.count_nonzero((codes == 1) | (codes == 2), axis=1) / codes.shape[1]
+
+
+def batch_run_lengths(codes):
+    """
+    For each position in a (n_seqs x seqlength) code array, return the length of the homopolymer run
+    ending at that position (1 for a base different from the previous base).
+    """
+    codes = np.atleast_2d(codes)
+    positions = np.arange(codes.shape[1])
+    run_start = np.zeros(codes.shape, dtype=np.intp)
+    run_start[:, 1:] = np.where(codes[:, 1:] != codes[:, :-1], positions[1:], 0)
+    return positions - np.maximum.accumulate(run_start, axis=1) + 1
+
+
+def batch_max_homopolymer(codes):
+    """ Return array with the longest homopolymer run in each sequence of a (n_seqs x seqlength) code array. """
+    codes = np.atleast_2d(codes)
+    if codes.shape[1] == 0:
+        return np.zeros(codes.shape[0], dtype=np.intp)
+    return batch_run_lengths(codes).max(axis=1)
+
+
+def batch_kmers(codes, k, canonical=False):
+    """
+    Return (kmers, valid) arrays with the 2-bit k-mer codes of each sequence, see `seqgen.kmer_codes()`.
+    If canonical is True, each k-mer is the smallest of the k-mer and its reverse complement,
+    so a k-mer and its reverse complement have the same code.
+    """
+    kmers, valid = kmer_codes(codes, k)
+    if canonical:
+        rc_kmers, _ = kmer_codes(batch_rcompl(codes), k)
+        kmers = np.minimum(kmers, rc_kmers[:, ::-1])
+    return kmers, valid
+
+
+class PackedSeq:
+    """
+    DNA sequence packed with four bases per byte.
+
+    Characters other than ACGT (case-insensitive) are stored as ambiguous positions, and decoded as 'N'.
+    Instances are immutable and hashable, and can be created from (and converted to) str:
+
+        >>> seq = PackedSeq("GATTACA")
+        >>> str(seq.rcompl()), seq.gc_content(), seq.homopolymer_runs(min_length=2)
+        ('TGTAATC', 0.2857142857142857, [(2, 4, 'T')])
+    """
+
+    __slots__ = ('data', 'length', 'ambiguous')
+
+    def __init__(self, seq=""):
+        if isinstance(seq, PackedSeq):
+            self.data, self.length, self.ambiguous = seq.data, seq.length, seq.ambiguous
+        else:
+            self._set_codes(seq_codes(seq))
+
+    def _set_codes(self, codes):
+        self.length = len(codes)
+        invalid = codes == INVALID_CODE
+        self.ambiguous = np.flatnonzero(invalid).tobytes()
+        codes = np.where(invalid, 0, codes).astype(np.uint8)
+        padded = np.zeros(-(-self.length // 4) * 4, dtype=np.uint8)
+        padded[:self.length] = codes
+        self.data = np.bitwise_or.reduce(padded.reshape(-1, 4) << _SHIFTS, axis=1).astype(np.uint8).tobytes()
+
+    @classmethod
+    def from_codes(cls, codes):
+        """ Create PackedSeq from a 1D array of nucleotide codes. """
+        packed = cls.__new__(cls)
+        packed._set_codes(np.asarray(codes, dtype=np.uint8))
+        return packed
+
+    @property
+    def codes(self):
+        """ The sequence as a 1D uint8 array of nucleotide codes (255 for ambiguous positions). """
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        codes = ((data[:, None] >> _SHIFTS) & 3).ravel()[:self.length]
+        if self.ambiguous:
+            codes[np.frombuffer(self.ambiguous, dtype=np.intp)] = INVALID_CODE
+        return codes
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        chars = np.frombuffer(b"ACGTN", dtype=np.uint8)[np.minimum(self.codes, 4)]
+        return chars.tobytes().decode('ascii')
+
+    def __repr__(self):
+        return "PackedSeq(%r)" % str(self)
+
+    def __eq__(self, other):
+        # Only compare with other PackedSeqs (use str(packed) == seq for strings), so __hash__ stays consistent.
+        if not isinstance(other, PackedSeq):
+            return NotImplemented
+        return (self.length, self.data, self.ambiguous) == (other.length, other.data, other.ambiguous)
+
+    def __hash__(self):
+        return hash((self.length, self.data, self.ambiguous))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PackedSeq.from_codes(self.codes[index])
+        return str(self)[index]
+
+    def compl(self):
+        """ Return the complement (not reversed). """
+        return PackedSeq.from_codes(codes_rcompl(self.codes)[::-1])
+
+    def rcompl(self):
+        """ Return the reverse complement. """
+        return PackedSeq.from_codes(codes_rcompl(self.codes))
+
+    def gc_content(self):
+        """ Return the fraction of G and C bases. """
+        return float(batch_gc_content(self.codes)[0])
+
+    def homopolymer_runs(self, min_length=4):
+        """ Return list of (start, end, base) for all homopolymer runs of at least min_length bases. """
+        codes = self.codes
+        if not len(codes):
+            return []
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(codes)]))
+        long_runs = (ends - starts >= min_length) & (codes[starts] != INVALID_CODE)
+        return [(int(start), int(end), "ACGT"[codes[start]])
+                for start, end in zip(starts[long_runs], ends[long_runs])]
+
+    def kmers(self, k, canonical=False):
+        """ Return array with the 2-bit codes of all k-mers that do not contain ambiguous positions. """
+        kmers, valid = batch_kmers(self.codes, k, canonical=canonical)
+        return kmers[0][valid[0]]
+
+
+__all__ = [
+    'PackedSeq', 'seq_codes', 'codes_rcompl', 'encode_seqs', 'decode_seqs',
+    'batch_rcompl', 'batch_gc_content', 'batch_run_lengths', 'batch_max_homopolymer', 'batch_kmers',
+]
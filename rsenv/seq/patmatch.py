@@ -27,11 +27,13 @@ for the pattern "*.py" (including the quotation marks).
 
 """
 
-import re
-from itertools import product, chain, zip_longest
+from itertools import product
+import numpy as np
 
-from .seqgen import genparts
+from .seqgen import genparts, encode_seqs, decode_seqs, kmer_codes
 from .sequtil import rcompl
+from .seqio import read_sequences
+from .iupac import IUPAC_CODES, check_motif, compile_motifs
 
 
 def scanForPart(part, dataset):
@@ -46,24 +48,30 @@ def scanForPart(part, dataset):
 def patSeqGen(seqpat):
     """
     Creates a generator with actual sequences from a pattern.
-    Currently only supports N->(ATGC) permutations.
+    Supports all uppercase IUPAC ambiguity codes, e.g. N->(ATGC) and R->(AG) permutations, see `rsenv.seq.iupac`.
+    All other characters (including lowercase letters) are constant parts and are kept as-is.
     Usage (casted to list so easier to see):
     >>> list(patSeqGen("ATNGC"))
     ['ATAGC', 'ATTGC', 'ATGGC', 'ATCGC']
+    >>> list(patSeqGen("acRt"))
+    ['acAt', 'acGt']
     """
-    N_parts = re.findall("(N+)", seqpat)
-    N_gens = [genparts(len(stretch)) for stretch in N_parts]
-    # Make as tuple so it can be treated same as an N_generator:
-    const_tups = [(part,) for part in seqpat.split('N') if part]
-    # If seqpat starts with one or more N, insert empty element in front of const_tups
-    # to make zipping consistent. (Alternatively, reverse order of izip...)
-    if seqpat[0] == 'N':
-        const_tups.insert(0, None)
-        #pairs = izip_longest(N_gens, const_tups)
-    #else:
-    #    pairs = izip_longest(const_tups, N_gens)
-    gens = (gen for gen in chain(*zip_longest(const_tups, N_gens)) if gen)
-    return ("".join(comb) for comb in product(*gens))
+    options = [IUPAC_CODES[char] if len(IUPAC_CODES.get(char, "")) > 1 else char for char in seqpat]
+    return ("".join(comb) for comb in product(*options))
+
+
+def findMotifHits(pattern, dataset, both_strands=True):
+    """
+    Find all hits of one or more IUPAC patterns in dataset, without enumerating the pattern parts.
+    dataset: list of rows, where first field is name and second is sequence,
+        or path to a FASTA/FASTQ/plain sequence file (read using `rsenv.seq.seqio.read_sequences`).
+    pattern: IUPAC pattern, list of patterns, or dict with {name: pattern}, see `rsenv.seq.iupac.compile_motifs`.
+    Returns generator of (<seqname>, <MotifHit>) tuples.
+    """
+    matcher = compile_motifs(pattern, both_strands=both_strands)
+    if isinstance(dataset, str):
+        dataset = read_sequences(dataset)
+    return ((row[0], hit) for row in dataset for hit in matcher.finditer(row[1]))
 
 
 def scanForPattern(pattern, dataset, hitcondition=None, sumcondition=None):
@@ -81,11 +89,18 @@ def scanForPattern(pattern, dataset, hitcondition=None, sumcondition=None):
     more specialized/optimized for your use-case.
     #rep = scanForRepeats(analyse_ds)
 
+    With the default hitcondition, the scan is done using a `PatternScanIndex` of the dataset,
+    which is much faster for long N-patterns and large datasets.
+    Patterns longer than 32 nt (the longest k-mer that fits in 64 bits) fall back to the substring scan.
+
     """
+    # (U is a constant part in patSeqGen, but cannot be k-mer encoded.)
+    if hitcondition is None and set(pattern) <= set(IUPAC_CODES) - {'U'} and len(pattern) <= PatternScanIndex.MAX_K:
+        return PatternScanIndex(dataset, len(pattern)).scan(pattern, sumcondition=sumcondition)
     if hitcondition is None:
         hitcondition = lambda part, full: part in full
     if sumcondition is None:
-        sumcondition = lambda x: len(x) == 0
+        sumcondition = lambda part, matches: len(matches) == 0
     #seqs = [row[1] for row in dataset]
     return_parts = [] # list of tuples: (part, fount in, rev complement found in, match count, rcomp count, set count)
     parts = patSeqGen(pattern)
@@ -104,6 +119,101 @@ def scanForPattern(pattern, dataset, hitcondition=None, sumcondition=None):
     return return_parts
 
 
+def patCodes(seqpat):
+    """
+    Like patSeqGen, but returns a (n_parts x len(seqpat)) array of nucleotide codes
+    (see `rsenv.seq.seqgen.encode_seqs`), in the same order as patSeqGen.
+    """
+    options = [encode_seqs(IUPAC_CODES[code])[0] for code in check_motif(seqpat)]
+    n_parts = 1
+    for opts in options:
+        n_parts *= len(opts)
+    parts = np.empty((n_parts, len(options)), dtype=np.uint8)
+    # Mixed-radix enumeration, with the last position changing fastest (same as itertools.product):
+    remainder = np.arange(n_parts)
+    for pos in range(len(options) - 1, -1, -1):
+        parts[:, pos] = options[pos][remainder % len(options[pos])]
+        remainder //= len(options[pos])
+    return parts
+
+
+class PatternScanIndex:
+    """
+    Index of all k-mers in a dataset, mapping each k-mer to the rows containing it,
+    for scanning many pattern parts (and their reverse complements) by lookup instead of substring search.
+    dataset: list of rows, where first field is name and second is sequence (same as scanForPattern).
+    k: The k-mer length, i.e. the length of the patterns to scan for.
+    Matching is case-sensitive, same as `part in seq`: k-mers containing characters other than
+    uppercase ATGC are not indexed.
+    """
+
+    MAX_K = 32
+    _MASK_LOWERCASE = str.maketrans("acgt", "NNNN")
+
+    def __init__(self, dataset, k):
+        self.dataset = dataset
+        self.k = k
+        by_length = {}
+        for row_idx, row in enumerate(dataset):
+            by_length.setdefault(len(row[1]), []).append(row_idx)
+        all_kmers, all_rows = [np.empty(0, dtype=np.uint64)], [np.empty(0, dtype=np.intp)]
+        for row_idxs in by_length.values():
+            # Encode all rows with the same sequence length at once:
+            seqs = [dataset[i][1].translate(self._MASK_LOWERCASE) for i in row_idxs]
+            kmers, valid = kmer_codes(encode_seqs(seqs), k)
+            rows = np.repeat(np.array(row_idxs, dtype=np.intp)[:, np.newaxis], kmers.shape[1], axis=1)
+            all_kmers.append(kmers[valid])
+            all_rows.append(rows[valid])
+        kmers, rows = np.concatenate(all_kmers), np.concatenate(all_rows)
+        # Sort by k-mer, then row, and only keep each (k-mer, row) pair once:
+        order = np.lexsort((rows, kmers))
+        kmers, rows = kmers[order], rows[order]
+        first = np.ones(len(kmers), dtype=bool)
+        first[1:] = (kmers[1:] != kmers[:-1]) | (rows[1:] != rows[:-1])
+        self.kmers, self.rows = kmers[first], rows[first]
+
+    def lookup(self, kmers):
+        """ Return (starts, ends) arrays; the rows containing kmers[i] are self.rows[starts[i]:ends[i]]. """
+        return np.searchsorted(self.kmers, kmers, side='left'), np.searchsorted(self.kmers, kmers, side='right')
+
+    def scan(self, pattern, sumcondition=None, gc_range=None, exclude_palindromes=False):
+        """
+        Scan dataset for all parts of an (IUPAC) pattern, returning the same list of tuples as scanForPattern:
+            (part, matching rows, names of rows with the reverse complement, n_matches, n_rcompl_matches, set count)
+        sumcondition: Same as for scanForPattern, default is to include parts not found in any row.
+        gc_range: Only include parts with GC-content within (min, max), inclusive.
+        exclude_palindromes: Do not include palindromic parts.
+        The gc_range and exclude_palindromes predicates are evaluated for all parts at once,
+        before calling sumcondition.
+        """
+        parts = patCodes(pattern)
+        if parts.shape[1] != self.k:
+            raise ValueError("Pattern length %s does not match index k-mer length %s." % (parts.shape[1], self.k))
+        keep = np.ones(len(parts), dtype=bool)
+        if gc_range is not None:
+            gc = np.isin(parts, encode_seqs("GC")[0]).sum(axis=1) / self.k
+            keep &= (gc_range[0] <= gc) & (gc <= gc_range[1])
+        rc_parts = 3 - parts[:, ::-1]
+        if exclude_palindromes:
+            keep &= ~(parts == rc_parts).all(axis=1)
+        (part_kmers, _), (rc_kmers, _) = kmer_codes(parts, self.k), kmer_codes(rc_parts, self.k)
+        starts, ends = self.lookup(part_kmers[:, 0])
+        if sumcondition is None:
+            keep &= starts == ends  # Default: Part not found in any row.
+        dataset = self.dataset
+        return_parts = []
+        for idx in np.flatnonzero(keep):
+            part = decode_seqs(parts[idx])[0]
+            matches = [dataset[i] for i in self.rows[starts[idx]:ends[idx]]]
+            if sumcondition is not None and not sumcondition(part, matches):
+                continue
+            rc_start, rc_end = self.lookup(rc_kmers[idx, :1])
+            rcompl_matches = [dataset[i][0] for i in self.rows[rc_start[0]:rc_end[0]]]
+            return_parts.append((part, matches, rcompl_matches, len(matches), len(rcompl_matches),
+                                 len(set(matches) | set(rcompl_matches))))
+        return return_parts
+
+
 def noMatchNotPalindrome(part, matches):
     """ Convenience: Evaluates whether part is palindromic or matches is True. """
     if rcompl(part) == part: # Palindromic part
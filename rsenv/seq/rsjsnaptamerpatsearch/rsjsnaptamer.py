@@ -113,6 +113,17 @@ print("Total permutations to search: {0}".format(4**8))
 
 
 
+def findPatternB_with_hairpin_engine(records=None, processes=1):
+    """
+    Same search as findPatternB_with_generator (the 4^8 stem1/stem2 regexes), but using the single-pass
+    hairpin engine in rsenv.seq.hairpins, and yielding structured HairpinHit records instead of writing text files.
+    records: iterable of (seqid, seq) tuples, default is seqdata.
+    """
+    from rsenv.seq.hairpins import HairpinPattern, search_hairpins
+    pattern = HairpinPattern(const1=constseq1, const2=constseq2, stem1_len=4, stem2_len=4, loop='shortest')
+    return search_hairpins(seqdata if records is None else records, pattern, processes=processes)
+
+
 def findPatternB_with_generator4(infile=None):
     outputpatterns = open("outputpatternsB_generator4.txt", "wb")
     results = open("N35_pat2_results_2_generator4.txt", "wb")
@@ -426,8 +437,9 @@ def findPatternB_with_forLoops():
 # http://10.14.32.145:8001/JSN-Dec-2012/Results/
 
 def parseseqfile(f):
-    print("parseseqfile() !")
-    seqdata = [(seqid, seqstr.upper()) for seqid, seqstr in itertools.zip_longest(*[f]*2)]
+    """ Return generator of (seqid, seq) records from a FASTA/FASTQ/plain sequence file (or path), see rsenv.seq.seqio. """
+    from rsenv.seq.seqio import read_sequences
+    return read_sequences(f, upper=True)
 
 
 if __name__ == "__main__":
@@ -24,21 +24,14 @@ Includes various python code to search for patterns in the M13 sequence.
 """
 
 #from __future__ import print_function
-import string
 import re
 import itertools
 #import json
 #import time
 
 from ..dnasequences import cadnanoseqs
-
-dnacomplementmap = string.maketrans('ACGTacgt ','TGCATGCA ')
-def dnarcomp(seqStr):
-    """Returns the reverse complement of the sequence in seqStr."""
-    return seqStr.translate(dnacomplementmap)[::-1]
-def dnacomp(seqStr):
-    """Returns the complement of the sequence in seqStr."""
-    return seqStr.translate(dnacomplementmap)
+from ..approxmatch import approx_find
+from ..sequtil import dnarcomp, dnacomp
 
 
 class Myseq:
@@ -176,6 +169,17 @@ def findallwithpermuts(seqtofind, haystackstr, Noverhang, wobble=None, verbose=0
     return res
 
 
+def findallapprox(seqtofind, haystackstr, max_errors=1, indels=True, both_strands=True, circular=True):
+    """
+    Find all occurrences of seqtofind in haystackstr with up to max_errors mismatches (and indels, if indels is True),
+    on both strands, using a single bit-parallel scan per strand (see rsenv.seq.approxmatch).
+    Unlike findallwithpermuts, this does not compile a regex per position and there is no cap on the number of matches.
+    Returns a list of ApproxMatch (start, end, strand, errors, matched) tuples.
+    """
+    return approx_find(seqtofind, haystackstr, max_errors=max_errors, indels=indels,
+                       both_strands=both_strands, circular=circular)
+
+
 def findmatchesofvariablelength(search_str, haystackstr, matchlen, Noverhang, wobble=None):
     res = list()
     nruns = 0
@@ -4,9 +4,17 @@
 
 Module with functions for comparing sequence similarity.
 
+When scoring many candidates against the same sources, build a `SourceSubstringIndex` once,
+and use `SourceSubstringIndex.score()` (or `seq_substr_scores()`) instead of `seq_substr_score1()`.
+The index is a suffix automaton over all source sequences, so each candidate is scored without
+scanning the sources again.
 
 """
 
+from bisect import bisect_left
+
+import numpy as np
+
 from .sequtil import dnarcomp
 
 
@@ -35,6 +43,8 @@ def seq_substr_score1(
         * Con: Requires more memory
         * Pro: Is probably faster.
 
+    #3: Build an index of the sources once, see `SourceSubstringIndex` (much faster for many candidates).
+
     """
     if wordlen_max is None:
         wordlen_max = len(cand)
@@ -60,7 +70,7 @@ def seq_substr_score1(
 
     if use_wordcount:
         if circ_sources:
-            circ_sources_by_wordlen = [[s+s[:i] for s in sources] for i in range(wordlen_max)]
+            circ_sources_by_wordlen = [[s+s[:i] for s in sources] for i in range(wordlen_max+1)]
             words_counts = ((word, sum(s.count(word) for s in circ_sources_by_wordlen[len(word)]))
                             for word in cand_words)
         else:
@@ -76,5 +86,229 @@ def seq_substr_score1(
     return score_sum
 
 
+class SourceSubstringIndex:
+    """ Index of all substrings in a set of source sequences, for fast scoring with `seq_substr_score1()` semantics.
+
+    The index is a (generalized) suffix automaton over all source sequences (joined by a separator),
+    with the number of occurrences of each substring. It is built once in O(total source length),
+    after which the longest source match starting at every candidate position is found in a single
+    linear pass over the candidate (the "matching statistics").
+
+    Attributes:
+        sources: List of source sequences (including reverse complements, if `add_complements`).
+        circ_sources: Whether sources are treated as circular.
+    """
+
+    separator = "\x00"
+
+    def __init__(self, sources, add_complements=True, circ_sources=False):
+        if isinstance(sources, str):
+            sources = [sources]
+        sources = list(sources)
+        if add_complements:
+            sources += [dnarcomp(s) for s in sources]
+        self.sources = sources
+        self.circ_sources = circ_sources
+        # For circular sources, s+s contains exactly the same words as s+s[:wordlen_max] in `seq_substr_score1()`.
+        self._trans, self._link, self._length, self._count = self._build(
+            [s+s if circ_sources else s for s in sources])
+        self._sorted_sources = sorted(sources)
+        self._min_source_length = min(map(len, sources), default=0)
+        self._linear_automaton = None  # Automaton over the linear sources (circular sources only), built on first use.
+        self._str_counts = {}  # Cache of word counts that had to be counted with str.count.
+
+    def _build(self, texts):
+        trans, link, length, count = [{}], [-1], [0], [0]
+        last = 0
+        for ch in self.separator.join(texts):
+            cur = len(length)
+            trans.append({})
+            link.append(0)
+            length.append(length[last] + 1)
+            count.append(1)
+            p = last
+            while p != -1 and ch not in trans[p]:
+                trans[p][ch] = cur
+                p = link[p]
+            if p != -1:
+                q = trans[p][ch]
+                if length[p] + 1 == length[q]:
+                    link[cur] = q
+                else:
+                    clone = len(length)
+                    trans.append(dict(trans[q]))
+                    link.append(link[q])
+                    length.append(length[p] + 1)
+                    count.append(0)  # Clones do not add new end positions.
+                    while p != -1 and trans[p].get(ch) == q:
+                        trans[p][ch] = clone
+                        p = link[p]
+                    link[q] = link[cur] = clone
+            last = cur
+        # Number of occurrences (end positions) of each state's substrings:
+        for v in sorted(range(1, len(length)), key=length.__getitem__, reverse=True):
+            count[link[v]] += count[v]
+        return trans, link, length, count
+
+    def __contains__(self, word):
+        return self.occurrences(word) > 0
+
+    def occurrences(self, word):
+        """ Return the number of (possibly overlapping) occurrences of word in the indexed sources. """
+        v = 0
+        for ch in word:
+            v = self._trans[v].get(ch)
+            if v is None:
+                return 0
+        return self._count[v]
+
+    def longest_matches(self, seq):
+        """ For each position i in seq, return the length of the longest prefix of seq[i:] found in any source. """
+        trans, link, length = self._trans, self._link, self._length
+        n = len(seq)
+        # Longest source match ending at each position:
+        ends = [0] * n
+        v, l = 0, 0
+        for j, ch in enumerate(seq):
+            while v and ch not in trans[v]:
+                v = link[v]
+                l = length[v]
+            if ch in trans[v]:
+                v = trans[v][ch]
+                l += 1
+            ends[j] = l
+        # Match start positions (j - ends[j] + 1) are non-decreasing, so a single sweep converts them:
+        longest = [0] * n
+        j = -1
+        for i in range(n):
+            while j + 1 < n and j + 2 - ends[j + 1] <= i:
+                j += 1
+            longest[i] = max(j - i + 1, 0)
+        return longest
+
+    def word_count(self, word, occurrences=None):
+        """ Return the number of occurrences of word, counted the same way as `seq_substr_score1()`,
+        i.e. non-overlapping occurrences (`str.count`) in each source, using s + s[:len(word)] for circular sources.
+
+        The count is derived from the automaton occurrence counts. Only if occurrences of word can overlap
+        (or word is longer than a circular source) are the sources scanned with str.count,
+        and those counts are cached for later calls.
+        """
+        count = self.occurrences(word) if occurrences is None else occurrences
+        if count == 0:
+            return 0
+        if self.circ_sources:
+            if len(word) > self._min_source_length:
+                return self._str_count(word)
+            # Occurrences in s+s[:len(word)] are those in s+s, minus the ones in the second copy of s,
+            # plus one if s starts with word (the start of s is repeated at the end):
+            count += self._n_sources_with_prefix(word) - self._linear_occurrences(word)
+        if count > 1 and _has_border(word):
+            # Occurrences may overlap, which str.count does not count:
+            return self._str_count(word)
+        return count
+
+    def _str_count(self, word):
+        if word not in self._str_counts:
+            if self.circ_sources:
+                self._str_counts[word] = sum((s + s[:len(word)]).count(word) for s in self.sources)
+            else:
+                self._str_counts[word] = sum(s.count(word) for s in self.sources)
+        return self._str_counts[word]
+
+    def _n_sources_with_prefix(self, word):
+        """ Return the number of sources starting with word. """
+        sources = self._sorted_sources
+        return bisect_left(sources, word + "\U0010ffff") - bisect_left(sources, word)
 
+    def _linear_occurrences(self, word):
+        """ Return the number of (possibly overlapping) occurrences of word in the sources, read linearly. """
+        if self._linear_automaton is None:
+            self._linear_automaton = self._build(self.sources)
+        trans, _, _, count = self._linear_automaton
+        v = 0
+        for ch in word:
+            v = trans[v].get(ch)
+            if v is None:
+                return 0
+        return count[v]
 
+    def _cand_word_counts(self, cand_x2, starts, wordlen_min, wordlen_max):
+        """ Return dict with word counts for all candidate words, walking the automaton once for each start position. """
+        trans, count = self._trans, self._count
+        counts = {}
+        for i in starts:
+            v = 0
+            for j in range(i, min(i + wordlen_max, len(cand_x2))):
+                v = trans[v].get(cand_x2[j])
+                if v is None:
+                    break
+                word = cand_x2[i:j+1]
+                # (Circular candidate words are truncated at the end of cand_x2 if wordlen_max > len(cand).)
+                if (len(word) >= wordlen_min or j == len(cand_x2) - 1) and word not in counts:
+                    counts[word] = self.word_count(word, count[v])
+        return counts
+
+    def score(self, cand, circ_cand=False, wordlen_min=3, wordlen_max=None, scorefunc=None, use_wordcount=False):
+        """ Calculate the similarity score of cand against the indexed sources.
+
+        Takes the same arguments (and gives the same scores) as `seq_substr_score1()`,
+        except that sources, add_complements, and circ_sources are given when creating the index.
+        """
+        n = len(cand)
+        if wordlen_max is None:
+            wordlen_max = n
+        cand_x2 = cand + cand
+
+        def starts(l):
+            return range(0, n - (0 if circ_cand else l))
+
+        if use_wordcount:
+            if scorefunc is None:
+                scorefunc = lambda word, count: count * len(word)**1.2
+            counts = self._cand_word_counts(cand_x2, starts(wordlen_min), wordlen_min, wordlen_max)
+            words = (cand_x2[i:i+l] for l in range(wordlen_min, wordlen_max+1) for i in starts(l))
+            return sum(scorefunc(word, counts.get(word, 0)) for word in words)
+
+        longest = self.longest_matches(cand_x2[:n + wordlen_max])
+        if scorefunc is not None or (circ_cand and wordlen_max > n):
+            # Generic case, calling scorefunc for every matching word, in the same order as `seq_substr_score1()`:
+            if scorefunc is None:
+                scorefunc = lambda word: len(word)**1.2
+            words = (cand_x2[i:i+l] for l in range(wordlen_min, wordlen_max+1) for i in starts(l)
+                     if min(l, 2*n - i) <= longest[i])
+            return sum(scorefunc(word) for word in words)
+        # Default scorefunc: Count the number of matching words of each length, then sum len(word)**1.2:
+        if wordlen_max < wordlen_min or n == 0:
+            return 0
+        longest = np.asarray(longest[:n])
+        positions = np.arange(n)
+        max_lens = np.minimum(longest, wordlen_max)
+        if not circ_cand:
+            max_lens = np.minimum(max_lens, n - 1 - positions)
+        max_lens = max_lens[max_lens >= wordlen_min]
+        wordlens = np.arange(wordlen_min, wordlen_max+1)
+        # Number of positions with a matching word of length >= l, for each l:
+        n_words = len(max_lens) - np.searchsorted(np.sort(max_lens), wordlens, side='left')
+        return float(np.sum(n_words * wordlens**1.2))
+
+
+def _has_border(word):
+    """ Return True if word has a proper prefix that is also a suffix, i.e. if occurrences of word can overlap. """
+    return any(word.startswith(word[i:]) for i in range(1, len(word)))
+
+
+def seq_substr_scores(cands, sources, add_complements=True, circ_sources=False, **kwargs):
+    """ Calculate `seq_substr_score1()` scores for many candidates, building the source index only once.
+
+    Args:
+        cands: List of candidate sequences.
+        sources: Source sequence or list of source sequences.
+        add_complements, circ_sources: Passed to `SourceSubstringIndex`.
+        **kwargs: Passed to `SourceSubstringIndex.score()`, e.g. circ_cand, wordlen_min, wordlen_max.
+
+    Returns:
+        List of scores, one for each candidate.
+    """
+    index = SourceSubstringIndex(sources, add_complements=add_complements, circ_sources=circ_sources)
+    return [index.score(cand, **kwargs) for cand in cands]
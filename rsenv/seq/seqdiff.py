@@ -18,11 +18,18 @@
 
 Module for diff'ing sequences (not directly aligning).
 
+For verifying many constructs (e.g. a whole sequencing run of inserts) against one reference,
+use `batch_insert_diff()`, which returns a table with the insert of each construct.
+
 """
 
 from collections import namedtuple
+from itertools import islice
+import numpy as np
+import pandas as pd
 
 from .seqgen import endanchored_part_generator_simple, endanchored_part_generator_halving
+from .seqio import read_sequences
 
 def binary_insert_diff(seq1, seq2):
     """
@@ -100,3 +107,165 @@ def binary_insert_diff(seq1, seq2):
     #        part = seq1_part_gen({'from_start': False, 'expand_part': True})
     #    else:
     #        if part in seq2[:len(part)]:
+
+
+def _as_byte_matrix(seqs, width, from_end=False):
+    """
+    Return (n_seqs x width) uint8 array with the first (or last, reversed if from_end) width bytes of each sequence.
+    Positions beyond the end of a sequence are 0, which never matches a sequence character.
+    """
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.intp)
+    flat = np.frombuffer(b"".join(seqs) + b"\0", dtype=np.uint8)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.intp)
+    cols = np.arange(width)
+    valid = cols[None, :] < lengths[:, None]
+    if from_end:
+        idx = offsets[:, None] + lengths[:, None] - 1 - cols[None, :]
+    else:
+        idx = offsets[:, None] + cols[None, :]
+    return np.where(valid, flat[np.where(valid, idx, len(flat) - 1)], 0)
+
+
+def common_end_lengths(ref, seqs, from_end=False):
+    """
+    Return array with the length of the common prefix (or suffix, if from_end) of ref and each of seqs,
+    using vectorized byte comparison. ref and seqs must be bytes.
+    """
+    if not seqs:
+        return np.zeros(0, dtype=np.intp)
+    width = min(max(len(seq) for seq in seqs), len(ref))
+    ref_arr = np.frombuffer(ref[::-1] if from_end else ref, dtype=np.uint8)[:width]
+    mismatch = _as_byte_matrix(seqs, width, from_end=from_end) != ref_arr
+    return np.where(mismatch.any(axis=1), mismatch.argmax(axis=1), width)
+
+
+def common_prefix_length(seq1, seq2):
+    """ Return the length of the common prefix of seq1 and seq2, comparing slices by bisection. """
+    lo, hi = 0, min(len(seq1), len(seq2))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if seq1[lo:mid] == seq2[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _banded_alignment_peak(seq1, seq2, max_errors, band, xdrop):
+    """
+    Banded, X-drop dynamic programming alignment of the starts of seq1 and seq2 (match +1, mismatch -1, indel -2).
+    Returns (len1, len2, errors) for the highest-scoring alignment with at most max_errors mismatches/indels.
+    """
+    NONE = (-2**31, 0)
+    best, best_ij = (0, 0), (0, 0)
+    # row[j] = (score, -errors) for the alignment of seq1[:i] and seq2[:j]:
+    row = {j: (-2*j, -j) for j in range(0, min(band, max_errors, len(seq2)) + 1)}
+    for i in range(1, len(seq1) + 1):
+        new_row = {}
+        for j in range(max(0, i - band), min(len(seq2), i + band) + 1):
+            cands = [NONE]
+            if j - 1 in row:
+                score, neg_errors = row[j - 1]
+                if seq1[i - 1] == seq2[j - 1]:
+                    cands.append((score + 1, neg_errors))
+                else:
+                    cands.append((score - 1, neg_errors - 1))
+            if j in row:
+                cands.append((row[j][0] - 2, row[j][1] - 1))
+            if j - 1 in new_row:
+                cands.append((new_row[j - 1][0] - 2, new_row[j - 1][1] - 1))
+            cell = max(cands)
+            if cell is not NONE and -cell[1] <= max_errors:
+                new_row[j] = cell
+                if cell > best:
+                    best, best_ij = cell, (i, j)
+        if not new_row or max(new_row.values())[0] < best[0] - xdrop:
+            break
+        row = new_row
+    return best_ij[0], best_ij[1], -best[1]
+
+
+def banded_extend(seq1, seq2, max_errors=2, band=8, xdrop=10):
+    """
+    Find the common start of seq1 and seq2, allowing up to max_errors mismatches/indels.
+
+    Exactly matching stretches are skipped with slice comparisons; at each mismatch, the alignment is
+    continued with a banded, X-drop dynamic programming alignment over a short window.
+    The alignment stops where the score peaks, i.e. where the sequences stop being similar,
+    so a random sequence following the common part is not included.
+
+    Returns:
+        (len1, len2, errors) tuple with the aligned lengths of seq1 and seq2, and the number of errors.
+    """
+    window = 4 * (xdrop + band)
+    i = j = errors = 0
+    while True:
+        exact = common_prefix_length(seq1[i:], seq2[j:])
+        i, j = i + exact, j + exact
+        if errors >= max_errors:
+            break
+        len1, len2, new_errors = _banded_alignment_peak(
+            seq1[i:i + window], seq2[j:j + window], max_errors - errors, band, xdrop)
+        if not (len1 or len2):
+            break
+        i, j, errors = i + len1, j + len2, errors + new_errors
+    return i, j, errors
+
+
+def batch_insert_diff(ref, seqs, max_errors=0, band=8, xdrop=10, batch_size=10000):
+    """
+    Locate the insert in many construct/clone sequences, relative to a common reference (vector) sequence.
+
+    Like `binary_insert_diff()`, the constructs must have the same ends as the reference, but instead of
+    one construct at a time, the common start and end lengths of all constructs in a batch are found with
+    vectorized (numpy) byte comparison.
+    If max_errors > 0, the common parts are extended past mismatches/indels using `banded_extend()`,
+    so sequencing errors in the conserved ends do not end up in the insert.
+
+    Args:
+        ref: The reference sequence (str).
+        seqs: List of construct sequences, an iterable of (seqid, seq) records,
+            or path to a sequence file (read using `rsenv.seq.seqio.read_sequences()`).
+        max_errors: Maximum number of mismatches/indels in each of the common start and end parts.
+        band: Band width (maximum number of net indels) for the banded alignment.
+        xdrop: Stop the banded alignment when the score drops this much below the best score.
+        batch_size: Number of sequences compared at a time.
+
+    Returns:
+        pandas DataFrame with one row per sequence and columns:
+            seqid, common_start, common_end (lengths of the common parts),
+            ref_start, ref_end (the part of ref replaced by the insert), ref_nonmatch,
+            insert_start, insert_end (position of the insert in the construct), insert_seq,
+            errors (number of mismatches/indels in the common parts).
+    """
+    if isinstance(seqs, str):
+        seqs = read_sequences(seqs)
+    records = ((str(i), rec) if isinstance(rec, str) else rec for i, rec in enumerate(seqs))
+    ref = ref.upper()
+    ref_b = ref.encode('ascii')
+    rows = []
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        seqids, batch_seqs = zip(*((seqid, seq.upper()) for seqid, seq in batch))
+        batch_b = [seq.encode('ascii') for seq in batch_seqs]
+        starts = common_end_lengths(ref_b, batch_b)
+        ends = common_end_lengths(ref_b, batch_b, from_end=True)
+        for seqid, seq, start, end in zip(seqids, batch_seqs, starts.tolist(), ends.tolist()):
+            errors = 0
+            ref_start = start
+            if max_errors:
+                len1, len2, errors = banded_extend(ref[start:], seq[start:], max_errors, band, xdrop)
+                ref_start, start = start + len1, start + len2
+            # The common end cannot overlap the common start:
+            end = min(end, len(ref) - ref_start, len(seq) - start)
+            ref_end, insert_end = len(ref) - end, len(seq) - end
+            if max_errors:
+                len1, len2, end_errors = banded_extend(
+                    ref[ref_start:ref_end][::-1], seq[start:insert_end][::-1], max_errors, band, xdrop)
+                ref_end, insert_end, errors = ref_end - len1, insert_end - len2, errors + end_errors
+            rows.append((seqid, start, len(seq) - insert_end, ref_start, ref_end, ref[ref_start:ref_end],
+                         start, insert_end, seq[start:insert_end], errors))
+    return pd.DataFrame(rows, columns=['seqid', 'common_start', 'common_end', 'ref_start', 'ref_end', 'ref_nonmatch',
+                                       'insert_start', 'insert_end', 'insert_seq', 'errors'])
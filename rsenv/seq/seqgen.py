@@ -29,15 +29,22 @@ For production, consider using some of these other tools:
 
 
 """
-import copy
 from math import log
-from itertools import product, chain
+from itertools import product, chain, islice
+from concurrent.futures import ProcessPoolExecutor
 import json
+import numpy as np
 
 from rsenv.utils.clipboard import get_clipboard, set_clipboard
 from .sequtil import dnarcomp
 atgc = "ATGC"
 
+# 2-bit nucleotide codes, used for k-mer indexing. Complement is 3 - code. Other characters are 255.
+NUC_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _nucs in enumerate(["Aa", "Cc", "Gg", "Tt"]):
+    for _nuc in _nucs:
+        NUC_CODES[ord(_nuc)] = _code
+
 
 def endanchored_part_generator_simple(seq1, from_start=True, expanding=False):
     """
@@ -198,36 +205,158 @@ def check_match(needle, haystack):
     pass
 
 
-def check_candidates(candlist, existing_set, permlen=5):
+def encode_seqs(seqs):
+    """ Encode equal-length sequences as a (n_seqs x seqlength) uint8 array of 2-bit nucleotide codes.
+    Characters other than ACGT/acgt are encoded as 255.
+    """
+    if isinstance(seqs, str):
+        seqs = [seqs]
+    seqlength = len(seqs[0]) if len(seqs) else 0
+    raw = np.frombuffer("".join(seqs).encode('ascii'), dtype=np.uint8).reshape(len(seqs), seqlength)
+    return NUC_CODES[raw]
+
+
+def kmer_codes(codes, k):
+    """ Calculate rolling 2-bit k-mer codes for a (n_seqs x seqlength) array of nucleotide codes.
+
+    Args:
+        codes: uint8 array from `encode_seqs()` (or a 1D array for a single sequence).
+        k: k-mer length, at most 32.
+
+    Returns:
+        (kmers, valid) tuple of (n_seqs x seqlength-k+1) arrays; kmers is uint64,
+        and valid is False for k-mers containing characters other than ACGT.
+    """
+    if k > 32:
+        raise ValueError("k-mers longer than 32 cannot be encoded as 64-bit integers.")
+    codes = np.atleast_2d(codes)
+    n_kmers = max(codes.shape[1] - k + 1, 0)
+    kmers = np.zeros((codes.shape[0], n_kmers), dtype=np.uint64)
+    invalid = np.zeros((codes.shape[0], n_kmers), dtype=bool)
+    for offset in range(k):
+        window = codes[:, offset:offset + n_kmers]
+        kmers = (kmers << np.uint64(2)) | (window & 3).astype(np.uint64)
+        invalid |= window == 255
+    return kmers, ~invalid
+
+
+class KmerIndex:
+    """ Index of all k-mers in a set of oligos (and their reverse complements), for fast screening of candidates.
+
+    K-mers are encoded as 2-bit integers and kept in a sorted numpy array, so screening a batch of
+    candidates is a vectorized rolling encoding plus a binary search, i.e. O(L) per candidate.
+    K-mers are case-insensitive; k-mers with characters other than ACGT are ignored.
+
+    Attributes:
+        k: The k-mer length.
+        oligos: List of the indexed oligo sequences.
+        kmers: Sorted array with the unique k-mer codes of all oligos.
+    """
+
+    def __init__(self, oligos=(), k=5, include_revcompl=True):
+        self.k = k
+        self.include_revcompl = include_revcompl
+        self.oligos = []
+        self.kmers = np.empty(0, dtype=np.uint64)
+        self._kmer_oligos = None  # k-mer code -> list of oligo indices, created when needed.
+        self.add(oligos)
+
+    def __len__(self):
+        return len(self.kmers)
+
+    def _oligo_kmers(self, oligos):
+        """ Return list with one array of valid k-mer codes for each oligo (both strands if include_revcompl). """
+        by_length = {}
+        for i, oligo in enumerate(oligos):
+            by_length.setdefault(len(oligo), []).append(i)
+        oligo_kmers = [None] * len(oligos)
+        for idxs in by_length.values():
+            seqs = [oligos[i] for i in idxs]
+            kmers, valid = kmer_codes(encode_seqs(seqs), self.k)
+            if self.include_revcompl:
+                rc_kmers, rc_valid = kmer_codes(encode_seqs(dnarcomp(seqs)), self.k)
+                kmers, valid = np.hstack([kmers, rc_kmers]), np.hstack([valid, rc_valid])
+            for i, row_kmers, row_valid in zip(idxs, kmers, valid):
+                oligo_kmers[i] = row_kmers[row_valid]
+        return oligo_kmers
+
+    def add(self, oligos):
+        """ Add oligos to the index. """
+        if isinstance(oligos, str):
+            oligos = [oligos]
+        oligos = list(oligos)
+        new = self._oligo_kmers(oligos)
+        self.oligos.extend(oligos)
+        if new:
+            self.kmers = np.unique(np.concatenate([self.kmers] + new))
+            self._kmer_oligos = None
+
+    def contains_codes(self, kmers):
+        """ Return boolean array, True for k-mer codes present in the index. """
+        if len(self.kmers) == 0:
+            return np.zeros(np.shape(kmers), dtype=bool)
+        pos = np.searchsorted(self.kmers, kmers)
+        return self.kmers[np.minimum(pos, len(self.kmers) - 1)] == kmers
+
+    def __contains__(self, kmer):
+        kmers, valid = kmer_codes(encode_seqs(kmer)[0], self.k)
+        return len(kmer) == self.k and bool(valid.all()) and bool(self.contains_codes(kmers).all())
+
+    def screen(self, candidates):
+        """ Return boolean array, True for the candidates sharing at least one k-mer with the indexed oligos.
+        Candidates are processed in batches of equal length.
+        """
+        candidates = list(candidates)
+        has_match = np.zeros(len(candidates), dtype=bool)
+        by_length = {}
+        for i, cand in enumerate(candidates):
+            by_length.setdefault(len(cand), []).append(i)
+        for idxs in by_length.values():
+            kmers, valid = kmer_codes(encode_seqs([candidates[i] for i in idxs]), self.k)
+            has_match[idxs] = (self.contains_codes(kmers) & valid).any(axis=1)
+        return has_match
+
+    def matching_oligos(self, kmer):
+        """ Return list of indexed oligos containing kmer (or its reverse complement, if include_revcompl). """
+        if self._kmer_oligos is None:
+            self._kmer_oligos = {}
+            for i, kmers in enumerate(self._oligo_kmers(self.oligos)):
+                for code in set(kmers.tolist()):
+                    self._kmer_oligos.setdefault(code, []).append(i)
+        kmers, valid = kmer_codes(encode_seqs(kmer)[0], self.k)
+        if len(kmer) != self.k or not valid.all():
+            return []
+        return [self.oligos[i] for i in self._kmer_oligos.get(int(kmers[0, 0]), [])]
+
+
+def check_candidates(candlist, existing_set, permlen=5, return_matchdata=True):
     """
     Screen candidates against an existing set of oligos,
     returning candidates that do not share similarity with oligos in the existing set.
     Currently, two oligos are considered "similar" if they have a stretch of <permlen>
-    that is identical between the two.
-    Returns a tuple with (candidates, matchdata)
+    that is identical between the two (either strand).
+    existing_set can be a list of oligos, or a `KmerIndex` (to screen many batches against the same oligos).
+    Returns a tuple with (candidates, matchdata), where matchdata is None unless return_matchdata is True.
+    matchdata has one entry per candidate (and reverse complement), which is empty for candidates without a match.
     This function uses set logic, so order is NOT maintained.
     """
-
-    candidates = copy(candlist)  # Otherwise, you might make alterations to the existing list !!
+    candidates = list(candlist)  # Otherwise, you might make alterations to the existing list !!
     candidates += dnarcomp(candidates)  # Need to do this before so we can reference them.
-    candidates5mers = seq_permuts(candidates, permlen=permlen, includerevcompl=False, returnflatlist=False)
-    # print candidates5mers
-    matchdata = [[[(i, candidates[i], cand5mer, existing) for existing in existing_set if cand5mer in existing]
-                  for cand5mer in cand5mers]
-                 for i, cand5mers in enumerate(candidates5mers)]
-    match5mer = {match[0] for candidate5mers in candidates5mers for cand5mer in candidate5mers for match in cand5mer}
-    candidates = set(candidates) - match5mer  # set algorithmics. Just make sure both are sets.
+    if isinstance(existing_set, KmerIndex):
+        index = existing_set
+    else:
+        index = KmerIndex(existing_set, k=permlen)
+    has_match = index.screen(candidates)
+    matchdata = None
+    if return_matchdata:
+        # List with one list per candidate, with one list of (i, candidate, kmer, existing) tuples for each kmer.
+        # Only candidates with a match are split into k-mers; candidates without a match just get an empty list.
+        matchdata = [[[(i, cand, kmer, existing) for existing in index.matching_oligos(kmer)]
+                      for kmer in genparts(index.k, cand)] if match else []
+                     for i, (cand, match) in enumerate(zip(candidates, has_match))]
+    candidates = {cand for cand, match in zip(candidates, has_match) if not match}
     return candidates, matchdata
 
-    # Interpreting "incomprehensible list comprehensions":
-    # Essentially just expand to:
-#    for candidate5mers in candidates5mers:
-#        for cand5mer in candidate5mers:
-#            for match in cand5mer:
-#                match[0]
-    # (or, if starting by the expanded for-loop construct, contract by removing
-    # extra characters and move h to the beginning.)
-
 
 def test_check_candidates(candidates=None):
     # All handles down to rs4a.
@@ -262,6 +391,7 @@ def test_check_candidates(candidates=None):
 def generate_random_seqs(seqlength, desiredseqs, haltafter=10000, verbose=False, permlen=5, newseq="semi-random"):
     """
     Can also be implemented as iterator...
+    For generating many sequences, use `generate_random_seqs_batched()`, which is much faster.
     """
     def semirandomnewseq(seq):
         return "".join([N if randint(0, 1) else nucs[randint(0, 3)] for N in seq])
@@ -317,6 +447,138 @@ def generate_random_seqs(seqlength, desiredseqs, haltafter=10000, verbose=False,
     return list(seqs), hits, n_tries  # returning as list not set in order to serialize with JSON.
 
 
+DEFAULT_AVOID_SEQS = ("AAAA", "TTTT", "GGGG", "CCCC", "GCGCGC", "CGCGCG")
+
+
+def sample_seq_batch(seqlength, batch_size, seed=None, gc_content=(0.4, 0.7), avoid_seqs=DEFAULT_AVOID_SEQS):
+    """ Sample a batch of random sequences and discard sequences failing the GC-content and avoid-sequence filters.
+
+    Args:
+        seqlength: Length of the sequences.
+        batch_size: The number of sequences to sample.
+        seed: Seed (or numpy SeedSequence) for the random number generator.
+        gc_content: (min, max) tuple, the GC-content must be strictly between these.
+        avoid_seqs: Sequences must not contain any of these (e.g. homopolymers).
+
+    Returns:
+        (codes, idxs) tuple, with codes being a (n_passed x seqlength) uint8 array of nucleotide codes
+        (see `encode_seqs()`), and idxs the index of each passed sequence within the batch.
+    """
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, 4, size=(batch_size, seqlength), dtype=np.uint8)
+    gc = np.count_nonzero((codes == NUC_CODES[ord("G")]) | (codes == NUC_CODES[ord("C")]), axis=1) / seqlength
+    idxs = np.flatnonzero((gc_content[0] < gc) & (gc < gc_content[1]))
+    codes = codes[idxs]
+    for avoid_seq in avoid_seqs:
+        n_windows = seqlength - len(avoid_seq) + 1
+        if n_windows < 1:
+            continue
+        found = np.ones((len(codes), n_windows), dtype=bool)
+        for offset, code in enumerate(encode_seqs(avoid_seq)[0]):
+            found &= codes[:, offset:offset + n_windows] == code
+        keep = ~found.any(axis=1)
+        codes, idxs = codes[keep], idxs[keep]
+    return codes, idxs
+
+
+def _sample_seq_batch(args):
+    return sample_seq_batch(*args)
+
+
+def decode_seqs(codes):
+    """ Decode a (n_seqs x seqlength) array of nucleotide codes to a list of sequence strings. """
+    chars = np.frombuffer(b"ACGT", dtype=np.uint8)[codes]
+    return [row.tobytes().decode('ascii') for row in np.atleast_2d(chars)]
+
+
+def generate_random_seqs_batched(
+        seqlength, desiredseqs, haltafter=10**7, permlen=5,
+        gc_content=(0.4, 0.7), avoid_seqs=DEFAULT_AVOID_SEQS,
+        existing_seqs=None, batch_size=2**14, seed=None, processes=1, verbose=False,
+):
+    """ Generate random sequences with unique k-mers, sampling and filtering large batches using numpy.
+
+    Sequences are accepted (in sampling order) if they have GC-content within gc_content, contain none of
+    the avoid_seqs, and share no k-mer of length permlen (either strand) with previously accepted sequences
+    (or existing_seqs), same as `generate_random_seqs()` with newseq="random".
+    Unlike `seq_permuts()`, all k-mers of each sequence are considered, including the last one.
+
+    Sampling and filtering of batches can be done in parallel worker processes.
+    Each batch has its own seed, spawned from `seed`, so the result only depends on the seed and batch_size,
+    not on the number of processes.
+
+    Args:
+        seqlength: Length of the sequences to generate.
+        desiredseqs: The number of sequences to generate.
+        haltafter: Stop after this number of sampled sequences.
+        permlen: The k-mer length used for the uniqueness check.
+        gc_content: (min, max) tuple of allowed GC-content (exclusive).
+        avoid_seqs: Sequences (e.g. homopolymers) that must not be present in the generated sequences.
+        existing_seqs: Sequences (e.g. existing handles) whose k-mers must not be used by the new sequences.
+        batch_size: The number of sequences sampled per batch.
+        seed: Seed for the random number generator, for reproducible output.
+        processes: The number of worker processes used for sampling and filtering batches.
+        verbose: Print each new sequence.
+
+    Returns:
+        (seqs, hits, n_tries) tuple, same as `generate_random_seqs()`.
+    """
+    used_kmers = set(KmerIndex(existing_seqs or [], k=permlen).kmers.tolist())
+    seqs, hits = [], []
+    n_tries = 0
+    n_batches = -(-haltafter // batch_size)
+    batch_seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    batch_args = ((seqlength, min(batch_size, haltafter - i*batch_size), batch_seed, gc_content, avoid_seqs)
+                  for i, batch_seed in enumerate(batch_seeds))
+    executor = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    n_inflight = 2 * processes
+    futures = []
+    try:
+        while len(seqs) < desiredseqs:
+            # Only a few batches per worker are submitted at a time, so we can stop as soon as we are done:
+            arg_group = list(islice(batch_args, n_inflight))
+            if not arg_group:
+                break
+            if executor:
+                futures = [executor.submit(_sample_seq_batch, args) for args in arg_group]
+                results = (future.result() for future in futures)
+            else:
+                results = map(_sample_seq_batch, arg_group)
+            for args, (codes, idxs) in zip(arg_group, results):
+                if len(seqs) >= desiredseqs:
+                    break
+                batch_tries = n_tries
+                n_tries += args[1]
+                if len(codes) == 0:
+                    continue
+                kmers, _ = kmer_codes(codes, permlen)
+                rc_kmers, _ = kmer_codes(3 - codes[:, ::-1], permlen)
+                all_kmers = np.hstack([kmers, rc_kmers])
+                # Discard candidates with k-mers used before this batch, then check the rest one by one:
+                if used_kmers:
+                    used = np.fromiter(used_kmers, dtype=np.uint64, count=len(used_kmers))
+                    keep = ~np.isin(all_kmers, used).any(axis=1)
+                    codes, idxs, all_kmers = codes[keep], idxs[keep], all_kmers[keep]
+                for row, idx, row_kmers in zip(codes, idxs, all_kmers.tolist()):
+                    if used_kmers.isdisjoint(row_kmers):
+                        used_kmers.update(row_kmers)
+                        seq = decode_seqs(row)[0]
+                        seqs.append(seq)
+                        hits.append((len(seqs), batch_tries + int(idx) + 1))
+                        if verbose:
+                            print("{1}: {0}/{3} New sequence: {2}".format(len(seqs), hits[-1][1], seq, desiredseqs))
+                        if len(seqs) >= desiredseqs:
+                            n_tries = batch_tries + int(idx) + 1
+                            break
+    finally:
+        if executor:
+            # Cancel batches that are no longer needed (shutdown(cancel_futures=True) requires Python 3.9+):
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+    return seqs, hits, n_tries
+
+
 def test_generate_random_seqs():
     """
     It might be fun to do a comparison of the rate profile for all-random-new-seq vs half-random and plot them.
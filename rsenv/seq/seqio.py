@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##    Copyright 2013 Rasmus Scholer Sorensen, rasmusscholer@gmail.com
+##
+##    This program is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    This program is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+Module for streaming sequence records from FASTA, FASTQ, and plain sequence files (optionally gzipped).
+
+Records are yielded one at a time (or in batches of N records), so memory usage does not depend on the file size:
+
+    >>> for seqid, seq in read_sequences("BION.BAR_C8.F.clean.FR.clean.uniq.gz"):
+    ...     pass
+    >>> for batch in read_sequence_batches("reads.fastq.gz", batch_size=10000, as_bytes=True):
+    ...     pass
+
+Supported formats:
+    'fasta':    ">id" header lines, followed by one or more sequence lines.
+    'fastq':    Four-line records, "@id", sequence, "+", qualities (also the "uniq" format used by rsjsnaptamer).
+    'plain':    One sequence per line; the record id is the line number.
+The format is detected from the first non-empty line if not given.
+
+With as_bytes=True, the file is read in binary mode and ids and sequences are yielded as bytes,
+avoiding the cost of decoding (useful when the consumer works on bytes, e.g. numpy encoding or bytes regexes).
+
+"""
+
+import gzip
+from itertools import islice, chain
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_seqfile(path, as_bytes=False):
+    """ Open a sequence file for reading, transparently decompressing gzipped files. """
+    with open(path, 'rb') as fd:
+        is_gzip = fd.read(2) == GZIP_MAGIC
+    mode = 'rb' if as_bytes else 'rt'
+    if is_gzip:
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def detect_format(line):
+    """ Detect the sequence file format from the first non-empty line. """
+    first = line[:1]
+    if first in ('>', b'>'):
+        return 'fasta'
+    if first in ('@', b'@'):
+        return 'fastq'
+    return 'plain'
+
+
+def _iter_fasta(lines, empty):
+    seqid, seq_lines = None, []
+    for line in lines:
+        line = line.strip()
+        if line[:1] in ('>', b'>'):
+            if seqid is not None:
+                yield seqid, empty.join(seq_lines)
+            seqid, seq_lines = line[1:], []
+        elif line:
+            seq_lines.append(line)
+    if seqid is not None:
+        yield seqid, empty.join(seq_lines)
+
+
+def _iter_fastq(lines, with_quality):
+    lines = (line for line in lines if line.strip())
+    while True:
+        record = list(islice(lines, 4))
+        if not record:
+            return
+        if len(record) < 4:
+            raise ValueError("Truncated FASTQ record: %r" % (record,))
+        header, seq, _, quality = (line.strip() for line in record)
+        if with_quality:
+            yield header[1:], seq, quality
+        else:
+            yield header[1:], seq
+
+
+def _iter_plain(lines, as_bytes):
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield (str(lineno).encode() if as_bytes else str(lineno)), line
+
+
+def read_sequences(source, fmt=None, as_bytes=False, upper=False, with_quality=False):
+    """
+    Generator yielding (seqid, seq) records from a sequence file.
+
+    Args:
+        source: Path to a FASTA/FASTQ/plain sequence file (optionally gzipped), or an open file / iterable of lines.
+        fmt: 'fasta', 'fastq', or 'plain'. Default is to detect the format from the first line.
+        as_bytes: Yield ids and sequences as bytes instead of str (only when source is a path).
+        upper: Convert sequences to upper case.
+        with_quality: For FASTQ files, yield (seqid, seq, quality) records.
+
+    Yields:
+        (seqid, seq) tuples, or (seqid, seq, quality) tuples for FASTQ files if with_quality is True.
+    """
+    if isinstance(source, str):
+        with open_seqfile(source, as_bytes=as_bytes) as fd:
+            yield from read_sequences(fd, fmt=fmt, as_bytes=as_bytes, upper=upper, with_quality=with_quality)
+        return
+    lines = iter(source)
+    first = next((line for line in lines if line.strip()), None)
+    if first is None:
+        return
+    as_bytes = isinstance(first, bytes)
+    lines = chain([first], lines)
+    fmt = fmt or detect_format(first)
+    if fmt == 'fasta':
+        records = _iter_fasta(lines, empty=b'' if as_bytes else '')
+    elif fmt == 'fastq':
+        records = _iter_fastq(lines, with_quality=with_quality)
+    elif fmt == 'plain':
+        records = _iter_plain(lines, as_bytes=as_bytes)
+    else:
+        raise ValueError("Unknown sequence file format %r, must be 'fasta', 'fastq', or 'plain'." % (fmt,))
+    if upper:
+        records = ((record[0], record[1].upper()) + tuple(record[2:]) for record in records)
+    yield from records
+
+
+def read_sequence_batches(source, batch_size=10000, **kwargs):
+    """ Generator yielding lists of up to batch_size records, see `read_sequences()` for arguments. """
+    records = read_sequences(source, **kwargs)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -28,10 +28,17 @@ import string
 
 atgc = "ATGC"
 basemap = dict(list(zip("ATGC", "TACG")))
+# Sequences at least this long are complemented using the vectorized `packedseq` kernels:
+PACKED_MIN_LENGTH = 256
 
 
 def rcompl(seq):
     """ Returns reversed complement of seq. """
+    if len(seq) >= PACKED_MIN_LENGTH:
+        from .packedseq import acgt_compl  # Imported here, since packedseq imports seqgen, which imports sequtil.
+        rc = acgt_compl(seq)
+        if rc is not None:
+            return rc
     return "".join(basemap[n] for n in reversed(seq))
     # Alternatively, use map instead of for for loop)
     # b = "".join(map(lambda x: {"t": "a", "a": "t", "c": "g", "g": "c"}[x], a.lower())[::-1])
@@ -39,6 +46,11 @@ def rcompl(seq):
 
 def compl(seq):
     """ Returns reversed complement of seq. """
+    if len(seq) >= PACKED_MIN_LENGTH:
+        from .packedseq import acgt_compl
+        comp = acgt_compl(seq, reverse=False)
+        if comp is not None:
+            return comp
     return "".join(basemap[n] for n in seq)
 
 
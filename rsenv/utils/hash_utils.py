@@ -15,6 +15,10 @@ for sets of lines in text files:
 The CLI tools above outputs the hash of each file argument to stdout in the standard checksum format:
     {hex_digest} *{file}
 
+Files are read and hashed line by line, so memory usage does not depend on the file size
+(except for the `setsum` versions, which must keep a 32-byte digest for each unique line).
+Use `--jobs N` to hash many files in parallel, using N worker processes.
+
 
 
 Note: While this is my own implementation, the method is exactly what is used by existing solutions,
@@ -53,6 +57,8 @@ References:
 
 """
 import hashlib  # Use `hashlib.algorithms_available` to see available hashes.
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import click
 # import inspect
 
@@ -108,20 +114,28 @@ def sum_mod(vals, mod=2**256):
 
 def sha256_sumsum_int(elements, mod=2 ** 256):
     """ Returns the sum of the sha256 hash of each element in `elements`.
+    Elements are hashed and added one at a time, so `elements` can be a generator.
     """
-    hashes = [sha256_int(elem) for elem in elements]
-    hash_sum = sum(hashes) % mod
-    return hash_sum
+    hash_sum = 0
+    for elem in elements:
+        hash_sum += int.from_bytes(hashlib.sha256(elem.encode('utf-8')).digest(), byteorder='big')
+    return hash_sum % mod
 
 
 def sha256_setsum_int(elements, mod=2 ** 256):
     """ Returns the sum of the set of the sha256 hash of each element in `elements`.
     This is almost the same as `sha256_sumsum_int`, except that duplicate elements are removed before calculating the sum.
     This is exactly the same as `sha256_sumsum_int(set(elements)).
+    Elements are hashed one at a time; only the (32 byte) digests of unique elements are kept, to detect duplicates.
     """
-    hashes = set([sha256_int(elem) for elem in elements])
-    hash_sum = sum(hashes) % mod
-    return hash_sum
+    seen = set()
+    hash_sum = 0
+    for elem in elements:
+        digest = hashlib.sha256(elem.encode('utf-8')).digest()
+        if digest not in seen:
+            seen.add(digest)
+            hash_sum += int.from_bytes(digest, byteorder='big')
+    return hash_sum % mod
 
 
 def sha256_sumsum_hexdigest(elements, mod=2**256):
@@ -156,28 +170,149 @@ def sequencesethash(sequences, mod=2**256, base_filter=None, mod_regex=r"\/[^\/]
     * Should we remove or include modifications? - These should be removed, but that requires a regex to find them.
     * Should we remove empty lines? - Yes.
     """
-    sequences = [seq.strip() for seq in sequences]  # convert to upper case
-    if mod_regex and not include_mods:
-        if isinstance(mod_regex, str):
-            import re
-            mod_regex = re.compile(mod_regex)
-        sequences = ["".join(mod_regex.split(seq)) for seq in sequences]
-    if base_filter:
-        sequences = [base_filter(seq) for seq in sequences]
-    sequences = [seq.upper() for seq in sequences if seq]  # convert to upper case and remove empty lines.
+    normalize = sequence_normalizer(base_filter=base_filter, mod_regex=mod_regex, include_mods=include_mods)
+    sequences = (normalize(seq) for seq in sequences)
+    sequences = (seq for seq in sequences if seq)  # remove empty lines.
     return sha256_setsum_hexdigest(sequences, mod=mod)
 
 
-def read_lines_from_file(file, strip_eol=False, strip_whitespace=False, remove_empty_lines=False):
+def sequence_normalizer(base_filter=None, mod_regex=r"\/[^\/]*?\/", include_mods=False):
+    """ Return function normalizing a sequence the same way as `sequencesethash()`:
+    Strip whitespace, remove modifications (unless include_mods), apply base_filter, and convert to upper case.
+    Empty sequences are returned as "", and should be skipped.
+    """
+    if mod_regex and not include_mods and isinstance(mod_regex, str):
+        import re
+        mod_regex = re.compile(mod_regex)
+
+    def normalize(seq):
+        seq = seq.strip()
+        if mod_regex and not include_mods:
+            seq = "".join(mod_regex.split(seq))
+        if base_filter:
+            seq = base_filter(seq)
+        return seq.upper() if seq else ""
+
+    return normalize
+
+
+class MultisetHash:
+    """ Incremental, order-independent hash of a multiset (or set) of strings, e.g. the oligos in a pool.
+
+    The hash is the sum of the sha256 hash of each element (modulo 2**256), so elements can be added and removed
+    one at a time: Updating the hash of a 10k oligo pool after swapping 20 staples only requires 40 hash operations.
+    A reference count is kept for each element (by digest), so removing an element that is not present raises KeyError.
+
+    Modes:
+        'set':      Each unique element is only counted once, same as `sha256_setsum_hexdigest()`
+                    (and `sequencesethash()`, if normalize is `sequence_normalizer()`).
+        'multiset': Each occurrence of an element is counted, same as `sha256_sumsum_hexdigest()`.
+
+    Usage:
+        >>> pool = MultisetHash(oligos, normalize=sequence_normalizer())
+        >>> pool.remove("ACGTACGT")
+        >>> pool.add("TTGCATTG")
+        >>> pool.hexdigest()
+    """
+
+    def __init__(self, elements=(), mode='set', normalize=None, mod=2**256):
+        if mode not in ('set', 'multiset'):
+            raise ValueError("mode must be either 'set' or 'multiset', not %r." % (mode,))
+        self.mode = mode
+        self.normalize = normalize
+        self.mod = mod
+        self.counts = {}  # digest -> reference count
+        self.hash_sum = 0
+        self.update(elements)
+
+    def _digest(self, elem):
+        if self.normalize is not None:
+            elem = self.normalize(elem)
+            if not elem:
+                return None
+        return hashlib.sha256(elem.encode('utf-8')).digest()
+
+    def _add_digest(self, digest, count):
+        old_count = self.counts.get(digest, 0)
+        new_count = old_count + count
+        if new_count < 0:
+            raise KeyError("Cannot remove %s occurrences of an element with %s occurrences." % (-count, old_count))
+        if new_count:
+            self.counts[digest] = new_count
+        else:
+            del self.counts[digest]
+        if self.mode == 'set':
+            count = (new_count > 0) - (old_count > 0)
+        if count:
+            self.hash_sum = (self.hash_sum + count * int.from_bytes(digest, byteorder='big')) % self.mod
+
+    def add(self, elem, count=1):
+        """ Add element (count times). Elements that are empty after normalization are ignored. """
+        digest = self._digest(elem)
+        if digest is not None:
+            self._add_digest(digest, count)
+
+    def remove(self, elem, count=1):
+        """ Remove element (count times). Raises KeyError if the element is not present (count times). """
+        digest = self._digest(elem)
+        if digest is not None:
+            self._add_digest(digest, -count)
+
+    def update(self, elements):
+        for elem in elements:
+            self.add(elem)
+
+    def merge(self, other):
+        """ Add all elements (with reference counts) of another MultisetHash to this one. Returns self. """
+        if (other.mode, other.mod) != (self.mode, self.mod):
+            raise ValueError("Cannot merge MultisetHash objects with different mode or modulus.")
+        for digest, count in other.counts.items():
+            self._add_digest(digest, count)
+        return self
+
+    def copy(self):
+        new = MultisetHash(mode=self.mode, normalize=self.normalize, mod=self.mod)
+        new.counts = dict(self.counts)
+        new.hash_sum = self.hash_sum
+        return new
+
+    def __contains__(self, elem):
+        return self._digest(elem) in self.counts
+
+    def __len__(self):
+        """ The number of unique elements. """
+        return len(self.counts)
+
+    def __eq__(self, other):
+        if not isinstance(other, MultisetHash):
+            return NotImplemented
+        return (self.mode, self.hash_sum) == (other.mode, other.hash_sum)
+
+    def intdigest(self):
+        return self.hash_sum
+
+    def hexdigest(self):
+        return f'{self.hash_sum:0x}'
+
+
+def iter_lines_from_file(file, strip_eol=False, strip_whitespace=False, remove_empty_lines=False):
+    """ Generator yielding the lines of `file` one at a time, processed the same way as `read_lines_from_file()`. """
     with open(file) as fp:
-        lines = fp.readlines()
-    if strip_eol:
-        lines = [line.strip('\n') for line in lines]
-    if strip_whitespace:
-        lines = [line.strip() for line in lines if line]
-    if remove_empty_lines:
-        lines = [line for line in lines if line]
-    return lines
+        for line in fp:
+            if strip_eol:
+                line = line.strip('\n')
+            if strip_whitespace:
+                if not line:
+                    continue
+                line = line.strip()
+            if remove_empty_lines and not line:
+                continue
+            yield line
+
+
+def read_lines_from_file(file, strip_eol=False, strip_whitespace=False, remove_empty_lines=False):
+    return list(iter_lines_from_file(
+        file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines))
 
 
 def file_sha256sumsum(file, strip_eol=True, strip_whitespace=False, remove_empty_lines=False):
@@ -192,7 +327,7 @@ def file_sha256sumsum(file, strip_eol=True, strip_whitespace=False, remove_empty
       Also, "sha256sumsum" goes well along with the "sha256setsum", which is the version
       that removes duplicate line-hashes.
     """
-    lines = read_lines_from_file(
+    lines = iter_lines_from_file(
         file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
     return sha256_sumsum_hexdigest(lines)
 
@@ -201,7 +336,7 @@ def file_sha256setsum(file, strip_eol=True, strip_whitespace=False, remove_empty
     """ Create an "order-independent" sha256 hash of the lines in `file` (excluding EOL characters).
     This `setsum` version removes duplicate lines (line hashes) before calculating the order-independent hash.
     """
-    lines = read_lines_from_file(
+    lines = iter_lines_from_file(
         file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
     return sha256_setsum_hexdigest(lines)
 
@@ -213,20 +348,32 @@ def file_sequencesethash(file, strip_eol=True, strip_whitespace=True, remove_emp
     and remove duplicate lines (line hashes)
     before calculating the order-independent hash.
     """
-    lines = read_lines_from_file(
+    lines = iter_lines_from_file(
         file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
     return sequencesethash(lines)
 
 
+def hash_files(hash_func, files, jobs=1, **kwargs):
+    """ Generator yielding (file, hex_digest) for each file, in order, hashing up to `jobs` files in parallel. """
+    hash_file = partial(hash_func, **kwargs)
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from zip(files, executor.map(hash_file, files))
+    else:
+        for file in files:
+            yield file, hash_file(file)
+
+
 @click.command()
 @click.option('--strip-eol', default=True)
 @click.option('--strip-whitespace', default=False)
 @click.option('--remove-empty-lines', default=False)
+@click.option('--jobs', '-j', default=1, help="Number of files to hash in parallel.")
 @click.argument('files', nargs=-1)
-def file_sha256sumsum_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True):
-    for file in files:
-        hex_digest = file_sha256sumsum(
-            file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
+def file_sha256sumsum_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True, jobs=1):
+    for file, hex_digest in hash_files(
+            file_sha256sumsum, files, jobs=jobs,
+            strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines):
         print(f"{hex_digest} *{file}")
 
 
@@ -234,11 +381,12 @@ def file_sha256sumsum_cli(files, strip_eol=True, strip_whitespace=True, remove_e
 @click.option('--strip-eol', default=True)
 @click.option('--strip-whitespace', default=False)
 @click.option('--remove-empty-lines', default=False)
+@click.option('--jobs', '-j', default=1, help="Number of files to hash in parallel.")
 @click.argument('files', nargs=-1)
-def file_sha256setsum_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True):
-    for file in files:
-        hex_digest = file_sha256setsum(
-            file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
+def file_sha256setsum_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True, jobs=1):
+    for file, hex_digest in hash_files(
+            file_sha256setsum, files, jobs=jobs,
+            strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines):
         print(f"{hex_digest} *{file}")
 
 
@@ -246,11 +394,12 @@ def file_sha256setsum_cli(files, strip_eol=True, strip_whitespace=True, remove_e
 @click.option('--strip-eol', default=True)
 @click.option('--strip-whitespace', default=True)
 @click.option('--remove-empty-lines', default=True)
+@click.option('--jobs', '-j', default=1, help="Number of files to hash in parallel.")
 @click.argument('files', nargs=-1)
-def file_sequencesethash_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True):
-    for file in files:
-        hex_digest = file_sequencesethash(
-            file, strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
+def file_sequencesethash_cli(files, strip_eol=True, strip_whitespace=True, remove_empty_lines=True, jobs=1):
+    for file, hex_digest in hash_files(
+            file_sequencesethash, files, jobs=jobs,
+            strip_eol=strip_eol, strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines):
         print(f"{hex_digest} *{file}")
 
 # Click CLI Commands:
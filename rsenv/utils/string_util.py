@@ -1,5 +1,6 @@
 import hashlib
 import itertools
+import numpy as np
 
 class Simhash():
     def __init__(self, text):
@@ -94,3 +95,127 @@ space         String  the key of the space that this page belongs to
         print(ret)
     return ret
 
+
+
+def simhash_fingerprints(texts, hashbits=64, tokenizer=str.split, batch_size=1000):
+    """
+    Calculate simhash fingerprints for many texts at once, using numpy.
+    Tokens are hashed with sha384 (like Simhash), keeping the lowest hashbits bits, so with hashbits=384
+    the fingerprints are the same as Simhash(text).hash. Each unique token is only hashed once.
+    Returns a (len(texts) x hashbits/8) uint8 array, with each fingerprint as big-endian bytes.
+    """
+    if hashbits % 8 or not 0 < hashbits <= 384:
+        raise ValueError("hashbits must be a multiple of 8, at most 384.")
+    nbytes = hashbits // 8
+    token_hashes = {}  # token -> hash digest, so each unique token is only hashed once.
+    fingerprints = []
+    texts = iter(texts)
+    while True:
+        batch = list(itertools.islice(texts, batch_size))
+        if not batch:
+            break
+        batch_tokens = {}  # token -> row in the bit matrix for this batch
+        token_idxs, ends = [], []
+        for text in batch:
+            for token in tokenizer(text):
+                if token not in batch_tokens:
+                    batch_tokens[token] = len(batch_tokens)
+                    if token not in token_hashes:
+                        token_hashes[token] = hashlib.sha384(token.encode()).digest()[-nbytes:]
+                token_idxs.append(batch_tokens[token])
+            ends.append(len(token_idxs))
+        digests = b"".join(token_hashes[token] for token in batch_tokens)
+        # +1/-1 for each bit of each token hash, least significant bit first:
+        all_bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, nbytes)[:, ::-1],
+                                 axis=1, bitorder='little')
+        signs = all_bits.astype(np.int8) * 2 - 1
+        # One row per token in the batch, plus a final zero row, so texts without tokens can be summed:
+        signs = np.vstack([signs[np.array(token_idxs, dtype=np.intp)], np.zeros((1, hashbits), dtype=np.int8)])
+        ends = np.array(ends, dtype=np.intp)
+        starts = np.concatenate(([0], ends[:-1])).astype(np.intp)
+        votes = np.add.reduceat(signs, starts, axis=0, dtype=np.int32)
+        votes[starts == ends] = 0
+        fingerprints.append(np.packbits(votes >= 0, axis=1, bitorder='little')[:, ::-1])
+    if not fingerprints:
+        return np.zeros((0, nbytes), dtype=np.uint8)
+    return np.ascontiguousarray(np.vstack(fingerprints))
+
+
+def hamming_distances(fingerprint, fingerprints):
+    """ Return array with the number of differing bits between fingerprint and each row of fingerprints. """
+    return np.unpackbits(np.bitwise_xor(fingerprints, fingerprint), axis=-1).sum(axis=-1)
+
+
+class SimhashIndex:
+    """
+    Locality-sensitive hashing (LSH) index for finding near-duplicate texts by simhash fingerprint.
+
+    Each fingerprint is split into bands; texts sharing at least one band (exactly) are candidates.
+    By the pigeonhole principle, fingerprints differing in fewer than bands bits always share a band,
+    so with max_distance < bands, no near-duplicates are missed, without comparing all pairs.
+
+    Usage:
+        >>> index = SimhashIndex(hashbits=64, bands=4)
+        >>> index.add_texts(texts, keys=filenames)
+        >>> for key1, key2, distance in index.near_duplicates(max_distance=3):
+        ...     print(key1, key2, distance)
+    """
+
+    def __init__(self, hashbits=64, bands=4, tokenizer=str.split):
+        if hashbits % (8*bands):
+            raise ValueError("hashbits must be divisible in bands of whole bytes.")
+        self.hashbits = hashbits
+        self.bands = bands
+        self.band_bytes = hashbits // 8 // bands
+        self.tokenizer = tokenizer
+        self.keys = []
+        self.fingerprints = np.zeros((0, hashbits // 8), dtype=np.uint8)
+        self.buckets = [{} for _ in range(bands)]  # band -> {band bytes: [index of key, ...]}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _band_values(self, fingerprint):
+        fingerprint = bytes(fingerprint)
+        return [fingerprint[band*self.band_bytes:(band+1)*self.band_bytes] for band in range(self.bands)]
+
+    def add_fingerprints(self, fingerprints, keys):
+        fingerprints = np.asarray(fingerprints, dtype=np.uint8)
+        for key, fingerprint in zip(keys, fingerprints):
+            for bucket, value in zip(self.buckets, self._band_values(fingerprint)):
+                bucket.setdefault(value, []).append(len(self.keys))
+            self.keys.append(key)
+        self.fingerprints = np.vstack([self.fingerprints, fingerprints])
+
+    def add_texts(self, texts, keys=None):
+        texts = list(texts)
+        if keys is None:
+            keys = range(len(self.keys), len(self.keys) + len(texts))
+        self.add_fingerprints(simhash_fingerprints(texts, self.hashbits, tokenizer=self.tokenizer), keys)
+
+    def query(self, text, max_distance=None):
+        """ Return list of (key, distance) for indexed texts sharing a band with text, sorted by distance. """
+        fingerprint = simhash_fingerprints([text], self.hashbits, tokenizer=self.tokenizer)[0]
+        idxs = sorted({idx for bucket, value in zip(self.buckets, self._band_values(fingerprint))
+                       for idx in bucket.get(value, ())})
+        distances = hamming_distances(fingerprint, self.fingerprints[idxs]) if idxs else []
+        hits = [(self.keys[idx], int(distance)) for idx, distance in zip(idxs, distances)
+                if max_distance is None or distance <= max_distance]
+        return sorted(hits, key=lambda hit: hit[1])
+
+    def candidate_pairs(self):
+        """ Return set of (i, j) index pairs, i < j, of fingerprints sharing at least one band. """
+        pairs = set()
+        for bucket in self.buckets:
+            for idxs in bucket.values():
+                pairs.update(itertools.combinations(idxs, 2))
+        return pairs
+
+    def near_duplicates(self, max_distance=3):
+        """ Return list of (key1, key2, distance) for all candidate pairs within max_distance bits. """
+        pairs = sorted(self.candidate_pairs())
+        if not pairs:
+            return []
+        i, j = np.array(pairs).T
+        distances = np.unpackbits(self.fingerprints[i] ^ self.fingerprints[j], axis=1).sum(axis=1)
+        return [(self.keys[a], self.keys[b], int(d)) for a, b, d in zip(i, j, distances) if d <= max_distance]
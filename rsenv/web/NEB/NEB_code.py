@@ -37,6 +37,7 @@ import requests
 from requests.structures import CaseInsensitiveDict
 from bs4 import BeautifulSoup
 import logging
+from rsenv.seq.iupac import compile_motifs
 logger = logging.getLogger(__name__)
 
 
@@ -314,6 +315,27 @@ def get_cutters():
     #return lleash, ltempl
     return dict([('lleash', lleash), ('ltempl', ltempl)])
 
+def parse_cutters_table(cutters):
+    """ Parse a NEBcutter enzyme table (as in get_cutters) to a dict with {enzyme name: specificity}. """
+    return dict(line.split()[1:3] for line in cutters.strip().split('\n')
+                if line.strip() and not line.strip().startswith('#'))
+
+
+def find_cutter_sites(sequence, specificities):
+    """
+    Find all recognition sites in sequence (both strands) for a dict of {enzyme name: specificity},
+    where specificity is an IUPAC motif in NEBcutter notation, e.g. "GGTGA(N)7N".
+    sequence can also be an iterable of sequence chunks, e.g. an open FASTA file (without header lines).
+    Returns dict with {enzyme name: list of rsenv.seq.iupac.MotifHit tuples}.
+    """
+    matcher = compile_motifs(specificities, both_strands=True)
+    sites = {name: [] for name in specificities}
+    hits = matcher.finditer(sequence) if isinstance(sequence, str) else matcher.stream(sequence)
+    for hit in hits:
+        sites[hit.motif].append(hit)
+    return sites
+
+
 def all_cutters(strand):
     return set.union(*[set(v) for k, v in strand.items() if isinstance(v, (set, list))])
 
@@ -54,8 +54,10 @@ setup(
             # Instrument data analysis and conversion:
             'nanodrop-cli=rsenv.dataanalysis.nanodrop.nanodrop_cli:cli',
             'hplc-cli=rsenv.hplcutils.cli:hplc_cli',
+            'hplc-batch=rsenv.hplcutils.batch:hplc_batch_cli',
             'hplc-cdf-to-csv=rsenv.hplcutils.cdf_csv:cdf_csv_cli',
             'hplc-rename-cdf-files=rsenv.hplcutils.rename_cdf_files:rename_cdf_files_cli',
+            'hplc-similarity=rsenv.hplcutils.similarity:hplc_similarity_cli',
 
             # Other data-plotting CLIs:
             'ohwmon-log-plotter=rsenv.dataanalysis.openhardwaremonitor.ohwmon_log_plotter_cli:ohm_csv_plotter_cli',
@@ -115,6 +117,7 @@ setup(
             'cadnano-diff-jsondata=rsenv.origami.cadnano.cadnano_diff:cadnano_diff_jsondata_cli',
             # Finding and renaming cadnano files:
             'cadnano-file-search=rsenv.origami.cadnano.cadnano_file_search:find_cadnano_files_cli',
+            'cadnano-design-index=rsenv.origami.cadnano.cadnano_design_index:cadnano_design_index_cli',
 
             # Working with Cadnano output: staple strands oligo sequences, staple strand mapping, pooling:
             'cadnano-maptransformer=rsenv.origami.cadnano.cadnano_maptransform:cadnano_maptransformer_cli',
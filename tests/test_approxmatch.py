@@ -0,0 +1,87 @@
+"""
+
+Tests for `rsenv.seq.approxmatch`.
+
+"""
+
+import random
+import pytest
+
+from rsenv.seq.sequtil import dnarcomp
+from rsenv.seq.approxmatch import myers_search, hamming_search, approx_search, approx_find
+
+
+def brute_force_edit_ends(pattern, text):
+    """ Semi-global edit distance DP, returning the best distance for each end position. """
+    prev = list(range(len(pattern) + 1))
+    dists = []
+    for char in text:
+        cur = [0]
+        for i, pchar in enumerate(pattern, 1):
+            cur.append(min(prev[i - 1] + (pchar != char), prev[i] + 1, cur[i - 1] + 1))
+        dists.append(cur[-1])
+        prev = cur
+    return dists
+
+
+def random_seq(rnd, n):
+    return "".join(rnd.choice("ACGT") for _ in range(n))
+
+
+def test_myers_equals_dynamic_programming():
+    rnd = random.Random(0)
+    for _ in range(50):
+        pattern, text = random_seq(rnd, rnd.randint(1, 12)), random_seq(rnd, 200)
+        for k in range(3):
+            expected = [(j + 1, d) for j, d in enumerate(brute_force_edit_ends(pattern, text)) if d <= k]
+            assert list(myers_search(pattern, text, k)) == expected
+
+
+def test_hamming_equals_brute_force():
+    rnd = random.Random(1)
+    for _ in range(50):
+        pattern, text = random_seq(rnd, rnd.randint(1, 12)), random_seq(rnd, 200)
+        for k in range(3):
+            expected = []
+            for end in range(len(pattern), len(text) + 1):
+                d = sum(a != b for a, b in zip(pattern, text[end - len(pattern):end]))
+                if d <= k:
+                    expected.append((end, d))
+            assert list(hamming_search(pattern, text, k)) == expected
+
+
+@pytest.mark.parametrize("indels", [True, False])
+def test_approx_find_both_strands_and_no_cap(indels):
+    rnd = random.Random(2)
+    pattern = "GACAACAGACG"
+    mutant = pattern[:4] + ("T" if pattern[4] != "T" else "A") + pattern[5:]
+    parts = [random_seq(rnd, 30)]
+    for i in range(60):
+        parts.append(mutant if i % 2 else dnarcomp(pattern))
+        parts.append(random_seq(rnd, 30))
+    text = "".join(parts)
+    matches = approx_find(pattern, text, max_errors=1, indels=indels)
+    planted = [m for m in matches if m.matched in (mutant, dnarcomp(pattern))]
+    assert len(planted) == 60
+    assert {(m.strand, m.errors) for m in planted} == {('+', 1), ('-', 0)}
+    for match in matches:
+        assert match.errors <= 1
+        assert text[match.start:match.end] == match.matched
+
+
+def test_approx_find_circular():
+    pattern = "GACAACAGACG"
+    text = pattern[5:] + "T" * 40 + pattern[:5]
+    assert approx_find(pattern, text, max_errors=0, both_strands=False) == []
+    matches = approx_find(pattern, text, max_errors=0, both_strands=False, circular=True)
+    assert [(m.start, m.end, m.matched) for m in matches] == [(len(text) - 5, len(text) + 6, pattern)]
+
+
+@pytest.mark.parametrize("indels", [True, False])
+def test_approx_search_overlapping_and_periodic(indels):
+    assert approx_search("AAAAA", "AAAAAAAAA", 0, indels=indels) == [(i, i + 5, 0) for i in range(5)]
+    assert approx_search("ACAC", "ACACACAC", 0, indels=indels) == [(0, 4, 0), (2, 6, 0), (4, 8, 0)]
+    # With errors, each start is still reported once, with the best end:
+    hits = approx_search("AAAAA", "AAAAAAAAA", 1, indels=indels)
+    assert [(start, errors) for start, end, errors in hits if errors == 0] == [(i, 0) for i in range(5)]
+    assert len({start for start, end, errors in hits}) == len(hits)
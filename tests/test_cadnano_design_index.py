@@ -0,0 +1,77 @@
+"""
+
+Tests for `rsenv.origami.cadnano.cadnano_design_index`.
+
+"""
+
+import json
+import os
+
+from rsenv.origami.cadnano.cadnano_json_hashing_cli import vstrands_json_hash, DEFAULT_VSTRANDS_HASH_SPECS
+from rsenv.origami.cadnano.cadnano_design_index import (
+    CadnanoDesignIndex, cadnano_lattice, count_strands, index_cadnano_file,
+)
+
+
+def make_vstrands(length=42, color=0xff0000):
+    # Two helices, each with one 10-base staple, and a scaffold running through both:
+    vstrands = []
+    for h in range(2):
+        stap = [[-1, -1, -1, -1] for _ in range(length)]
+        for i in range(5, 15):
+            stap[i] = [h if i > 5 else -1, i-1 if i > 5 else -1, h if i < 14 else -1, i+1 if i < 14 else -1]
+        vstrands.append({"row": 0, "col": h, "num": h, "stap": stap, "scaf": [[h, 0, h, 1]]*length,
+                         "loop": [0]*length, "skip": [0]*length, "stapLoop": [], "scafLoop": [],
+                         "stap_colors": [[5, color]]})
+    return vstrands
+
+
+def write_design(path, name="design", **kwargs):
+    path.write_text(json.dumps({"name": name, "vstrands": make_vstrands(**kwargs)}))
+    return str(path)
+
+
+def test_stats():
+    vstrands = make_vstrands()
+    assert count_strands(vstrands) == 2
+    assert cadnano_lattice(vstrands) == "honeycomb"
+    assert cadnano_lattice(make_vstrands(length=64)) == "square"
+
+
+def test_index_cadnano_file(tmp_path):
+    record = index_cadnano_file(write_design(tmp_path / "a.json"))
+    assert (record["n_helices"], record["n_staples"], record["lattice"]) == (2, 2, "honeycomb")
+    assert record["hashes"]["routing"] == vstrands_json_hash(
+        make_vstrands(), **DEFAULT_VSTRANDS_HASH_SPECS["vstrands-stap-scaf-loops-skips"])
+
+
+def test_design_index(tmp_path):
+    designs = tmp_path / "designs"
+    (designs / "old").mkdir(parents=True)
+    a = write_design(designs / "a.json", name="a")
+    copy = write_design(designs / "old" / "a - Copy.json", name="a - copy")
+    recolored = write_design(designs / "old" / "recolored.json", color=0x00ff00)
+    other = write_design(designs / "other.json", length=63)
+    (designs / "not_cadnano.json").write_text(json.dumps({"a": 1}))
+    index_file = str(tmp_path / "index.json")
+
+    index = CadnanoDesignIndex.load(index_file)
+    added, removed = index.update(designs)
+    assert sorted(added) == sorted(map(os.path.abspath, [a, copy, recolored, other]))
+    assert len(index) == 4
+    index.save()
+
+    assert index.same_as(a) == sorted(map(os.path.abspath, [copy, recolored]))
+    assert index.same_as(a, hash_name="all-attributes") == [os.path.abspath(copy)]
+    assert index.same_as(other) == []
+    assert index.duplicates("colors") == [sorted(map(os.path.abspath, [a, copy, other]))]
+
+    # Reloaded index only re-indexes changed files, and removes deleted files:
+    index = CadnanoDesignIndex.load(index_file)
+    assert len(index) == 4 and index.update(designs) == ([], [])
+    os.remove(copy)
+    write_design(designs / "other.json", length=42)
+    os.utime(other, ns=(0, 0))
+    added, removed = index.update(designs)
+    assert added == [os.path.abspath(other)] and removed == [os.path.abspath(copy)]
+    assert index.same_as(a) == sorted(map(os.path.abspath, [other, recolored]))
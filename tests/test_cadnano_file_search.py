@@ -0,0 +1,78 @@
+"""
+
+Tests for `rsenv.origami.cadnano.cadnano_file_search`.
+
+"""
+
+import json
+
+import pytest
+
+from rsenv.origami.cadnano import cadnano_file_search
+from rsenv.origami.cadnano.cadnano_file_search import (
+    find_cadnano_files, iter_cadnano_files, sniff_cadnano_file, validate_cadnano_file
+)
+
+
+def make_files(tmp_path):
+    vstrands = [{"num": i, "row": 0, "col": i, "stap": [[-1, -1, -1, -1]]*500} for i in range(20)]
+    files = {
+        "design.json": {"name": "design.json", "vstrands": vstrands},
+        "sub/reordered.json": {"vstrands": vstrands, "padding": "x"*5000, "name": "reordered.json"},
+        "sub/no_name.json": {"vstrands": vstrands},
+        "sub/bad_name.json": {"name": 42, "vstrands": []},
+        "other.json": {"a": [1, 2, 3]},
+        "list.json": [{"name": "x", "vstrands": []}],
+    }
+    (tmp_path / "sub").mkdir()
+    for name, document in files.items():
+        (tmp_path / name).write_text(json.dumps(document))
+    (tmp_path / "broken.json").write_text('{"name": "broken", "vstrands": [')
+    return tmp_path
+
+
+def test_sniff_cadnano_file(tmp_path):
+    make_files(tmp_path)
+    assert sniff_cadnano_file(tmp_path / "design.json")
+    assert sniff_cadnano_file(tmp_path / "sub/reordered.json")
+    assert sniff_cadnano_file(tmp_path / "broken.json")
+    assert not sniff_cadnano_file(tmp_path / "sub/no_name.json")
+    assert not sniff_cadnano_file(tmp_path / "other.json")
+    assert not sniff_cadnano_file(tmp_path / "list.json")
+    assert not sniff_cadnano_file(tmp_path / "missing.json")
+
+
+@pytest.mark.parametrize("parser", ["json", "orjson", "ijson"])
+def test_validate_cadnano_file(tmp_path, parser):
+    if parser != "json" and getattr(cadnano_file_search, parser) is None:
+        pytest.skip(f"{parser} not installed")
+    make_files(tmp_path)
+    assert validate_cadnano_file(tmp_path / "design.json", parser=parser) is None
+    assert "not valid" in validate_cadnano_file(tmp_path / "sub/bad_name.json", parser=parser)
+    assert "not valid" in validate_cadnano_file(tmp_path / "sub/no_name.json", parser=parser)
+    assert "not valid" in validate_cadnano_file(tmp_path / "list.json", parser=parser)
+
+
+@pytest.mark.parametrize("jobs, sniff_bytes", [(1, 4096), (2, 4096), (1, 0)])
+def test_find_cadnano_files(tmp_path, jobs, sniff_bytes):
+    make_files(tmp_path)
+    found = find_cadnano_files(tmp_path, jobs=jobs, sniff_bytes=sniff_bytes)
+    assert sorted(fp.relative_to(tmp_path).as_posix() for fp in found) == ["design.json", "sub/reordered.json"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_cadnano_files_prints_files_as_they_are_found(tmp_path, jobs, monkeypatch, capsys):
+    make_files(tmp_path)
+    candidates = [tmp_path / name for name in ["design.json", "other.json", "sub/reordered.json"]]
+    files = iter_cadnano_files(candidates, jobs=jobs)
+    assert next(files) == candidates[0]
+    assert list(files) == [candidates[2]]
+    # With a single job, files after the first cadnano file have not been validated when it is yielded:
+    validated = []
+    validate = cadnano_file_search.validate_cadnano_file
+    monkeypatch.setattr(cadnano_file_search, "validate_cadnano_file",
+                        lambda fp, **kwargs: validated.append(fp) or validate(fp, **kwargs))
+    files = iter_cadnano_files(candidates, jobs=1, sniff_bytes=0)
+    assert next(files) == candidates[0] and validated == candidates[:1]
+    find_cadnano_files(tmp_path, glob_pattern="design.json", jobs=jobs)
+    assert capsys.readouterr().out == f"{candidates[0]}\n"
@@ -0,0 +1,79 @@
+"""
+
+Tests for `rsenv.origami.cadnano.cadnano_json_hashing_cli` (vstrands hashing).
+
+"""
+
+import json
+import random
+
+import pytest
+
+from rsenv.origami.cadnano.cadnano_json_hashing_cli import (
+    DEFAULT_VSTRANDS_HASH_SPECS, VstrandsHasher, vstrands_json_hash, vstrands_specs_hashes,
+    cadnano_json_vstrands_hashes, order_dependent_json_hash_hexdigest, order_independent_json_hash_hexdigest,
+)
+
+
+def make_vstrands(n_helices=6, length=42, seed=0):
+    rnd = random.Random(seed)
+    return [{
+        "row": h // 3, "col": h % 3, "num": h, "scafLoop": [], "stapLoop": [],
+        "stap": [[rnd.randint(-1, 5), rnd.randint(0, length-1), rnd.randint(-1, 5), rnd.randint(0, length-1)]
+                 for _ in range(length)],
+        "scaf": [[h, i-1, h, i+1] for i in range(length)],
+        "loop": [0]*length, "skip": [rnd.choice([0, 0, -1]) for _ in range(length)],
+        "stap_colors": [[rnd.randint(0, length-1), rnd.randint(0, 2**24)] for _ in range(3)],
+    } for h in range(n_helices)]
+
+
+def test_vstrands_json_hash_matches_filtered_vstrands():
+    vstrands = make_vstrands()
+    routing = [{k: vh[k] for k in ['stap', 'scaf', 'loop', 'stapLoop', 'skip']} for vh in vstrands]
+    spec = DEFAULT_VSTRANDS_HASH_SPECS["vstrands-stap-scaf-loops-skips"]
+    assert vstrands_json_hash(vstrands, **spec) == order_dependent_json_hash_hexdigest(routing)
+    spec = DEFAULT_VSTRANDS_HASH_SPECS["vstrands-stap-scaf-loops-skips-oi"]
+    assert vstrands_json_hash(vstrands, **spec) == order_independent_json_hash_hexdigest(routing)
+    assert vstrands_json_hash(vstrands[::-1], **spec) == vstrands_json_hash(vstrands, **spec)
+    no_colors = [{k: v for k, v in vh.items() if k != 'stap_colors'} for vh in vstrands]
+    assert vstrands_json_hash(vstrands, **DEFAULT_VSTRANDS_HASH_SPECS["vstrands-without-colors"]) == \
+        order_dependent_json_hash_hexdigest(no_colors)
+    assert vstrands_json_hash(vstrands, json_separators=None, hash_name="md5") == \
+        order_dependent_json_hash_hexdigest(vstrands, hash_name="md5", json_separators=None)
+
+
+def test_vstrands_json_hash_missing_keys():
+    vstrands = make_vstrands()
+    with pytest.raises(KeyError):
+        vstrands_json_hash(vstrands, include_keys=['scaf_colors'])
+    with pytest.raises(KeyError):
+        vstrands_json_hash(vstrands, include_keys=['scaf_colors'], allow_missing_include_keys=None)
+    with pytest.raises(KeyError):
+        vstrands_json_hash(vstrands, exclude_keys=['scaf_colors'])
+    filled = [{'num': vh['num'], 'scaf_colors': [1]} for vh in vstrands]
+    assert vstrands_json_hash(vstrands, include_keys=['num', 'scaf_colors'], allow_missing_include_keys=True,
+                              val_for_nonexisting_attributes=[1]) == order_dependent_json_hash_hexdigest(filled)
+    assert vstrands_json_hash(vstrands, include_keys=['num', 'scaf_colors'], allow_missing_include_keys="exclude") \
+        == vstrands_json_hash(vstrands, include_keys='num')
+    # The vstrands are not modified:
+    assert vstrands == make_vstrands()
+
+
+def test_vstrands_specs_hashes():
+    vstrands = make_vstrands(seed=1)
+    expected = {description: vstrands_json_hash(vstrands, **kwargs)
+                for description, kwargs in DEFAULT_VSTRANDS_HASH_SPECS.items()}
+    assert vstrands_specs_hashes(vstrands) == expected
+    hasher = VstrandsHasher(vstrands)
+    assert hasher.hash_specs(DEFAULT_VSTRANDS_HASH_SPECS) == expected
+    assert hasher.hash_specs(DEFAULT_VSTRANDS_HASH_SPECS) == expected  # Cached
+
+
+def test_cadnano_json_vstrands_hashes(tmp_path):
+    jsonfile = tmp_path / "design.json"
+    jsonfile.write_text(json.dumps({"name": "design.json", "vstrands": make_vstrands()}))
+    # Specs loaded from a json file have lists instead of tuples:
+    specs = json.loads(json.dumps(dict(DEFAULT_VSTRANDS_HASH_SPECS, seps={"json_separators": [",", ":"]})))
+    hashes = cadnano_json_vstrands_hashes(str(jsonfile), hash_vstrands_specs=specs, save_hashes_to_file=False)
+    assert hashes["seps"] == hashes["vstrands-all-attributes"]
+    assert hashes["vstrands-stap"] == vstrands_json_hash(make_vstrands(), include_keys=['stap'])
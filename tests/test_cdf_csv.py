@@ -0,0 +1,104 @@
+"""
+
+Tests for `rsenv.hplcutils.cdf_csv` (streaming chromatogram conversion).
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from click.testing import CliRunner
+
+from rsenv.hplcutils.io import load_hplc_aia_xr_dataframe
+from rsenv.hplcutils.cdf_csv import convert_chromatogram_files, cdf_csv_cli, uses_dataset_fields
+
+
+def write_cdf(path, values, interval=0.4, sample_name="sample", operator="RS"):
+    ds = xr.Dataset(
+        {"ordinate_values": ("point_number", np.asarray(values, dtype=np.float32)),
+         "actual_sampling_interval": interval, "actual_run_time_length": interval * len(values)},
+        coords={"point_number": np.arange(len(values))},
+        attrs={"sample_name": sample_name, "sample_id": sample_name, "operator": operator},
+    )
+    ds.to_netcdf(str(path))
+    return str(path)
+
+
+def make_cdf_files(tmp_path, intervals=(0.4, 0.4, 0.4), with_nan=False):
+    rnd = np.random.RandomState(0)
+    files = []
+    for i, interval in enumerate(intervals):
+        values = rnd.uniform(0, 100, 60)
+        if with_nan:
+            values[10 + i] = np.nan
+        files.append(write_cdf(tmp_path / f"run{i}.cdf", values, interval=interval,
+                               sample_name=f"RS{i}", operator=f"op{i}"))
+    return files
+
+
+def assert_same_table(csvfile, df, columns=True):
+    streamed = pd.read_csv(csvfile, index_col=0, float_precision='round_trip')
+    assert len(streamed) > 0
+    if columns:
+        assert list(streamed.columns) == list(df.columns)
+    assert streamed.index.name == df.index.name
+    # The CSV values round-trip, i.e. no precision is lost when formatting:
+    assert np.array_equal(streamed.index.values, df.index.values)
+    assert np.array_equal(streamed.values.astype(df.values.dtype), df.values, equal_nan=True)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"crop_range": (0.1, 0.3)},
+    {"runname_fmt": "{i} {ds.operator} {fn}"},
+    {"time_alignment": "resample"},
+    {"time_alignment": "resample", "resample_rate": 200.0, "crop_range": (0.05, 0.25)},
+])
+def test_streamed_equals_dataframe_conversion(tmp_path, kwargs):
+    files = make_cdf_files(tmp_path)
+    outputfn = str(tmp_path / "merged.csv")
+    convert_chromatogram_files(files, outputfn=outputfn, jobs=2, block_rows=7, **kwargs)
+    if "crop_range" in kwargs:
+        kwargs["signal_range_crop"] = kwargs.pop("crop_range")
+    df = load_hplc_aia_xr_dataframe(files, convert_to_actual_time=True, **kwargs)
+    assert_same_table(outputfn, df)
+
+
+@pytest.mark.parametrize("nan_correction", [None, "dropna", "fill", "interpolate"])
+@pytest.mark.parametrize("intervals", [(0.4, 0.4, 0.4), (0.4, 0.5, 0.4)])
+def test_streamed_nan_correction_equals_dataframe_conversion(tmp_path, nan_correction, intervals):
+    files = make_cdf_files(tmp_path, intervals=intervals, with_nan=True)
+    outputfn = str(tmp_path / "merged.csv")
+    kwargs = dict(nan_correction=nan_correction, nan_fill_value=-1)
+    convert_chromatogram_files(files, outputfn=outputfn, jobs=1, **kwargs)
+    df = load_hplc_aia_xr_dataframe(files, convert_to_actual_time=True, **kwargs)
+    assert_same_table(outputfn, df)
+
+
+def test_separate_files_and_overwrite_prompt(tmp_path):
+    files = make_cdf_files(tmp_path)
+    convert_chromatogram_files(files, merged=False, jobs=1)
+    for fpath in files:
+        assert_same_table(fpath + ".csv", load_hplc_aia_xr_dataframe([fpath], convert_to_actual_time=True),
+                          columns=False)  # Separate files use the sample name as column name.
+    # Existing output files are not overwritten, if the user answers no:
+    with open(files[0] + ".csv", "w") as fd:
+        fd.write("original")
+    result = CliRunner().invoke(cdf_csv_cli, files + ["--separate-files", "--jobs", "1"], input="n\n")
+    assert "Aborting" in result.output
+    assert open(files[0] + ".csv").read() == "original"
+
+
+def test_invalid_options(tmp_path):
+    files = make_cdf_files(tmp_path)
+    with pytest.raises(ValueError):
+        convert_chromatogram_files(files, outputfn=str(tmp_path / "x.csv"), time_alignment="join")
+    with pytest.raises(ValueError):
+        convert_chromatogram_files(files, outputfn=str(tmp_path / "x.csv"), nan_correction="zero")
+
+
+def test_uses_dataset_fields():
+    assert not uses_dataset_fields("{i:02} {ds.sample_name}")
+    assert uses_dataset_fields("{i:02} {ds.operator}")
+    assert not uses_dataset_fields("{fn} {samplename}")
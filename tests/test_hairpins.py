@@ -0,0 +1,43 @@
+"""
+
+Tests for `rsenv.seq.hairpins`.
+
+"""
+
+import re
+import random
+import itertools
+import pytest
+
+from rsenv.seq.sequtil import dnarcomp
+from rsenv.seq.hairpins import HairpinPattern, search_hairpins
+
+
+CONST1, CONST2 = "GCTGTTA", "TTTGCC"
+
+
+def make_reads(n_reads=100, seed=0):
+    rnd = random.Random(seed)
+    rs = lambda n: "".join(rnd.choice("ACGT") for _ in range(n))
+    reads = []
+    for i in range(n_reads):
+        s1, s2 = rs(2), rs(2)
+        hairpin = s1 + CONST1 + s2 + rs(rnd.randint(0, 6)) + dnarcomp(s2) + CONST2 + dnarcomp(s1)
+        reads.append(("read%s" % i, rs(rnd.randint(0, 5)) + hairpin + rs(rnd.randint(0, 5)) + hairpin[::-1]))
+    return reads
+
+
+@pytest.mark.parametrize("loop, regex_loop", [("shortest", ".*?"), ("longest", ".*")])
+def test_hairpin_search_equals_per_stem_regexes(loop, regex_loop):
+    reads = make_reads()
+    expected = set()
+    for s1, s2 in itertools.product(["".join(p) for p in itertools.product("ACGT", repeat=2)], repeat=2):
+        regex = re.compile(s1 + CONST1 + s2 + regex_loop + dnarcomp(s2) + CONST2 + dnarcomp(s1))
+        for i, (seqid, seq) in enumerate(reads):
+            match = regex.search(seq)
+            if match:
+                expected.add((i, match.span(), s1, s2))
+    pattern = HairpinPattern(CONST1, CONST2, stem1_len=2, stem2_len=2, loop=loop)
+    hits = list(search_hairpins(reads, pattern))
+    assert {(hit.index, hit.span, hit.stem1, hit.stem2) for hit in hits} == expected
+    assert list(search_hairpins(reads, pattern, processes=2, shard_size=30)) == hits
@@ -0,0 +1,86 @@
+"""
+
+Tests for `rsenv.utils.hash_utils`.
+
+"""
+
+import hashlib
+import itertools
+import random
+import pytest
+
+from click.testing import CliRunner
+
+from rsenv.utils.hash_utils import (
+    file_sha256sumsum, file_sha256setsum, file_sequencesethash, file_sequencesethash_cli,
+    sha256_sumsum_hexdigest, sha256_setsum_hexdigest, sequencesethash, sequence_normalizer, MultisetHash)
+
+
+LINES = ["ACGT", "acgt", "", "   ", " TTGCA /5Phos/ACG ", "ACGT", "GGGCCC", ""]
+
+
+def reference_line_hashes(lines):
+    return [int.from_bytes(hashlib.sha256(line.encode()).digest(), 'big') for line in lines]
+
+
+def write_file(tmp_path, name="oligos.txt"):
+    path = tmp_path / name
+    path.write_text("\n".join(LINES) + "\n")
+    return str(path)
+
+
+def test_streaming_file_hashes_equal_list_based_hashes(tmp_path):
+    path = write_file(tmp_path)
+    for strip_whitespace, remove_empty_lines in itertools.product([True, False], repeat=2):
+        lines = LINES
+        if strip_whitespace:
+            lines = [line.strip() for line in lines if line]
+        if remove_empty_lines:
+            lines = [line for line in lines if line]
+        kwargs = dict(strip_whitespace=strip_whitespace, remove_empty_lines=remove_empty_lines)
+        assert file_sha256sumsum(path, **kwargs) == f"{sum(reference_line_hashes(lines)) % 2**256:0x}"
+        assert file_sha256setsum(path, **kwargs) == f"{sum(set(reference_line_hashes(lines))) % 2**256:0x}"
+    sequences = {"ACGT", "TTGCA ACG", "GGGCCC"}
+    assert file_sequencesethash(path) == f"{sum(reference_line_hashes(sequences)) % 2**256:0x}"
+
+
+def test_cli_jobs(tmp_path):
+    paths = [write_file(tmp_path, "oligos%s.txt" % i) for i in range(3)]
+    serial = CliRunner().invoke(file_sequencesethash_cli, paths)
+    parallel = CliRunner().invoke(file_sequencesethash_cli, ["--jobs", "2"] + paths)
+    assert serial.exit_code == parallel.exit_code == 0
+    assert serial.output == parallel.output
+    assert serial.output.splitlines()[0] == f"{file_sequencesethash(paths[0])} *{paths[0]}"
+
+
+def test_multiset_hash_incremental_updates():
+    rnd = random.Random(0)
+    pool = ["".join(rnd.choice("ACGT") for _ in range(20)) for _ in range(1000)]
+    pool += pool[:50]  # Duplicates
+    set_hash, multiset_hash = MultisetHash(pool), MultisetHash(pool, mode='multiset')
+    assert set_hash.hexdigest() == sha256_setsum_hexdigest(pool)
+    assert multiset_hash.hexdigest() == sha256_sumsum_hexdigest(pool)
+    # Swap 20 staples:
+    new_pool = list(pool)
+    for i in range(60, 80):
+        for hash_obj in (set_hash, multiset_hash):
+            hash_obj.remove(new_pool[i])
+            hash_obj.add(new_pool[i][::-1])
+        new_pool[i] = new_pool[i][::-1]
+    assert set_hash.hexdigest() == sha256_setsum_hexdigest(new_pool)
+    assert multiset_hash.hexdigest() == sha256_sumsum_hexdigest(new_pool)
+    # Removing one copy of a duplicated element does not change the set hash:
+    set_hash.remove(pool[0])
+    assert set_hash.hexdigest() == sha256_setsum_hexdigest(new_pool)
+    with pytest.raises(KeyError):
+        MultisetHash(["ACGT"]).remove("TTTT")
+
+
+def test_multiset_hash_merge_and_sequence_normalization():
+    sequences = ["acgt", " ACGT ", "TT/5Phos/GG", "", "GGCC"]
+    seq_hash = MultisetHash(sequences[:2], normalize=sequence_normalizer())
+    seq_hash.merge(MultisetHash(sequences[2:], normalize=sequence_normalizer()))
+    assert seq_hash.hexdigest() == sequencesethash(sequences)
+    assert len(seq_hash) == 3 and "Acgt" in seq_hash
+    with pytest.raises(ValueError):
+        seq_hash.merge(MultisetHash(mode='multiset'))
@@ -0,0 +1,46 @@
+# Copyright 2019, Rasmus Sorensen <rasmusscholer@gmail.com>
+"""
+
+Tests for `rsenv.hplcutils.agilent.hpcs_vwd`, using the test data in `tests/testdata/hplc-data/`.
+
+"""
+
+import os
+import numpy as np
+
+from rsenv.hplcutils.agilent import hpcs_vwd
+
+VWD_FILE = os.path.join(os.path.dirname(__file__), 'testdata', 'hplc-data', 'vwd1A-negative-jump.ch')
+
+
+def read_reference_signal_ints():
+    with open(VWD_FILE, 'rb') as f:
+        return np.array(hpcs_vwd.read_signal_ints(f))
+
+
+def test_decode_signal_ints():
+    with open(VWD_FILE, 'rb') as f:
+        buf = f.read()
+    expected = read_reference_signal_ints()
+    assert np.array_equal(hpcs_vwd.decode_signal_ints(buf), expected)
+    out = np.zeros(len(expected) + 10, dtype=np.int64)
+    signal_ints = hpcs_vwd.decode_signal_ints(buf, out=out)
+    assert np.shares_memory(signal_ints, out)
+    assert np.array_equal(signal_ints, expected)
+
+
+def test_iter_signal_int_chunks():
+    with open(VWD_FILE, 'rb') as f:
+        buf = f.read()
+    expected = read_reference_signal_ints()
+    for chunk_size in (7, 100, 1000, 2**20):
+        chunks = list(hpcs_vwd.iter_signal_int_chunks(buf, chunk_size=chunk_size))
+        assert np.array_equal(np.concatenate(chunks), expected)
+
+
+def test_read_agilent_1200_vwd_ch_use_mmap():
+    data = hpcs_vwd.read_agilent_1200_vwd_ch(VWD_FILE)
+    data_mmap = hpcs_vwd.read_agilent_1200_vwd_ch(VWD_FILE, use_mmap=True)
+    assert data['metadata'] == data_mmap['metadata']
+    assert np.array_equal(data['timepoints'], data_mmap['timepoints'])
+    assert np.array_equal(data['signal_values'], data_mmap['signal_values'])
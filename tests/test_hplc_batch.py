@@ -0,0 +1,143 @@
+"""
+
+Tests for `rsenv.hplcutils.batch` (running many `hplc-cli` jobs from a manifest file).
+
+"""
+
+import os
+
+import builtins
+
+import numpy as np
+import pytest
+import xarray as xr
+from click.testing import CliRunner
+
+from rsenv.hplcutils.batch import (
+    load_batch_manifest, run_hplc_job, run_hplc_batch, hplc_batch_cli, BATCH_MODE_DEFAULTS, BATCH_MODE_OVERRIDES
+)
+
+
+def write_cdf(path, values, interval=0.4, sample_name="sample"):
+    ds = xr.Dataset(
+        {"ordinate_values": ("point_number", np.asarray(values, dtype=np.float32)),
+         "actual_sampling_interval": interval, "actual_run_time_length": interval * len(values)},
+        coords={"point_number": np.arange(len(values))},
+        attrs={"sample_name": sample_name, "sample_id": sample_name},
+    )
+    ds.to_netcdf(str(path))
+    return str(path)
+
+
+def make_aia_dir(path, n_runs=3, n_points=400):
+    path.mkdir()
+    t = np.arange(n_points) * 0.4
+    for i in range(n_runs):
+        write_cdf(path / f"run{i}.cdf", 10 * np.exp(-(t - 40 - 20*i)**2 / 20) + 1, sample_name=f"RS{i}")
+    return str(path)
+
+
+def test_load_batch_manifest_yaml(tmp_path):
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text("""\
+defaults:
+    make-pseudogel: true
+    signal_downsampling: 20
+jobs:
+    - cdf_files_or_dir: RS535.AIA
+    - cdf_files_or_dir: [RS536a.AIA, RS536b.AIA]
+      fnprefix: RS536
+      crop_range: [2, 20]
+      signal_downsampling: 10
+""")
+    jobs = load_batch_manifest(str(manifest))
+    assert len(jobs) == 2
+    assert jobs[0] == {'make_pseudogel': True, 'signal_downsampling': 20,
+                       'cdf_files_or_dir': [str(tmp_path / "RS535.AIA")]}
+    assert jobs[1]['cdf_files_or_dir'] == [str(tmp_path / "RS536a.AIA"), str(tmp_path / "RS536b.AIA")]
+    assert (jobs[1]['fnprefix'], jobs[1]['crop_range'], jobs[1]['signal_downsampling']) == ('RS536', [2, 20], 10)
+    # A plain list of jobs:
+    manifest.write_text("- cdf_files_or_dir: RS535.AIA\n")
+    assert load_batch_manifest(str(manifest)) == [{'cdf_files_or_dir': [str(tmp_path / "RS535.AIA")]}]
+
+
+def test_load_batch_manifest_csv(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text('cdf_files_or_dir,fnprefix,crop-range,make_pseudogel\n'
+                        'RS535.AIA,,,\n'
+                        'RS536a.AIA; RS536b.AIA,RS536,"[2, 20]",true\n')
+    jobs = load_batch_manifest(str(manifest))
+    assert jobs[0] == {'cdf_files_or_dir': [str(tmp_path / "RS535.AIA")]}
+    assert jobs[1] == {'cdf_files_or_dir': [str(tmp_path / "RS536a.AIA"), str(tmp_path / "RS536b.AIA")],
+                       'fnprefix': 'RS536', 'crop_range': [2, 20], 'make_pseudogel': True}
+
+
+def test_load_batch_manifest_errors(tmp_path):
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text("- cdf_files_or_dir: RS535.AIA\n  not_an_option: 1\n")
+    with pytest.raises(ValueError, match="not_an_option"):
+        load_batch_manifest(str(manifest))
+    manifest.write_text("- fnprefix: RS535\n")
+    with pytest.raises(ValueError, match="cdf_files_or_dir"):
+        load_batch_manifest(str(manifest))
+
+
+def test_batch_mode_defaults_do_not_change_output():
+    # Only parameters that would otherwise require user input have batch mode defaults:
+    assert set(BATCH_MODE_DEFAULTS) == {'trim_signals'}
+    assert BATCH_MODE_OVERRIDES['pyplot_show'] is False and BATCH_MODE_OVERRIDES['confirm_nan'] is False
+
+
+def test_run_hplc_job(tmp_path, monkeypatch):
+    aia_dir = make_aia_dir(tmp_path / "RS535.AIA")
+    monkeypatch.chdir(tmp_path)
+    job = {'cdf_files_or_dir': [aia_dir], 'fnprefix': 'RS535', 'make_pseudogel': False,
+           'peak_table_fn': 'RS535-peaks.csv', 'verbose': 0}
+    assert run_hplc_job(job) == (job, None)
+    assert os.path.exists(tmp_path / "RS535-peaks.csv")
+    # Errors are returned, not raised:
+    bad_job = {'cdf_files_or_dir': [str(tmp_path / "missing.AIA")], 'verbose': 0}
+    results = run_hplc_batch([job, bad_job])
+    assert results[0][1] is None
+    assert results[1][0] == bad_job and "Traceback" in results[1][1]
+
+
+def test_run_hplc_job_does_not_ask_user(tmp_path, monkeypatch):
+    aia_dir = make_aia_dir(tmp_path / "RS535.AIA")
+    # A shorter run gives NaN values when joined with the other runs:
+    t = np.arange(300) * 0.4
+    write_cdf(tmp_path / "RS535.AIA" / "run9.cdf", np.exp(-(t - 40)**2 / 20), sample_name="RS9")
+    monkeypatch.chdir(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Batch job asked for user input.")
+
+    monkeypatch.setattr(builtins, "input", fail)
+    job = {'cdf_files_or_dir': [aia_dir], 'fnprefix': 'RS535', 'nan_correction': '',
+           'make_pseudogel': True, 'signal_downsampling': 7, 'plot_chromatograms': False, 'verbose': 0}
+    assert run_hplc_job(job) == (job, None)
+    assert os.path.exists(tmp_path / "RS535-ds7_pseudogel.png")
+
+
+def test_run_hplc_batch_workers_and_cli(tmp_path, monkeypatch):
+    for name in ["RS535.AIA", "RS536.AIA"]:
+        make_aia_dir(tmp_path / name)
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text("""\
+defaults:
+    make_pseudogel: false
+    verbose: 0
+jobs:
+    - {cdf_files_or_dir: RS535.AIA, peak_table_fn: RS535-peaks.csv}
+    - {cdf_files_or_dir: RS536.AIA, peak_table_fn: RS536-peaks.csv}
+    - {cdf_files_or_dir: missing.AIA}
+""")
+    monkeypatch.chdir(tmp_path)
+    results = run_hplc_batch(load_batch_manifest(str(manifest)), workers=2)
+    assert [error is None for job, error in results] == [True, True, False]
+    assert os.path.exists(tmp_path / "RS535-peaks.csv") and os.path.exists(tmp_path / "RS536-peaks.csv")
+    os.remove(tmp_path / "RS535-peaks.csv")
+    result = CliRunner().invoke(hplc_batch_cli, [str(manifest), "--workers", "2"])
+    assert result.exit_code == 1
+    assert "Completed 2 of 3 jobs." in result.output and "missing.AIA" in result.output
+    assert os.path.exists(tmp_path / "RS535-peaks.csv")
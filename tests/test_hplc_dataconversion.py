@@ -0,0 +1,27 @@
+# Copyright 2019, Rasmus Sorensen <rasmusscholer@gmail.com>
+"""
+
+Tests for `rsenv.hplcutils.dataconversion`.
+
+"""
+
+import numpy as np
+
+from rsenv.hplcutils.dataconversion import get_common_time_grid, resample_to_common_grid
+
+
+def test_get_common_time_grid_intersection():
+    grid = get_common_time_grid([np.linspace(0, 10, 101), np.linspace(0.5, 12, 231)])
+    assert grid[0] == 0.5
+    assert grid[-1] <= 10
+    assert np.allclose(np.diff(grid), 0.05)
+
+
+def test_resample_to_common_grid():
+    xs1, xs2 = np.linspace(0, 10, 101), np.linspace(0.03, 10.02, 120)
+    grid, values = resample_to_common_grid([(xs1, 2 * xs1), (xs2, 3 * xs2)], target_rate=5)
+    assert values.shape == (len(grid), 2)
+    assert values.dtype == np.float32
+    assert not np.any(np.isnan(values))
+    assert np.allclose(values[:, 0], 2 * grid, atol=1e-4)
+    assert np.allclose(values[:, 1], 3 * grid, atol=1e-4)
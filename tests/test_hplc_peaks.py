@@ -0,0 +1,66 @@
+# Copyright 2019, Rasmus Sorensen <rasmusscholer@gmail.com>
+"""
+
+Tests for `rsenv.hplcutils.peaks`.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from rsenv.hplcutils.peaks import find_and_integrate_peaks, join_peaks_with_fractions
+
+
+def gaussian(t, mu, sigma, amplitude):
+    return amplitude * np.exp(-(t - mu)**2 / (2 * sigma**2))
+
+
+def make_chromatograms():
+    t = np.linspace(0, 20, 2001)
+    return pd.DataFrame({
+        'a': gaussian(t, 5, 0.2, 10) + gaussian(t, 12, 0.3, 5) + 1,
+        'b': gaussian(t, 7, 0.2, 3) + gaussian(t, 7.9, 0.2, 3) + 0.5,
+    }, index=t)
+
+
+def test_find_and_integrate_peaks():
+    peaks = find_and_integrate_peaks(make_chromatograms(), rel_threshold=0.01)
+    assert list(peaks['run']) == ['a', 'a', 'b']
+    assert np.allclose(peaks['retention_time'][:2], [5, 12])
+    assert np.allclose(peaks['height'][:2], [10, 5], rtol=1e-3)
+    # Nearly all of the gaussian area is above the 1% threshold:
+    assert np.allclose(peaks['area'][:2], [10 * 0.2 * np.sqrt(2 * np.pi), 5 * 0.3 * np.sqrt(2 * np.pi)], rtol=0.01)
+
+
+def test_find_and_integrate_peaks_split_valleys():
+    peaks = find_and_integrate_peaks(make_chromatograms(), split_valleys=True)
+    peaks_b = peaks[peaks['run'] == 'b']
+    assert list(peaks_b['peak']) == [0, 1]
+    assert np.allclose(peaks_b['retention_time'], [7, 7.9])
+
+
+def test_split_valley_areas_sum_to_unsplit_area():
+    signal = np.array([5, 4, 3, 4, 5, 6, 5, 4, 0], dtype=float)
+    kwargs = dict(timepoints=np.arange(len(signal)) * 0.1, baseline_correction=None, threshold=0.5, min_points=1)
+    unsplit = find_and_integrate_peaks(signal, **kwargs)
+    split = find_and_integrate_peaks(signal, split_valleys=True, **kwargs)
+    assert len(unsplit) == 1 and len(split) == 2
+    assert np.isclose(split['area'].sum(), unsplit['area'].sum())
+    assert np.isclose(split['end_time'][0], split['start_time'][1])
+    # Also for the overlapping gaussians:
+    data = make_chromatograms()[['b']]
+    unsplit = find_and_integrate_peaks(data)
+    split = find_and_integrate_peaks(data, split_valleys=True)
+    assert len(unsplit) == 1 and len(split) == 2
+    assert np.isclose(split['area'].sum(), unsplit['area'].sum())
+
+
+def test_join_peaks_with_fractions():
+    fractions = pd.DataFrame({
+        'fraction': [1, 2], 'split': [1, 1], 'well': ['A1', 'A2'], 'volume': [100, 100],
+        'start': [4.5, 11.0], 'end': [5.5, 11.5], 'trigger': ['Peak', 'Peak'], 'unknown': [0, 0],
+    }).set_index(['fraction', 'split'])
+    peaks = join_peaks_with_fractions(find_and_integrate_peaks(make_chromatograms()), fractions)
+    assert peaks['well'][0] == 'A1'
+    assert peaks['well'][1:].isna().all()
+    assert peaks['fraction'][0] == 1
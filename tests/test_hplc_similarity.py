@@ -0,0 +1,103 @@
+"""
+
+Tests for `rsenv.hplcutils.similarity` (chromatogram fingerprint index) and `io.load_chromatogram_xy`.
+
+"""
+
+import os
+
+import numpy as np
+import xarray as xr
+from click.testing import CliRunner
+
+from rsenv.hplcutils.io import load_chromatogram_xy
+from rsenv.hplcutils.similarity import ChromatogramIndex, chromatogram_fingerprint, hplc_similarity_cli
+
+
+def gaussian(t, mu, sigma, amplitude):
+    return amplitude * np.exp(-(t - mu)**2 / (2 * sigma**2))
+
+
+def make_chromatograms(n=40, seed=0):
+    rnd = np.random.RandomState(seed)
+    t = np.linspace(0, 30, 3000)
+    return [(f"run{i}", t, sum(gaussian(t, rnd.uniform(2, 28), rnd.uniform(0.1, 0.5), rnd.uniform(1, 10))
+                               for _ in range(3)) + rnd.uniform(0, 1))
+            for i in range(n)]
+
+
+def write_cdf(path, values, interval=0.4, sample_name="sample"):
+    ds = xr.Dataset(
+        {"ordinate_values": ("point_number", np.asarray(values, dtype=np.float32)),
+         "actual_sampling_interval": interval},
+        coords={"point_number": np.arange(len(values))},
+        attrs={"sample_name": sample_name},
+    )
+    ds.to_netcdf(str(path))
+    return str(path)
+
+
+def brute_force_top_k(fingerprints, query, k, metric):
+    if metric == 'cosine':
+        scores = fingerprints @ query
+    else:
+        scores = np.array([np.corrcoef(row, query)[0, 1] for row in fingerprints])
+    return list(np.argsort(-scores, kind='stable')[:k]), np.sort(scores)[::-1][:k]
+
+
+def test_query_equals_brute_force():
+    chromatograms = make_chromatograms()
+    index = ChromatogramIndex(time_range=(0, 30), n_points=256)
+    index.add_many((name, xs, ys, None) for name, xs, ys in chromatograms)
+    fingerprints = index.fingerprints.astype(np.float64)
+    for metric in ['cosine', 'correlation']:
+        for name, xs, ys in make_chromatograms(n=5, seed=1):
+            query = chromatogram_fingerprint(xs, ys, time_range=(0, 30), n_points=256).astype(np.float64)
+            expected_idxs, expected_scores = brute_force_top_k(fingerprints, query, 7, metric)
+            results = index.query((xs, ys), k=7, metric=metric)
+            assert [score for _, score, _ in results] == sorted([score for _, score, _ in results], reverse=True)
+            assert np.allclose([score for _, score, _ in results], expected_scores, atol=1e-5)
+            assert [name for name, _, _ in results] == [index.names[i] for i in expected_idxs]
+
+
+def test_self_match_ranks_first():
+    chromatograms = make_chromatograms()
+    index = ChromatogramIndex(time_range=(0, 30))
+    index.add_many((name, xs, ys, None) for name, xs, ys in chromatograms)
+    for metric in ['cosine', 'correlation']:
+        for name, xs, ys in chromatograms[:10]:
+            best_name, best_score, _ = index.query(name, k=3, metric=metric)[0]
+            assert best_name == name and np.isclose(best_score, 1, atol=1e-5)
+    assert len(index.query("run0", k=100)) == len(index)
+
+
+def test_load_chromatogram_xy(tmp_path):
+    fpath = write_cdf(tmp_path / "run.cdf", np.arange(10), interval=0.6, sample_name="RS1")
+    xs, ys, samplename = load_chromatogram_xy(fpath)
+    assert samplename == "RS1"
+    assert np.allclose(xs, np.arange(10) * 0.6 / 60) and np.allclose(ys, np.arange(10))
+    xs, _, _ = load_chromatogram_xy(fpath, convert_seconds_to_minutes=False)
+    assert np.allclose(xs, np.arange(10) * 0.6)
+    xs, _, _ = load_chromatogram_xy(fpath, convert_to_actual_time=False)
+    assert np.allclose(xs, np.arange(10))
+    chfile = os.path.join(os.path.dirname(__file__), "testdata", "hplc-data", "vwd1A-negative-jump.ch")
+    xs, ys, _ = load_chromatogram_xy(chfile)
+    assert len(xs) == len(ys) > 0 and np.all(np.diff(xs) > 0)
+
+
+def test_save_load_and_cli(tmp_path):
+    t = np.arange(0, 600) * 0.4
+    files = [write_cdf(tmp_path / f"run{i}.cdf", gaussian(t, 60 + 40*i, 5, 10), sample_name=f"RS{i}")
+             for i in range(4)]
+    index_basename = str(tmp_path / "index")
+    runner = CliRunner()
+    result = runner.invoke(hplc_similarity_cli, ["build", index_basename] + files[:3])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(hplc_similarity_cli, ["build", index_basename] + files)
+    assert result.exit_code == 0 and "Adding 1 chromatograms" in result.output
+    index = ChromatogramIndex.load(index_basename, mmap_mode='r')
+    assert len(index) == 4
+    assert index.query(files[2], k=1)[0][2] == os.path.abspath(files[2])
+    result = runner.invoke(hplc_similarity_cli, ["query", index_basename, files[1], "-k", "2"])
+    assert result.exit_code == 0
+    assert result.output.split("\n")[2].split()[1] == "RS1"
@@ -0,0 +1,39 @@
+"""
+
+Tests for `rsenv.seq.iupac`.
+
+"""
+
+import random
+import pytest
+
+from rsenv.seq.iupac import iupac_expand, iupac_rcompl, iupac_to_regex, expand_repeats, compile_motifs
+
+
+def test_iupac_expand_and_rcompl():
+    assert list(iupac_expand("ATRGC")) == ["ATAGC", "ATGGC"]
+    assert list(iupac_expand("ATNGC")) == ["ATAGC", "ATTGC", "ATGGC", "ATCGC"]
+    assert expand_repeats("GGTGA(N)3N") == "GGTGANNNN"
+    assert iupac_rcompl("GGTGAB") == "VTCACC"
+    assert iupac_to_regex("GTSAC") == "GT[GC]AC"
+    with pytest.raises(ValueError):
+        iupac_to_regex("GTXAC")
+
+
+@pytest.mark.parametrize("backend", ["regex", "aho-corasick"])
+def test_motif_matcher(backend):
+    rnd = random.Random(1)
+    seq = "".join(rnd.choice("ACGT") for _ in range(5000))
+    motifs = {'BanI': "GGYRCC", 'HphI': "GGTGA(N)3N", 'EcoRI': "GAATTC", 'X': "ACNNGT"}
+    matcher = compile_motifs(motifs, backend=backend)
+    hits = list(matcher.finditer(seq))
+    expected = sorted(
+        (i, name, strand)
+        for name, motif in motifs.items()
+        for strand, words in [('+', set(iupac_expand(motif))), ('-', set(iupac_expand(iupac_rcompl(motif))))]
+        if strand == '+' or iupac_rcompl(motif) != expand_repeats(motif)
+        for i in range(len(seq)) if seq[i:i+len(expand_repeats(motif))] in words
+    )
+    assert sorted((hit.start, hit.motif, hit.strand) for hit in hits) == expected
+    # Streaming gives the same hits, also across chunk boundaries:
+    assert list(matcher.stream(seq[i:i+7] for i in range(0, len(seq), 7))) == hits
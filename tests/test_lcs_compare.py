@@ -0,0 +1,59 @@
+"""
+
+Tests for `rsenv.origami.oligomanager_tools.set_comparison.LcsCompareLimit`.
+
+"""
+
+import random
+
+from rsenv.origami.oligomanager_tools.set_comparison.StringCompareLimit import StringCompareLimit
+from rsenv.origami.oligomanager_tools.set_comparison.LcsCompareLimit import (
+    lcs_length, LcsCompareLimit, all_vs_all_goodness)
+
+
+def lcs_dp(a, b):
+    prev = [0] * (len(b) + 1)
+    for char_a in a:
+        cur = [0]
+        for j, char_b in enumerate(b, 1):
+            cur.append(prev[j - 1] + 1 if char_a == char_b else max(prev[j], cur[-1]))
+        prev = cur
+    return prev[-1]
+
+
+def random_seqs(rnd, n, min_len, max_len):
+    return ["".join(rnd.choice("ACGT") for _ in range(rnd.randint(min_len, max_len))) for _ in range(n)]
+
+
+def test_lcs_length_equals_dynamic_programming():
+    rnd = random.Random(0)
+    for a, b in zip(random_seqs(rnd, 300, 0, 80), random_seqs(rnd, 300, 0, 80)):
+        assert lcs_length(a, b) == lcs_dp(a, b)
+
+
+def test_same_similar_pairs_as_string_compare_limit():
+    rnd = random.Random(1)
+    seqs = random_seqs(rnd, 30, 15, 25)
+    mutated = [seq[:5] + rnd.choice("ACGT") + seq[6:] for seq in seqs]
+    old, new = StringCompareLimit(limit=0.8), LcsCompareLimit(limit=0.8)
+    for a in seqs:
+        for b in mutated:
+            expected = old.recalculate(a, b)
+            goodness = new.recalculate(a, b)
+            assert (goodness > 0.8) == (expected > 0.8)
+            if expected > 0.8:
+                assert goodness == expected
+
+
+def test_all_vs_all_goodness():
+    rnd = random.Random(2)
+    seqs1, seqs2 = random_seqs(rnd, 40, 0, 100), random_seqs(rnd, 30, 0, 60)
+    short = [seq for seq in seqs1 if len(seq) <= 64]
+    for rows, chunk_size in [(seqs1, 7), (short, 256)]:
+        goodness = all_vs_all_goodness(rows, seqs2, limit=0.6, chunk_size=chunk_size)
+        for i, a in enumerate(rows):
+            for j, b in enumerate(seqs2):
+                expected = 2 * lcs_dp(a, b) / (len(a) + len(b)) if a or b else 0
+                assert goodness[i, j] == (expected if expected >= 0.6 else 0)
+    assert (all_vs_all_goodness(seqs1, seqs2, limit=0.6, processes=2, chunk_size=10)
+            == all_vs_all_goodness(seqs1, seqs2, limit=0.6)).all()
@@ -0,0 +1,44 @@
+"""
+
+Tests for `rsenv.origami.oligomanager_tools.set_comparison.OligoSetIndex`.
+
+"""
+
+import random
+
+from rsenv.origami.oligomanager_tools.set_comparison.OligoSetIndex import OligoSetIndex
+from rsenv.origami.oligomanager_tools.set_comparison.OmToolbox import OmToolbox
+
+
+def make_sets(seed=0, n_sets=50):
+    rnd = random.Random(seed)
+    pool = ["".join(rnd.choice("ACGT") for _ in range(rnd.randint(4, 12))) for _ in range(2000)]
+    return {"set%s" % i: set(rnd.sample(pool, rnd.randint(0, 100))) for i in range(n_sets)}
+
+
+def test_prefix_and_membership_queries():
+    sets = make_sets()
+    index = OligoSetIndex(sets)
+    all_oligos = set().union(*sets.values())
+    for prefix in ["", "A", "CG", "TTA", "GATC", "ACGTACGTACGTACGT"]:
+        assert index.with_prefix(prefix) == sorted(o for o in all_oligos if o.startswith(prefix))
+    oligo = sorted(all_oligos)[100]
+    assert index.sets_containing(oligo) == {name for name, oligos in sets.items() if oligo in oligos}
+    assert index.similar_by_prefix(oligo, 3) == sorted(o for o in all_oligos if o[:3] == oligo[:3] and o != oligo)
+    index.remove_set("set0")
+    assert all("set0" not in index.sets_containing(o) for o in sets["set0"])
+    assert index.with_prefix("") == sorted(set().union(*(oligos for name, oligos in sets.items() if name != "set0")))
+
+
+def test_diff_and_compare_against_all():
+    sets = make_sets(1)
+    index = OligoSetIndex(sets)
+    assert index.diff("set1", "set2") == (sets["set1"] & sets["set2"], sets["set1"] - sets["set2"],
+                                          sets["set2"] - sets["set1"])
+    new = set(list(sets["set3"])[:-5]) | {"NEWOLIGO"}
+    result = index.compare_against_all(new)
+    assert result[0] == ("set3", len(new) - 1, 5, 1)
+    for name, n_common, n_removed, n_added in result:
+        assert n_common == len(sets[name] & new) > 0
+        assert (n_removed, n_added) == (len(sets[name] - new), len(new - sets[name]))
+    assert OmToolbox().compareSetAgainstMany(sets, new) == result
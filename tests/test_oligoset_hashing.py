@@ -0,0 +1,69 @@
+"""
+
+Tests for `rsenv.origami.oligoset_tools.oligoset_hashing_cli`.
+
+"""
+
+import os
+
+from rsenv.utils.hash_utils import sha256_setsum_int
+from rsenv.origami.oligoset_tools import oligoset_hashing_cli
+from rsenv.origami.oligoset_tools.oligoset_hashing_cli import hash_oligoset_files
+
+
+LINES = ["acgt/5Phos/TT", "ACGT /5Phos/ TT", "", "ggcc", "GGCC", "  TTTT  "]
+
+
+def write_files(tmp_path, n=3):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"pool{i}.oligoset.txt"
+        path.write_text("\n".join(LINES + ["A" * (i + 1)]) + "\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_hash_oligoset_files(tmp_path):
+    paths = write_files(tmp_path)
+    hashes = hash_oligoset_files(paths, show_stats=False)
+    lines = {"ACGT/5PHOS/TT", "GGCC", "TTTT", "A"}
+    assert hashes[0] == (sha256_setsum_int(lines), sha256_setsum_int({"ACGTTT", "GGCC", "TTTT", "A"}))
+    assert hash_oligoset_files(paths, show_stats=False, jobs=2) == hashes
+
+
+def test_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    paths = write_files(tmp_path)
+    cache_file = str(tmp_path / "hashes.json")
+    hashes = hash_oligoset_files(paths, show_stats=False, cache_file=cache_file)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Unchanged file was rehashed.")
+
+    monkeypatch.setattr(oligoset_hashing_cli, "hash_oligoset_file", fail)
+    assert hash_oligoset_files(paths, show_stats=False, cache_file=cache_file) == hashes
+    # Changed files, and files hashed with different options, are rehashed:
+    with open(paths[1], "a") as fp:
+        fp.write("CCCC\n")
+    monkeypatch.undo()
+    new_hashes = hash_oligoset_files(paths, show_stats=False, cache_file=cache_file)
+    assert new_hashes[0] == hashes[0] and new_hashes[1] != hashes[1]
+    assert hash_oligoset_files(paths, show_stats=False, cache_file=cache_file, remove_duplicates=False) != new_hashes
+    assert os.path.exists(cache_file)
+
+
+def test_cache_stores_stat_from_before_hashing(tmp_path, monkeypatch):
+    paths = write_files(tmp_path, n=1)
+    cache_file = str(tmp_path / "hashes.json")
+    hash_file = oligoset_hashing_cli.hash_oligoset_file
+
+    def hash_and_modify(fpath, **kwargs):
+        result = hash_file(fpath, **kwargs)
+        with open(fpath, "a") as fp:
+            fp.write("CCCC\n")
+        return result
+
+    monkeypatch.setattr(oligoset_hashing_cli, "hash_oligoset_file", hash_and_modify)
+    hashes = hash_oligoset_files(paths, show_stats=False, cache_file=cache_file)
+    monkeypatch.undo()
+    # The file changed while it was hashed, so the cached hash must not be used:
+    assert hash_oligoset_files(paths, show_stats=False, cache_file=cache_file) != hashes
@@ -0,0 +1,74 @@
+"""
+
+Tests for `rsenv.seq.packedseq`.
+
+"""
+
+import random
+import itertools
+import numpy as np
+import pytest
+
+from rsenv.seq.sequtil import dnarcomp, dnacomp, rcompl, compl, PACKED_MIN_LENGTH
+from rsenv.seq.seqgen import encode_seqs, decode_seqs
+from rsenv.seq.packedseq import (
+    PackedSeq, batch_rcompl, batch_gc_content, batch_max_homopolymer, batch_kmers)
+
+
+def random_seqs(n, length, seed=0, alphabet="ACGT"):
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(alphabet) for _ in range(length)) for _ in range(n)]
+
+
+def longest_run(seq):
+    return max(len(list(group)) for _, group in itertools.groupby(seq))
+
+
+def test_packedseq_roundtrip_and_string_functions():
+    for length in range(0, 12):
+        for seq in random_seqs(5, length, seed=length, alphabet="ACGTN"):
+            packed = PackedSeq(seq)
+            assert str(packed) == seq and len(packed) == length
+            assert PackedSeq(seq.lower()) == packed
+            assert str(packed.rcompl()) == dnarcomp(seq)
+            assert str(packed[2:7]) == seq[2:7]
+            if seq:
+                gc = sum(base in "GC" for base in seq) / len(seq)
+                assert packed.gc_content() == gc
+    assert PackedSeq("CCAAAAGTTTTT").homopolymer_runs(min_length=4) == [(2, 6, 'A'), (7, 12, 'T')]
+    assert len(PackedSeq("ACGTA" * 10).data) == 13
+
+
+def test_batch_functions_equal_string_functions():
+    seqs = random_seqs(200, 20, seed=1)
+    codes = encode_seqs(seqs)
+    assert decode_seqs(batch_rcompl(codes)) == dnarcomp(seqs)
+    np.testing.assert_allclose(batch_gc_content(codes), [(s.count("G") + s.count("C")) / 20 for s in seqs])
+    assert batch_max_homopolymer(codes).tolist() == [longest_run(s) for s in seqs]
+
+
+def test_canonical_kmers():
+    seqs = random_seqs(20, 15, seed=2)
+    kmers, valid = batch_kmers(encode_seqs(seqs), 5, canonical=True)
+    rc_kmers, _ = batch_kmers(encode_seqs(dnarcomp(seqs)), 5, canonical=True)
+    assert valid.all()
+    assert (kmers == rc_kmers[:, ::-1]).all()
+    acgt, cgta = batch_kmers(encode_seqs("ACGTA"), 4)[0][0].tolist()
+    assert PackedSeq("ACGTNACGTA").kmers(4).tolist() == [acgt, acgt, cgta]
+
+
+def test_packedseq_eq_and_hash():
+    packed = PackedSeq("ACGTN")
+    assert packed == PackedSeq("acgtn") and hash(packed) == hash(PackedSeq("acgtn"))
+    assert packed != "ACGTN" and packed != PackedSeq("ACGTA")
+    assert len({packed, PackedSeq("ACGTN"), "ACGTN"}) == 2
+
+
+def test_sequtil_rcompl_uses_packed_kernels_for_long_seqs():
+    for length in [10, PACKED_MIN_LENGTH, 1000]:
+        seq = random_seqs(1, length, seed=length)[0]
+        assert rcompl(seq) == dnarcomp(seq) and compl(seq) == dnacomp(seq)
+    # Characters other than uppercase ACGT still raise KeyError, also for long sequences:
+    for seq in ["ACGT" * 100 + "N", "acgt" * 100]:
+        with pytest.raises(KeyError):
+            rcompl(seq)
@@ -0,0 +1,59 @@
+"""
+
+Tests for `rsenv.seq.patmatch`.
+
+"""
+
+import random
+
+from rsenv.seq.sequtil import rcompl
+from rsenv.seq.patmatch import patSeqGen, scanForPart, scanForPattern, PatternScanIndex, partNotPalindrome
+
+
+def make_dataset(n_rows=200, seed=0):
+    rnd = random.Random(seed)
+    return [("oligo%s" % i, "".join(rnd.choice("ATGC") for _ in range(rnd.choice([20, 25])))) for i in range(n_rows)]
+
+
+def scan_with_substring_search(pattern, dataset, sumcondition):
+    hitcondition = lambda part, full: part in full
+    return scanForPattern(pattern, dataset, hitcondition=hitcondition, sumcondition=sumcondition)
+
+
+def test_index_scan_equals_substring_scan():
+    dataset = make_dataset()
+    for pattern, sumcondition in [("NNNNN", None), ("ANNNT", partNotPalindrome)]:
+        expected = scan_with_substring_search(
+            pattern, dataset, sumcondition or (lambda part, matches: len(matches) == 0))
+        assert scanForPattern(pattern, dataset, sumcondition=sumcondition) == expected
+
+
+def test_index_scan_predicates():
+    index = PatternScanIndex(make_dataset(), 4)
+    result = index.scan("NNNN", sumcondition=lambda part, matches: True, gc_range=(0.75, 1), exclude_palindromes=True)
+    parts = [row[0] for row in result]
+    expected = [part for part in patSeqGen("NNNN") if sum(nuc in "GC" for nuc in part) >= 3 and rcompl(part) != part]
+    assert parts == expected
+
+
+def test_index_scan_is_case_sensitive():
+    dataset = [(name, seq[:10] + seq[10:].lower()) for name, seq in make_dataset()]
+    for sumcondition in [None, lambda part, matches: len(matches) > 0]:
+        expected = scan_with_substring_search(
+            "NNNN", dataset, sumcondition or (lambda part, matches: len(matches) == 0))
+        assert scanForPattern("NNNN", dataset, sumcondition=sumcondition) == expected
+
+
+def test_long_pattern_falls_back_to_substring_scan():
+    dataset = make_dataset(n_rows=20)
+    pattern = dataset[0][1][:20] + "ACGTACGTACGTA"
+    assert scanForPattern(pattern, dataset, sumcondition=lambda part, matches: True) == \
+        scan_with_substring_search(pattern, dataset, lambda part, matches: True)
+
+
+def test_patseqgen_keeps_constant_parts():
+    assert list(patSeqGen("ATNGC")) == ['ATAGC', 'ATTGC', 'ATGGC', 'ATCGC']
+    assert list(patSeqGen("acRt")) == ['acAt', 'acGt']
+    assert list(patSeqGen("AU-n")) == ['AU-n']
+    dataset = [("mixed", "ttacGtaa"), ("upper", "TTACGTAA")]
+    assert [scanForPart(part, dataset) for part in patSeqGen("acNt")] == [[], [], ["mixed"], []]
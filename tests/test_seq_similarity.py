@@ -0,0 +1,59 @@
+"""
+
+Tests for `rsenv.seq.seq_similarity`.
+
+"""
+
+import random
+import pytest
+
+from rsenv.seq.seq_similarity import seq_substr_score1, SourceSubstringIndex, seq_substr_scores
+
+
+def random_seq(rnd, n, alphabet="ATGC"):
+    return "".join(rnd.choice(alphabet) for _ in range(n))
+
+
+@pytest.mark.parametrize("circ_cand", [False, True])
+@pytest.mark.parametrize("circ_sources", [False, True])
+@pytest.mark.parametrize("use_wordcount", [False, True])
+def test_source_index_scores_equal_seq_substr_score1(circ_cand, circ_sources, use_wordcount):
+    rnd = random.Random(42)
+    for alphabet in ("ATGC", "AT"):
+        sources = [random_seq(rnd, 60, alphabet) for _ in range(3)]
+        index = SourceSubstringIndex(sources, circ_sources=circ_sources)
+        for _ in range(20):
+            cand = random_seq(rnd, 12, alphabet)
+            kwargs = dict(circ_cand=circ_cand, wordlen_min=3, wordlen_max=10, use_wordcount=use_wordcount)
+            expected = seq_substr_score1(cand, list(sources), circ_sources=circ_sources, **kwargs)
+            assert index.score(cand, **kwargs) == pytest.approx(expected)
+
+
+def test_source_index_custom_scorefunc_and_overlapping_words():
+    sources = ["AAAAAAAT", "GATATATC"]
+    scorefunc = lambda word, count: count * 10 + len(word)
+    for cand in ["AAAATATA", "TATATATA"]:
+        expected = seq_substr_score1(cand, list(sources), scorefunc=scorefunc, use_wordcount=True)
+        assert seq_substr_scores([cand], sources, scorefunc=scorefunc, use_wordcount=True) == [expected]
+
+
+@pytest.mark.parametrize("circ_sources", [False, True])
+def test_source_index_word_count_equals_str_count(circ_sources):
+    rnd = random.Random(7)
+    sources = [random_seq(rnd, rnd.randint(4, 12), "AT") for _ in range(4)]
+
+    def str_count(word):
+        if circ_sources:
+            return sum((s + s[:len(word)]).count(word) for s in sources)
+        return sum(s.count(word) for s in sources)
+
+    index = SourceSubstringIndex(sources, add_complements=False, circ_sources=circ_sources)
+    for _ in range(200):
+        word = random_seq(rnd, rnd.randint(1, 8), "AT")
+        assert index.word_count(word) == str_count(word)
+    # Words that cannot overlap are counted without scanning the sources:
+    sources = ["GATTACA", "CATGATTA"]
+    index = SourceSubstringIndex(sources, add_complements=False, circ_sources=circ_sources)
+    for word in ["GATT", "ATGA", "ACAG"]:
+        assert index.word_count(word) == str_count(word)
+    assert not index._str_counts
@@ -0,0 +1,57 @@
+"""
+
+Tests for `rsenv.seq.seqdiff`.
+
+"""
+
+import os
+import random
+
+from rsenv.seq.seqdiff import batch_insert_diff, banded_extend
+
+
+def random_seq(rnd, n):
+    return "".join(rnd.choice("ACGT") for _ in range(n))
+
+
+def test_batch_insert_diff_equals_common_prefix_and_suffix():
+    rnd = random.Random(0)
+    left, right = random_seq(rnd, 100), random_seq(rnd, 100)
+    ref = left + "GAATTC" + right
+    seqs = [left + random_seq(rnd, rnd.randint(0, 80)) + right for _ in range(300)]
+    seqs += [left[:50], ref, ""]
+    df = batch_insert_diff(ref, seqs, batch_size=64)
+    assert len(df) == len(seqs)
+    for row, seq in zip(df.itertuples(), seqs):
+        start = len(os.path.commonprefix([ref, seq]))
+        end = len(os.path.commonprefix([ref[start:][::-1], seq[start:][::-1]]))
+        assert (row.common_start, row.common_end) == (start, end)
+        assert row.insert_seq == seq[start:len(seq) - end]
+        assert row.ref_nonmatch == ref[start:len(ref) - end]
+        assert seq == seq[:row.insert_start] + row.insert_seq + seq[row.insert_end:]
+
+
+def test_batch_insert_diff_with_errors_in_ends():
+    rnd = random.Random(1)
+    left, right = random_seq(rnd, 120), random_seq(rnd, 120)
+    ref = left + right
+    insert = random_seq(rnd, 30)
+    seqs = [left[:40] + left[41:] + insert + right[:60] + "N" + right[61:],  # Deletion and mismatch
+            left[:90] + "T" + left[90:] + insert + right]  # Insertion
+    df = batch_insert_diff(ref, seqs, max_errors=2)
+    assert df.errors.tolist() == [2, 1]
+    # The insert position is only defined up to bases that happen to match both the insert and the ref:
+    for row in df.itertuples():
+        assert row.ref_nonmatch == "" and len(row.insert_seq) == len(insert)
+        assert abs(row.ref_start - 120) <= 2 and row.insert_seq in left[-2:] + insert + right[:2]
+
+
+def test_banded_extend_stops_at_end_of_similarity():
+    rnd = random.Random(2)
+    common = random_seq(rnd, 60)
+    seq1 = common + random_seq(rnd, 60)
+    seq2 = common[:30] + "A" + common[31:] + random_seq(rnd, 60)
+    if common[30] == "A":
+        seq2 = common[:30] + "C" + common[31:] + seq2[60:]
+    len1, len2, errors = banded_extend(seq1, seq2, max_errors=2)
+    assert len1 == len2 and 60 <= len1 <= 62 and errors >= 1
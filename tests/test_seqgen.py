@@ -0,0 +1,42 @@
+"""
+
+Tests for `rsenv.seq.seqgen`.
+
+"""
+
+import random
+import numpy as np
+
+from rsenv.seq.sequtil import dnarcomp
+from rsenv.seq.seqgen import KmerIndex, check_candidates, generate_random_seqs_batched, DEFAULT_AVOID_SEQS
+
+
+def test_kmer_index_screen_matches_substring_search():
+    rnd = random.Random(0)
+    oligos = ["".join(rnd.choice("ATGC") for _ in range(30)) for _ in range(50)]
+    candidates = ["".join(rnd.choice("ATGC") for _ in range(rnd.choice([12, 15]))) for _ in range(500)]
+    index = KmerIndex(oligos, k=6)
+    expected = [any(cand[i:i+6] in oligo for i in range(len(cand) - 5) for oligo in oligos + dnarcomp(oligos))
+                for cand in candidates]
+    assert np.array_equal(index.screen(candidates), expected)
+
+
+def test_check_candidates():
+    existing = ["ACATACAGCCTCGCATGAGCCC", "CGGAATACTTGAATCGGGTTC"]
+    candidates, matchdata = check_candidates(["GCCAGCTCAGCC", "AAAAAAAAAAAA"], existing, permlen=5)
+    assert candidates == {"AAAAAAAAAAAA", "TTTTTTTTTTTT"}
+    # GCTCA is the reverse complement of TGAGC in the first existing oligo:
+    assert (0, "GCCAGCTCAGCC", "GCTCA", "ACATACAGCCTCGCATGAGCCC") in matchdata[0][4]
+    # Candidates without a match are not split into k-mers:
+    assert len(matchdata) == 4 and len(matchdata[0]) == 8 and matchdata[1] == matchdata[3] == []
+
+
+def test_generate_random_seqs_batched():
+    seqs, hits, n_tries = generate_random_seqs_batched(12, 50, permlen=7, batch_size=1000, seed=3)
+    assert len(seqs) == 50 and len(hits) == 50 and n_tries == hits[-1][1]
+    assert all(0.4 < sum(nuc in "GC" for nuc in seq) / 12 < 0.7 for seq in seqs)
+    assert not any(avoid in seq for seq in seqs for avoid in DEFAULT_AVOID_SEQS)
+    kmer_sets = [{s[i:i+7] for s in (seq, dnarcomp(seq)) for i in range(6)} for seq in seqs]
+    assert all(a.isdisjoint(b) for i, a in enumerate(kmer_sets) for b in kmer_sets[i+1:])
+    # Same seed gives the same sequences, also when using worker processes:
+    assert generate_random_seqs_batched(12, 50, permlen=7, batch_size=1000, seed=3, processes=2)[0] == seqs
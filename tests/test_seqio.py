@@ -0,0 +1,32 @@
+"""
+
+Tests for `rsenv.seq.seqio`.
+
+"""
+
+import gzip
+
+from rsenv.seq.seqio import read_sequences, read_sequence_batches
+
+
+FASTA = ">seq1 first\nACGT\nacgt\n\n>seq2\nGGCC\n"
+FASTQ = "@164886\nTTTAGCACC\n+seq_count=1\ncchhfhiic\n@164887\nGGGA\n+\nhhhh\n"
+
+
+def test_read_fasta_and_gzipped_fastq(tmp_path):
+    fasta = tmp_path / "seqs.fasta"
+    fasta.write_text(FASTA)
+    assert list(read_sequences(str(fasta), upper=True)) == [("seq1 first", "ACGTACGT"), ("seq2", "GGCC")]
+    fastq = tmp_path / "reads.uniq"
+    with gzip.open(fastq, 'wt') as fd:
+        fd.write(FASTQ)
+    assert list(read_sequences(str(fastq))) == [("164886", "TTTAGCACC"), ("164887", "GGGA")]
+    assert list(read_sequences(str(fastq), as_bytes=True, with_quality=True))[1] == (b"164887", b"GGGA", b"hhhh")
+
+
+def test_read_plain_batches(tmp_path):
+    plain = tmp_path / "seqs.txt"
+    plain.write_text("\n".join("ACGT" * i for i in range(1, 6)) + "\n")
+    batches = list(read_sequence_batches(str(plain), batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[2] == [("5", "ACGT" * 5)]
@@ -0,0 +1,38 @@
+"""
+
+Tests for `rsenv.utils.string_util` simhash functions.
+
+"""
+
+import random
+
+from rsenv.utils.string_util import Simhash, simhash_fingerprints, SimhashIndex
+
+
+def random_texts(rnd, n, vocab, n_tokens):
+    return [" ".join(rnd.sample(vocab, rnd.randint(*n_tokens))) for _ in range(n)]
+
+
+def test_simhash_fingerprints_equal_simhash():
+    rnd = random.Random(0)
+    vocab = ["oligo%s" % i for i in range(300)]
+    texts = random_texts(rnd, 50, vocab, (0, 40))
+    fingerprints = simhash_fingerprints(texts, hashbits=384, batch_size=7)
+    assert fingerprints.shape == (50, 48)
+    for text, fingerprint in zip(texts, fingerprints):
+        assert int.from_bytes(bytes(fingerprint), 'big') == Simhash(text).hash
+
+
+def test_simhash_index_finds_near_duplicates():
+    rnd = random.Random(1)
+    vocab = ["oligo%s" % i for i in range(5000)]
+    texts = random_texts(rnd, 500, vocab, (100, 100))
+    index = SimhashIndex(hashbits=64, bands=4)
+    index.add_texts(texts, keys=["file%s" % i for i in range(len(texts))])
+    index.add_texts([texts[7], texts[8] + " extra_oligo"], keys=["copy7", "copy8"])
+    found = {(key1, key2): distance for key1, key2, distance in index.near_duplicates(max_distance=3)}
+    assert found[("file7", "copy7")] == 0
+    assert ("file8", "copy8") in found
+    # Far fewer candidate pairs than all pairs:
+    assert len(index.candidate_pairs()) < len(index) * (len(index) - 1) // 20
+    assert index.query(texts[7])[0] in [("file7", 0), ("copy7", 0)]